@@ -4,7 +4,7 @@ import pandas as pd
 import streamlit_authenticator as stauth
 from data_loader import load_clientes
 from data_importer import importar_archivo
-from model import entrenar_modelo, guardar_modelo, cargar_modelo
+from model import entrenar_modelo, guardar_modelo, cargar_predictor
 from components.kpi_cards import mostrar_kpis
 from components.datagrid import mostrar_tabla
 from components.charts import histograma_antiguedad, pie_segmento
@@ -77,7 +77,11 @@ if page == "Entrenamiento":
 		if st.button("Entrenar Modelo"):
 			with st.spinner("Entrenando..."):
 				modelo, metrics = entrenar_modelo(df, features, target)
-				guardar_modelo(modelo)
+				guardar_modelo(modelo, metadata={
+					'features': features,
+					'metricas': {'roc_auc': float(metrics['roc_auc'])},
+					'filas_entrenamiento': len(df),
+				})
 			st.success("Modelo entrenado y guardado.")
 			st.write("Matriz de confusión:")
 			st.write(metrics['confusion_matrix'])
@@ -94,8 +98,10 @@ if page == "Entrenamiento":
 elif page == "Predicción por cliente":
 	st.title("Predicción Individual")
 	try:
-		modelo = cargar_modelo()
+		# Bosque compilado y mapeado: todas las sesiones comparten una copia;
+		# el modelo de sklearn no se carga para predecir
+		predictor = cargar_predictor()
 		cliente_id = st.selectbox("Selecciona cliente", df['ID_Cliente'])
-		mostrar_perfil_cliente(df, cliente_id, modelo, ['Antigüedad', 'Valor_Mensual'])
+		mostrar_perfil_cliente(df, cliente_id, predictor, ['Antigüedad', 'Valor_Mensual'])
 	except Exception as e:
 		st.warning("Primero debes entrenar y guardar el modelo.")
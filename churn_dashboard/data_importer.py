@@ -1,4 +1,9 @@
-"""Módulo para importar clientes desde CSV/Excel, validar columnas y guardar en SQLite."""
+"""Módulo para importar clientes desde CSV/Excel, validar columnas y guardar en SQLite.
+
+El archivo se lee por bloques (ver `clientes/lectura.py`): se valida el
+encabezado con el primer bloque y, al guardar, cada bloque se escribe antes de
+leer el siguiente.
+"""
 import pandas as pd
 import streamlit as st
 from sqlalchemy import create_engine, Table, Column, Integer, String, Float, DateTime, MetaData
@@ -8,6 +13,28 @@ REQUIRED_COLS = [
     'ID_Cliente', 'Nombre', 'Antigüedad', 'Valor_Mensual', 'Última_Interacción', 'Estado_Actual'
 ]
 
+# Filas por bloque al leer y guardar
+TAMANO_BLOQUE = 20000
+
+
+def _lectura():
+    """Importa `clientes.lectura` (sin Django) aunque la app corra desde churn_dashboard/."""
+    import importlib
+    import sys
+    from pathlib import Path
+
+    raiz = str(Path(__file__).resolve().parent.parent)
+    if raiz not in sys.path:
+        sys.path.append(raiz)
+    return importlib.import_module('clientes.lectura')
+
+
+def leer_bloques(file):
+    """Bloques (`clientes.lectura.Bloque`) del archivo, desde el principio."""
+    file.seek(0)
+    return _lectura().leer_por_bloques(file, file.name, tamano_bloque=TAMANO_BLOQUE, como_texto=False)
+
+
 def importar_archivo():
     """UI para importar archivo y validación básica."""
     st.subheader('Importar clientes desde archivo')
@@ -15,13 +42,14 @@ def importar_archivo():
     if not file:
         return None
     try:
-        if file.name.endswith('.csv'):
-            df = pd.read_csv(file)
-        else:
-            df = pd.read_excel(file)
+        primero = next(iter(leer_bloques(file)), None)
     except Exception as e:
         st.error(f'Error al leer archivo: {e}')
         return None
+    if primero is None:
+        st.error('El archivo no tiene filas.')
+        return None
+    df = primero.datos
     # Validar columnas
     missing = [c for c in REQUIRED_COLS if c not in df.columns]
     if missing:
@@ -30,19 +58,35 @@ def importar_archivo():
     st.success('Archivo cargado y validado correctamente.')
     st.dataframe(df.head())
     if st.button('Guardar en base de datos'):
-        ok = guardar_en_sqlite(df)
+        barra = st.progress(0.0, text='Guardando...')
+
+        def progreso(filas, leidos, totales):
+            fraccion = min(1.0, leidos / totales) if totales else 0.0
+            barra.progress(fraccion, text=f'{filas} filas ({leidos / 1e6:.1f} de {(totales or 0) / 1e6:.1f} MB)')
+
+        ok = guardar_en_sqlite(leer_bloques(file), progreso=progreso)
         if ok:
             st.success('Datos guardados en la base de datos.')
         else:
             st.error('Error al guardar en la base de datos.')
     return df
 
-def guardar_en_sqlite(df, db_path='clientes_importados.sqlite'):
-    """Guarda el DataFrame en una tabla 'clientes' en SQLite."""
+def guardar_en_sqlite(df, db_path='clientes_importados.sqlite', progreso=None):
+    """Guarda el DataFrame (o los bloques de `leer_bloques`) en una tabla 'clientes' en SQLite.
+
+    La tabla se reemplaza con el primer bloque y el resto se agrega.
+    """
+    bloques = [df] if isinstance(df, pd.DataFrame) else df
     try:
         engine = create_engine(f'sqlite:///{db_path}')
-        df.to_sql('clientes', engine, if_exists='replace', index=False)
+        filas = 0
+        for i, bloque in enumerate(bloques):
+            datos = getattr(bloque, 'datos', bloque)
+            datos.to_sql('clientes', engine, if_exists='replace' if i == 0 else 'append', index=False)
+            filas += len(datos)
+            if progreso and hasattr(bloque, 'bytes_leidos'):
+                progreso(filas, bloque.bytes_leidos, bloque.bytes_totales)
         return True
     except Exception as e:
         print('Error al guardar en BD:', e)
-        return False
\ No newline at end of file
+        return False
@@ -1,12 +1,16 @@
 """Modelo de predicción de churn y utilidades de entrenamiento.
 
-Funciones principales:
-- entrenar_modelo(df, features, target)
-- guardar_modelo(model, path)
-- cargar_modelo(path)
+Funciones principales (las definiciones vigentes son las del final del archivo):
+- entrenar_modelo(df, features, target, algoritmo='rf')
+- guardar_modelo(model, metadata): publica una versión nueva en el registro
+  compartido con Django (`predicciones.registry`) y la activa
+- cargar_predictor(): modelo para puntuar; el bosque compilado y mapeado
+  (`cargar_bosque()`) si la versión lo tiene
+- cargar_modelo(): modelo de sklearn de la versión vigente, solo para
+  importancias y métricas
 - predecir_proba(model, X)
 
-Usa RandomForestClassifier por defecto y joblib para persistencia.
+Usa RandomForestClassifier por defecto.
 """
 from pathlib import Path
 import pandas as pd
@@ -130,8 +134,66 @@ def predecir_cliente(model, cliente_df, features):
     pred = int(proba > 0.5)
     return proba, pred
 
-def guardar_modelo(model, path='modelo_churn.pkl'):
-    joblib.dump(model, path)
+NOMBRE_REGISTRO = 'churn_dashboard'
 
-def cargar_modelo(path='modelo_churn.pkl'):
-    return joblib.load(path)
+
+def _predicciones(modulo):
+    """Importa `predicciones.<modulo>` (sin Django) aunque la app corra desde churn_dashboard/."""
+    import importlib
+    import sys
+    from pathlib import Path
+
+    raiz = str(Path(__file__).resolve().parent.parent)
+    if raiz not in sys.path:
+        sys.path.append(raiz)
+    return importlib.import_module(f'predicciones.{modulo}')
+
+
+def registro():
+    """Mismo registro de versiones que usa Django (`PREDICCIONES_MODEL_REGISTRY`)."""
+    import os
+    from pathlib import Path
+
+    raiz = os.getenv('PREDICCIONES_MODEL_REGISTRY') or Path(__file__).resolve().parent.parent / 'models'
+    return _predicciones('registry').RegistroModelos(raiz)
+
+
+def guardar_modelo(model, metadata=None):
+    """Publica el modelo como versión nueva del registro y la activa; devuelve la versión."""
+    artefactos = {'modelo': model}
+    # Exporta también el bosque compilado para inferencia de baja latencia
+    try:
+        artefactos['bosque'] = _predicciones('forest').BosqueCompilado.desde_sklearn(model)
+    except TypeError:
+        pass  # p.ej. LogisticRegression: no es un modelo de árboles
+    return registro().publicar(NOMBRE_REGISTRO, artefactos, metadata)
+
+_vigente = None
+
+def _version_vigente():
+    """Versión actual del registro; se recarga solo si cambió el puntero CURRENT."""
+    global _vigente
+    reg = registro()
+    version = reg.version_actual(NOMBRE_REGISTRO)
+    if version is None:
+        raise FileNotFoundError('No hay un modelo guardado en el registro')
+    if _vigente is None or _vigente.version != version:
+        _vigente = reg.cargar(NOMBRE_REGISTRO, version)
+    return _vigente
+
+def cargar_modelo():
+    return _version_vigente().modelo
+
+def cargar_bosque():
+    """Bosque compilado de la versión vigente; expone `predict_proba` igual que sklearn.
+
+    Se mapea de solo lectura, así que las sesiones de Streamlit y los workers
+    de Django que lo cargan comparten una sola copia en el page cache.
+    """
+    return _version_vigente().bosque
+
+def cargar_predictor():
+    """Lo que usa la app para puntuar: `cargar_bosque()`, o el modelo de sklearn si
+    la versión no tiene bosque (p.ej. LogisticRegression)."""
+    vigente = _version_vigente()
+    return vigente.bosque if vigente.tiene('bosque') else vigente.modelo
@@ -0,0 +1,126 @@
+"""Búsqueda de clientes por nombre, apellido, email y teléfono.
+
+En SQLite con FTS5 consulta la tabla virtual `clientes_cliente_fts` (creada y
+sincronizada por triggers en la migración 0006): cada palabra del término se
+busca como prefijo y los resultados se ordenan por bm25, pesando más nombre y
+apellido que email y teléfono. En otras bases de datos cae a `icontains`
+sobre los mismos campos, sin ranking.
+
+bm25 se calcula para cada coincidencia, así que un prefijo corto que aparece
+en cientos de miles de filas costaría cientos de ms. Por eso solo se rankean
+las primeras `CLIENTES_BUSQUEDA_MAX_CANDIDATOS` coincidencias (en orden de
+id): con pocas coincidencias el ranking es exacto y con muchas la consulta
+sigue acotada; refinar el término trae los mejores resultados.
+"""
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Cliente
+
+TABLA_FTS = 'clientes_cliente_fts'
+CAMPOS_BUSQUEDA = ('nombre', 'apellido', 'email', 'telefono')
+# Pesos bm25 en el orden de CAMPOS_BUSQUEDA
+PESOS = (10.0, 10.0, 5.0, 1.0)
+
+CAMPOS_RESULTADO = ('id', 'nombre', 'apellido', 'email', 'telefono', 'estado', 'nivel_riesgo', 'probabilidad_abandono')
+LIMITE = 20
+MAX_LIMITE = 100
+# Prefijos de una letra recorren casi todo el índice; se ignoran
+MIN_CARACTERES = 2
+MAX_CANDIDATOS = 2000
+
+MOTOR_FTS = 'fts5'
+MOTOR_ICONTAINS = 'icontains'
+
+
+@dataclass
+class ResultadoBusqueda:
+    termino: str
+    motor: str
+    clientes: list[dict] = field(default_factory=list)
+    segundos: float = 0.0
+
+    def como_dict(self) -> dict:
+        return {
+            'q': self.termino,
+            'motor': self.motor,
+            'resultados': self.clientes,
+            'milisegundos': round(self.segundos * 1000, 2),
+        }
+
+
+def palabras(termino: str) -> list[str]:
+    return [p for p in re.findall(r'\w+', termino.lower()) if len(p) >= MIN_CARACTERES]
+
+
+def fts_disponible(using: str | None = None) -> bool:
+    conexion = connections[using or router.db_for_read(Cliente)]
+    if conexion.vendor != 'sqlite':
+        return False
+    with conexion.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLA_FTS])
+        return cursor.fetchone() is not None
+
+
+def _ids_fts(palabras_: list[str], limite: int, using: str) -> list[int]:
+    # Cada palabra entre comillas (sin operadores FTS) y como prefijo; todas deben aparecer
+    consulta = ' '.join(f'"{p}"*' for p in palabras_)
+    pesos = ', '.join(str(p) for p in PESOS)
+    candidatos = getattr(settings, 'CLIENTES_BUSQUEDA_MAX_CANDIDATOS', MAX_CANDIDATOS)
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM ('
+            f'  SELECT rowid, bm25({TABLA_FTS}, {pesos}) AS puntaje FROM {TABLA_FTS}'
+            f'  WHERE {TABLA_FTS} MATCH %s LIMIT %s'
+            f') ORDER BY puntaje LIMIT %s',
+            [consulta, max(candidatos, limite), limite],
+        )
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def buscar(termino: str, limite: int = LIMITE, using: str | None = None) -> ResultadoBusqueda:
+    using = using or router.db_for_read(Cliente)
+    limite = max(1, min(limite, MAX_LIMITE))
+    inicio = time.perf_counter()
+    palabras_ = palabras(termino)
+
+    if fts_disponible(using):
+        resultado = ResultadoBusqueda(termino, MOTOR_FTS)
+        if palabras_:
+            ids = _ids_fts(palabras_, limite, using)
+            filas = {f['id']: f for f in Cliente.objects.using(using).filter(id__in=ids).values(*CAMPOS_RESULTADO)}
+            resultado.clientes = [filas[i] for i in ids if i in filas]
+    else:
+        resultado = ResultadoBusqueda(termino, MOTOR_ICONTAINS)
+        if palabras_:
+            condicion = Q()
+            for palabra in palabras_:
+                en_algun_campo = Q()
+                for campo in CAMPOS_BUSQUEDA:
+                    en_algun_campo |= Q(**{f'{campo}__icontains': palabra})
+                condicion &= en_algun_campo
+            resultado.clientes = list(
+                Cliente.objects.using(using).filter(condicion)
+                .order_by('apellido', 'nombre', 'id')
+                .values(*CAMPOS_RESULTADO)[:limite]
+            )
+
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+
+def reconstruir_indice(using: str | None = None) -> bool:
+    """Regenera el índice FTS desde `clientes_cliente`; False si no hay índice FTS."""
+    using = using or router.db_for_write(Cliente)
+    if not fts_disponible(using):
+        return False
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')")
+    return True
@@ -0,0 +1,115 @@
+"""Exportación de clientes a CSV (opcionalmente gzip) o XLSX con memoria constante.
+
+Las filas se leen por bloques con el mismo cursor keyset del listado
+(`clientes.listado.paginar`): cada bloque es una consulta corta sobre el
+índice del orden, sin un cursor abierto durante toda la descarga (en SQLite
+eso bloquearía a los escritores hasta terminar).
+
+El CSV se genera bloque a bloque y el encabezado sale antes de la primera
+consulta. El XLSX no se puede transmitir así: openpyxl en modo `write_only`
+escribe las filas a un archivo temporal (no a memoria), pero el zip solo se
+cierra al final y los bytes empiezan a salir cuando el libro está completo.
+Por eso el XLSX se limita a `max_filas_xlsx()` filas; las exportaciones
+grandes van por CSV o CSV.gz.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import os
+import tempfile
+import zlib
+from typing import Iterator
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+from . import listado
+
+COLUMNAS = (
+    'id', 'nombre', 'apellido', 'email', 'telefono', 'direccion', 'estado',
+    'nivel_riesgo', 'probabilidad_abandono', 'fecha_registro',
+)
+TAMANO_BLOQUE = 5000
+# Límite de filas por hoja de Excel (1.048.576 incluido el encabezado)
+FILAS_POR_HOJA = 1_048_575
+TAMANO_TROZO = 64 * 1024
+MAX_FILAS_XLSX = 100_000
+
+
+def max_filas_xlsx() -> int:
+    """Filas que admite una exportación XLSX (`CLIENTES_EXPORTACION_XLSX_MAX_FILAS`)."""
+    return getattr(settings, 'CLIENTES_EXPORTACION_XLSX_MAX_FILAS', MAX_FILAS_XLSX)
+
+
+def bloques(qs: QuerySet, orden: str = listado.ORDEN_POR_DEFECTO,
+            tamano_bloque: int = TAMANO_BLOQUE) -> Iterator[list[tuple]]:
+    """Filas de `qs` (tuplas en el orden de COLUMNAS) en bloques, siguiendo `orden`."""
+    qs = qs.values(*COLUMNAS)
+    cursor = None
+    while True:
+        pagina = listado.paginar(qs, orden, tamano_bloque, despues=cursor)
+        if pagina.clientes:
+            yield [tuple(fila[c] for c in COLUMNAS) for fila in pagina.clientes]
+        if not pagina.siguiente:
+            return
+        cursor = pagina.siguiente
+
+
+def _comprimir(trozos: Iterator[bytes]) -> Iterator[bytes]:
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: formato gzip
+    for trozo in trozos:
+        comprimido = compresor.compress(trozo)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def csv_en_trozos(qs: QuerySet, orden: str = listado.ORDEN_POR_DEFECTO, comprimir: bool = False,
+                  tamano_bloque: int = TAMANO_BLOQUE) -> Iterator[bytes]:
+    def trozos():
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        # BOM para que Excel abra el UTF-8 con acentos
+        escritor.writerow(COLUMNAS)
+        yield ('\ufeff' + buffer.getvalue()).encode('utf-8')
+        for filas in bloques(qs, orden, tamano_bloque):
+            buffer.seek(0)
+            buffer.truncate()
+            escritor.writerows(filas)
+            yield buffer.getvalue().encode('utf-8')
+
+    return _comprimir(trozos()) if comprimir else trozos()
+
+
+def xlsx_en_trozos(qs: QuerySet, orden: str = listado.ORDEN_POR_DEFECTO,
+                   tamano_bloque: int = TAMANO_BLOQUE) -> Iterator[bytes]:
+    """Libro XLSX de `qs`; el primer byte sale recién con el libro completo.
+
+    No limita las filas: quien lo llama debe comprobar `max_filas_xlsx()`.
+    """
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = None
+    en_hoja = 0
+    for filas in bloques(qs, orden, tamano_bloque):
+        for fila in filas:
+            if hoja is None or en_hoja >= FILAS_POR_HOJA:
+                hoja = libro.create_sheet(f'Clientes {len(libro.worksheets) + 1}')
+                hoja.append(COLUMNAS)
+                en_hoja = 0
+            hoja.append(fila)
+            en_hoja += 1
+    if hoja is None:
+        libro.create_sheet('Clientes 1').append(COLUMNAS)
+
+    descriptor, ruta = tempfile.mkstemp(suffix='.xlsx')
+    os.close(descriptor)
+    try:
+        libro.save(ruta)
+        with open(ruta, 'rb') as archivo:
+            while trozo := archivo.read(TAMANO_TROZO):
+                yield trozo
+    finally:
+        os.remove(ruta)
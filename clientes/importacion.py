@@ -0,0 +1,372 @@
+"""Importación de clientes desde CSV/Excel por bloques.
+
+El archivo se lee en streaming (`lectura.leer_por_bloques`) y cada bloque se
+valida y se guarda antes de leer el siguiente, así que la memoria no crece
+con el tamaño del archivo. La validación se hace con operaciones vectorizadas de pandas sobre todo el
+bloque (campos obligatorios, patrón de email, estado y riesgo); los emails ya
+existentes se buscan con una sola consulta `email__in` por bloque y las filas
+válidas se insertan con `bulk_create` dentro de una transacción.
+
+En modo `MODO_UPSERT` los emails existentes no se rechazan: las filas que
+cambian se actualizan con `bulk_create(update_conflicts=True)` sobre el
+índice único de `email` y las idénticas no se escriben. La puntuación
+(`nivel_riesgo`, `probabilidad_abandono`) es del modelo: el archivo solo la
+fija al insertar, nunca la pisa al actualizar.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from .lectura import Bloque, leer_por_bloques
+from .models import Cliente
+from .signals import clientes_actualizados_en_lote, clientes_creados_en_lote
+
+COLUMNAS = ('nombre', 'apellido', 'email', 'telefono', 'direccion', 'estado', 'nivel_riesgo')
+OBLIGATORIAS = ('nombre', 'apellido', 'email')
+
+# Mismo patrón que la validación original (re.match: anclado solo al inicio)
+PATRON_EMAIL = r'[^@]+@[^@]+\.[^@]+'
+
+MODO_INSERTAR = 'insertar'
+MODO_UPSERT = 'upsert'
+
+# Columna del archivo -> campos de Cliente que actualiza en modo upsert. Sin
+# 'nivel_riesgo': una celda vacía o inválida se lee como 'Bajo'/0.0 y borraría
+# la puntuación del modelo; en clientes existentes la recalcula recalcular_riesgo
+CAMPOS_UPSERT = {
+    'nombre': ('nombre',),
+    'apellido': ('apellido',),
+    'telefono': ('telefono',),
+    'direccion': ('direccion',),
+    'estado': ('estado',),
+}
+
+NIVELES = {'bajo': 'Bajo', 'medio': 'Medio', 'alto': 'Alto'}
+ESTADOS = {valor for valor, _ in Cliente.ESTADO_CHOICES}
+
+
+@dataclass
+class ResumenImportacion:
+    leidas: int = 0
+    # Insertadas; en modo upsert además se cuentan actualizadas y sin cambios
+    importadas: int = 0
+    actualizadas: int = 0
+    sin_cambios: int = 0
+    rechazadas: int = 0
+    # (fila del archivo, columna, motivo, valor); la fila 2 es la primera de datos
+    errores: list[tuple[int, str, str, str]] = field(default_factory=list)
+    segundos: float = 0.0
+
+    @property
+    def filas_por_segundo(self) -> float | None:
+        return round(self.leidas / self.segundos, 1) if self.segundos > 0 else None
+
+    def como_dict(self) -> dict:
+        return {
+            'leidas': self.leidas,
+            'importadas': self.importadas,
+            'actualizadas': self.actualizadas,
+            'sin_cambios': self.sin_cambios,
+            'rechazadas': self.rechazadas,
+            'segundos': round(self.segundos, 3),
+            'filas_por_segundo': self.filas_por_segundo,
+        }
+
+
+def _texto(df: pd.DataFrame, columna: str) -> pd.Series:
+    if columna not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    return df[columna].fillna('').astype(str).str.strip()
+
+
+def parsear_riesgo(serie: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """`nivel_riesgo` del archivo -> (nivel, probabilidad).
+
+    Acepta 'bajo'/'medio'/'alto' o una probabilidad (0..1 o porcentaje 0..100);
+    cualquier otro valor queda como 'Bajo' con probabilidad 0.
+    """
+    normalizado = serie.str.lower()
+    nivel_texto = normalizado.map(NIVELES)
+
+    numero = pd.to_numeric(serie.where(nivel_texto.isna()), errors='coerce')
+    probabilidad = numero.where(numero <= 1, numero / 100.0).clip(0.0, 1.0)
+    nivel_numero = pd.cut(
+        probabilidad, [-0.1, 0.3, 0.6, 1.1], right=False, labels=['Bajo', 'Medio', 'Alto'],
+    ).astype(object)
+
+    nivel = nivel_texto.fillna(nivel_numero).fillna('Bajo')
+    return nivel, probabilidad.fillna(0.0)
+
+
+def validar(df: pd.DataFrame, primera_fila: int = 2) -> tuple[pd.DataFrame, list[tuple[int, str, str, str]]]:
+    """Normaliza un bloque y separa las filas válidas de los errores.
+
+    No consulta la base de datos; los duplicados contra la base se resuelven
+    en `importar_dataframe`.
+    """
+    datos = pd.DataFrame({columna: _texto(df, columna) for columna in COLUMNAS})
+    datos.index = pd.RangeIndex(primera_fila, primera_fila + len(df))
+    errores: list[tuple[int, str, str, str]] = []
+
+    def rechazar(mascara: pd.Series, columna: str, motivo: str) -> pd.Series:
+        filas = datos.loc[mascara]
+        errores.extend(
+            (int(fila), columna, motivo, valor)
+            for fila, valor in filas[columna].items()
+        )
+        return ~mascara
+
+    vacia = pd.Series(False, index=datos.index)
+    for columna in OBLIGATORIAS:
+        vacia |= datos[columna] == ''
+    valida = rechazar(vacia, 'email', 'Campos obligatorios vacíos')
+
+    email_malo = valida & ~datos['email'].str.match(PATRON_EMAIL)
+    valida &= rechazar(email_malo, 'email', 'Email inválido')
+
+    datos['estado'] = datos['estado'].str.lower().replace('', 'activo')
+    estado_malo = valida & ~datos['estado'].isin(ESTADOS)
+    valida &= rechazar(estado_malo, 'estado', 'Estado inválido')
+
+    repetido = valida & datos['email'].where(valida).duplicated(keep='first')
+    valida &= rechazar(repetido, 'email', 'Email duplicado en el archivo')
+
+    datos = datos.loc[valida].copy()
+    datos['nivel_riesgo'], datos['probabilidad_abandono'] = parsear_riesgo(datos['nivel_riesgo'])
+    errores.sort()
+    return datos, errores
+
+
+def _cliente(fila) -> Cliente:
+    return Cliente(
+        nombre=fila.nombre,
+        apellido=fila.apellido,
+        email=fila.email,
+        telefono=fila.telefono or None,
+        direccion=fila.direccion or None,
+        estado=fila.estado,
+        nivel_riesgo=fila.nivel_riesgo,
+        probabilidad_abandono=fila.probabilidad_abandono,
+    )
+
+
+def _notificar_creados(creados: list[Cliente]) -> None:
+    # bulk_create no envía post_save; los KPIs del dashboard escuchan esta señal
+    if creados:
+        clientes_creados_en_lote.send(sender=Cliente, cantidad=len(creados), fecha=creados[0].fecha_registro)
+
+
+def _upsert(validas: pd.DataFrame, columnas_archivo, db: str, resumen: ResumenImportacion) -> None:
+    """Inserta los emails nuevos y actualiza solo las filas existentes que cambian."""
+    campos = [c for columna in CAMPOS_UPSERT if columna in columnas_archivo for c in CAMPOS_UPSERT[columna]]
+    existentes = {
+        fila['email']: fila
+        for fila in Cliente.objects.using(db)
+        .filter(email__in=validas['email'].tolist())
+        .values('email', 'datos_modificados_en', 'fecha_registro', *campos)
+    }
+    campos_modelo = [c for c in campos if c in Cliente.CAMPOS_MODELO]
+    ahora = timezone.now()
+
+    cambiadas = []
+    fechas_cambiadas = set()
+    nuevos = []
+    for fila in validas.itertuples(index=False):
+        actual = existentes.get(fila.email)
+        if actual is None:
+            nuevos.append(_cliente(fila))
+            continue
+        nuevo = _cliente(fila)
+        cambiados = [c for c in campos if getattr(nuevo, c) != actual[c]]
+        if not cambiados:
+            resumen.sin_cambios += 1
+            continue
+        # Igual que Cliente.save(): solo un cambio en CAMPOS_MODELO lo deja pendiente de puntuar
+        nuevo.datos_modificados_en = (
+            ahora if any(c in campos_modelo for c in cambiados) else actual['datos_modificados_en']
+        )
+        cambiadas.append(nuevo)
+        fechas_cambiadas.add(actual['fecha_registro'])
+
+    if cambiadas or nuevos:
+        Cliente.objects.using(db).bulk_create(
+            cambiadas + nuevos,
+            batch_size=1000,
+            update_conflicts=bool(campos),
+            unique_fields=['email'] if campos else None,
+            update_fields=[*campos, 'datos_modificados_en'] if campos else None,
+        )
+    _notificar_creados(nuevos)
+    if fechas_cambiadas:
+        clientes_actualizados_en_lote.send(sender=Cliente, cantidad=len(cambiadas), fechas=fechas_cambiadas)
+    resumen.actualizadas += len(cambiadas)
+    resumen.importadas += len(nuevos)
+
+
+def importar_dataframe(df: pd.DataFrame, tamano_bloque: int = 5000, primera_fila: int = 2,
+                       resumen: ResumenImportacion | None = None,
+                       modo: str = MODO_INSERTAR) -> ResumenImportacion:
+    """Valida e inserta (o, con `MODO_UPSERT`, inserta y actualiza) `df` por bloques.
+
+    Devuelve (o acumula en `resumen`) los conteos.
+    """
+    resumen = resumen or ResumenImportacion()
+    db = router.db_for_write(Cliente)
+    inicio = time.perf_counter()
+    for desde in range(0, len(df), tamano_bloque):
+        bloque = df.iloc[desde:desde + tamano_bloque]
+        validas, errores = validar(bloque, primera_fila=primera_fila + desde)
+
+        with transaction.atomic(using=db):
+            if modo == MODO_UPSERT:
+                _upsert(validas, df.columns, db, resumen)
+            else:
+                existentes = set(
+                    Cliente.objects.using(db)
+                    .filter(email__in=validas['email'].tolist())
+                    .values_list('email', flat=True)
+                )
+                if existentes:
+                    duplicada = validas['email'].isin(existentes)
+                    errores.extend(
+                        (int(fila), 'email', 'Email duplicado', email)
+                        for fila, email in validas.loc[duplicada, 'email'].items()
+                    )
+                    validas = validas.loc[~duplicada]
+
+                creados = Cliente.objects.using(db).bulk_create(
+                    [_cliente(fila) for fila in validas.itertuples(index=False)],
+                    batch_size=1000,
+                )
+                _notificar_creados(creados)
+                resumen.importadas += len(validas)
+
+        resumen.leidas += len(bloque)
+        resumen.rechazadas += len(bloque) - len(validas)
+        resumen.errores.extend(errores)
+    resumen.segundos += time.perf_counter() - inicio
+    return resumen
+
+
+def importar_archivo(archivo, nombre: str | None = None, tamano_bloque: int = 5000,
+                     progreso: Callable[[ResumenImportacion, int, int | None], None] | None = None,
+                     saltar: int = 0, resumen: ResumenImportacion | None = None,
+                     al_confirmar: Callable[[ResumenImportacion, int, Bloque], None] | None = None,
+                     modo: str = MODO_INSERTAR) -> ResumenImportacion:
+    """Importa el archivo bloque a bloque.
+
+    `progreso(resumen, bytes_leidos, bytes_totales)` se llama tras guardar
+    cada bloque. Para reanudar, `saltar` omite las primeras filas de datos ya
+    procesadas y `resumen` trae los conteos acumulados; `al_confirmar(resumen,
+    filas_procesadas, bloque)` corre dentro de la transacción de cada bloque,
+    así que lo que guarde se confirma junto con los clientes insertados.
+    """
+    inicio = time.perf_counter()
+    resumen = resumen or ResumenImportacion()
+    segundos_previos = resumen.segundos
+    db = router.db_for_write(Cliente)
+    for bloque in leer_por_bloques(archivo, nombre, tamano_bloque=tamano_bloque):
+        desde = bloque.primera_fila - 2
+        hasta = desde + len(bloque.datos)
+        if hasta <= saltar:
+            continue
+        datos = bloque.datos.iloc[max(0, saltar - desde):]
+
+        with transaction.atomic(using=db):
+            importar_dataframe(datos, tamano_bloque=tamano_bloque,
+                               primera_fila=bloque.primera_fila + max(0, saltar - desde), resumen=resumen,
+                               modo=modo)
+            resumen.segundos = segundos_previos + time.perf_counter() - inicio
+            if al_confirmar:
+                al_confirmar(resumen, hasta, bloque)
+        if progreso:
+            progreso(resumen, bloque.bytes_leidos, bloque.bytes_totales)
+    # Incluye la lectura del archivo
+    resumen.segundos = segundos_previos + time.perf_counter() - inicio
+    return resumen
+
+
+def directorio_importaciones() -> Path:
+    return Path(getattr(settings, 'CLIENTES_IMPORTACIONES_DIR', settings.BASE_DIR / 'importaciones'))
+
+
+def guardar_subida(archivo) -> Path:
+    """Copia el archivo subido a un directorio propio de la importación."""
+    directorio = directorio_importaciones() / uuid.uuid4().hex
+    directorio.mkdir(parents=True)
+    destino = directorio / Path(archivo.name).name
+    with open(destino, 'wb') as f:
+        for parte in archivo.chunks():
+            f.write(parte)
+    return destino
+
+
+def ruta_errores(ruta_archivo: Path | str) -> Path:
+    return Path(ruta_archivo).parent / 'errores.csv'
+
+
+def importar_en_trabajo(ruta: str, nombre: str, tamano_bloque: int = 5000, modo: str = MODO_INSERTAR,
+                        progreso: Callable[[str], None] | None = None, punto_control=None) -> dict:
+    """Importación como trabajo en segundo plano (`predicciones.jobs`), reanudable.
+
+    Tras cada bloque confirmado se guarda en el punto de control cuántas
+    filas se procesaron, los conteos y el tamaño del archivo de errores; al
+    reanudar se descartan las líneas de errores posteriores a ese punto y se
+    continúa en la fila siguiente. Los rechazos se escriben en `errores.csv`
+    (fila, columna, motivo, valor) en lugar de guardarse en memoria.
+    """
+    datos = punto_control.datos if punto_control is not None else {}
+    resumen = ResumenImportacion(
+        leidas=datos.get('leidas', 0),
+        importadas=datos.get('importadas', 0),
+        actualizadas=datos.get('actualizadas', 0),
+        sin_cambios=datos.get('sin_cambios', 0),
+        rechazadas=datos.get('rechazadas', 0),
+        segundos=datos.get('segundos', 0.0),
+    )
+    errores = ruta_errores(ruta)
+    with open(errores, 'a+b') as f:
+        f.truncate(datos.get('bytes_errores', 0))
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            f.write('fila,columna,motivo,valor\r\n'.encode())
+
+        def al_confirmar(resumen: ResumenImportacion, filas: int, bloque: Bloque) -> None:
+            if resumen.errores:
+                texto = io.StringIO()
+                csv.writer(texto).writerows(resumen.errores)
+                f.write(texto.getvalue().encode())
+                resumen.errores.clear()
+            f.flush()
+            os.fsync(f.fileno())
+            if punto_control is not None:
+                punto_control.guardar(
+                    filas=filas,
+                    bytes_errores=f.tell(),
+                    bytes_leidos=bloque.bytes_leidos,
+                    bytes_totales=bloque.bytes_totales,
+                    **resumen.como_dict(),
+                )
+            if progreso:
+                total = f' de {bloque.bytes_totales / 1e6:.1f} MB' if bloque.bytes_totales else ''
+                progreso(f'{resumen.leidas} filas ({bloque.bytes_leidos / 1e6:.1f}{total})')
+
+        with open(ruta, 'rb') as archivo:
+            importar_archivo(archivo, nombre, tamano_bloque=tamano_bloque, saltar=datos.get('filas', 0),
+                             resumen=resumen, al_confirmar=al_confirmar, modo=modo)
+
+    # El archivo original ya no hace falta; se conserva solo el de errores
+    Path(ruta).unlink(missing_ok=True)
+    return {**resumen.como_dict(), 'archivo_errores': str(errores) if resumen.rechazadas else None}
@@ -0,0 +1,158 @@
+"""Lectura por bloques de archivos CSV/Excel con memoria acotada.
+
+El CSV se lee con `pd.read_csv(chunksize=...)` y el XLSX fila a fila con
+openpyxl en modo `read_only`; en ningún caso se carga el archivo completo en
+un DataFrame. Cada `Bloque` indica cuántos bytes del archivo se llevan
+consumidos, para reportar progreso sobre el tamaño total.
+
+No depende de Django: también lo usa `churn_dashboard.data_importer`.
+"""
+from __future__ import annotations
+
+import io
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, time
+
+import pandas as pd
+
+
+class FormatoNoSoportado(ValueError):
+    """El archivo no es CSV ni Excel."""
+
+
+@dataclass
+class Bloque:
+    datos: pd.DataFrame
+    # Número de fila en el archivo de la primera fila del bloque (la 2 es la primera de datos)
+    primera_fila: int
+    bytes_leidos: int
+    bytes_totales: int | None
+
+
+class _LectorContado(io.RawIOBase):
+    """Envuelve un archivo binario y cuenta los bytes leídos."""
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.leidos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        datos = self.archivo.read(len(buffer))
+        n = len(datos)
+        buffer[:n] = datos
+        self.leidos += n
+        return n
+
+
+def tamano_total(archivo) -> int | None:
+    tamano = getattr(archivo, 'size', None)
+    if tamano is not None:
+        return tamano
+    try:
+        return os.fstat(archivo.fileno()).st_size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+    try:
+        posicion = archivo.tell()
+        archivo.seek(0, os.SEEK_END)
+        tamano = archivo.tell()
+        archivo.seek(posicion)
+        return tamano
+    except (AttributeError, OSError):
+        return None
+
+
+def _celda_texto(valor) -> str:
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        # Números enteros guardados como float en Excel (p.ej. teléfonos)
+        return str(int(valor))
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def _bloques_csv(archivo, tamano_bloque: int, como_texto: bool, total: int | None):
+    lector = _LectorContado(archivo)
+    opciones = {'dtype': str, 'keep_default_na': False} if como_texto else {}
+    fila = 2
+    for datos in pd.read_csv(io.BufferedReader(lector), chunksize=tamano_bloque, **opciones):
+        yield Bloque(datos.reset_index(drop=True), fila, lector.leidos, total)
+        fila += len(datos)
+
+
+def _bloque_xlsx(filas: list[list], columnas: list[str], primera_fila: int, total: int | None,
+                 filas_declaradas: int | None) -> Bloque:
+    # El XLSX es un zip: los bytes consumidos se estiman por la fracción de filas leídas
+    ultima = primera_fila + len(filas) - 1
+    if total is None:
+        leidos = 0
+    elif filas_declaradas:
+        leidos = min(total, int(total * ultima / filas_declaradas))
+    else:
+        leidos = total
+    return Bloque(pd.DataFrame(filas, columns=columnas), primera_fila, leidos, total)
+
+
+def _bloques_xlsx(archivo, tamano_bloque: int, como_texto: bool, total: int | None):
+    from openpyxl import load_workbook
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        hoja = libro.worksheets[0]
+        # max_row sale de la dimensión declarada en el archivo; puede faltar
+        filas_declaradas = hoja.max_row if total else None
+        filas = hoja.iter_rows(values_only=True)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return
+        columnas = [_celda_texto(c) for c in encabezado]
+        convertir = _celda_texto if como_texto else (lambda v: v)
+
+        # Como read_csv, las filas vacías se omiten (la numeración no las cuenta)
+        fila = 2
+        pendientes: list[list] = []
+        for valores in filas:
+            if all(v is None for v in valores):
+                continue
+            # Sin <dimension> las filas llegan con su propio largo: se recortan o rellenan al encabezado
+            valores = tuple(valores[:len(columnas)]) + (None,) * (len(columnas) - len(valores))
+            pendientes.append([convertir(v) for v in valores])
+            if len(pendientes) >= tamano_bloque:
+                yield _bloque_xlsx(pendientes, columnas, fila, total, filas_declaradas)
+                fila += len(pendientes)
+                pendientes = []
+        if pendientes:
+            yield _bloque_xlsx(pendientes, columnas, fila, total, None)
+    finally:
+        libro.close()
+
+
+def leer_por_bloques(archivo, nombre: str | None = None, tamano_bloque: int = 5000,
+                     como_texto: bool = True):
+    """Itera el archivo en `Bloque`s de hasta `tamano_bloque` filas.
+
+    Con `como_texto` todas las celdas llegan como str ('' si están vacías),
+    lo que conserva ceros a la izquierda. Los `.xls` antiguos no se pueden
+    leer en streaming: se cargan completos y se parten en bloques.
+    """
+    nombre = (nombre or getattr(archivo, 'name', '')).lower()
+    total = tamano_total(archivo)
+    if nombre.endswith('.csv'):
+        yield from _bloques_csv(archivo, tamano_bloque, como_texto, total)
+    elif nombre.endswith('.xlsx'):
+        yield from _bloques_xlsx(archivo, tamano_bloque, como_texto, total)
+    elif nombre.endswith('.xls'):
+        df = pd.read_excel(archivo, dtype=str if como_texto else None)
+        if como_texto:
+            df = df.fillna('')
+        for desde in range(0, len(df), tamano_bloque):
+            bloque = df.iloc[desde:desde + tamano_bloque].reset_index(drop=True)
+            yield Bloque(bloque, desde + 2, total if desde + tamano_bloque >= len(df) else 0, total)
+    else:
+        raise FormatoNoSoportado('Formato de archivo no soportado.')
@@ -0,0 +1,171 @@
+"""Listado de clientes con filtros y paginación por cursor (keyset).
+
+En vez de OFFSET, cada página continúa desde la última fila de la anterior:
+`WHERE (campo, id) < (valor, id_cursor) ORDER BY campo DESC, id DESC LIMIT n`.
+Con un índice sobre (campo, id) la página N cuesta lo mismo que la primera.
+El cursor es opaco para el cliente: base64 de `[valor, id]`.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+
+from .models import Cliente
+
+# orden -> (campo, descendente); el id desempata y hace el orden total
+ORDENES = {
+    '-riesgo': ('probabilidad_abandono', True),
+    'riesgo': ('probabilidad_abandono', False),
+    '-registro': ('fecha_registro', True),
+    'registro': ('fecha_registro', False),
+}
+ORDEN_POR_DEFECTO = '-riesgo'
+ETIQUETAS_ORDEN = {
+    '-riesgo': 'Mayor riesgo',
+    'riesgo': 'Menor riesgo',
+    '-registro': 'Más recientes',
+    'registro': 'Más antiguos',
+}
+
+POR_PAGINA = 50
+MAX_POR_PAGINA = 500
+
+
+class CursorInvalido(ValueError):
+    """El cursor no se puede decodificar o no corresponde al orden pedido."""
+
+
+@dataclass
+class Pagina:
+    clientes: list
+    orden: str
+    por_pagina: int
+    siguiente: str | None = None
+    anterior: str | None = None
+
+    def como_dict(self) -> dict:
+        return {
+            'resultados': self.clientes,
+            'orden': self.orden,
+            'por_pagina': self.por_pagina,
+            'siguiente': self.siguiente,
+            'anterior': self.anterior,
+        }
+
+
+def filtrar(qs: QuerySet, datos) -> QuerySet:
+    """Aplica los filtros `estado` y `nivel_riesgo` de `datos` (p.ej. request.GET).
+
+    Los valores que no son opciones válidas se ignoran.
+    """
+    estado = datos.get('estado')
+    if estado in dict(Cliente.ESTADO_CHOICES):
+        qs = qs.filter(estado=estado)
+    nivel = datos.get('nivel_riesgo')
+    if nivel in dict(Cliente.RIESGO_CHOICES):
+        qs = qs.filter(nivel_riesgo=nivel)
+    return qs
+
+
+def orden_de(datos) -> str:
+    orden = datos.get('orden')
+    return orden if orden in ORDENES else ORDEN_POR_DEFECTO
+
+
+def por_pagina_de(datos, defecto: int = POR_PAGINA) -> int:
+    try:
+        n = int(datos.get('por_pagina', defecto))
+    except (TypeError, ValueError):
+        n = defecto
+    return max(1, min(n, MAX_POR_PAGINA))
+
+
+def ordenar(qs: QuerySet, orden: str) -> QuerySet:
+    campo, descendente = ORDENES[orden]
+    prefijo = '-' if descendente else ''
+    return qs.order_by(f'{prefijo}{campo}', f'{prefijo}id')
+
+
+def _valor(fila, campo: str):
+    return fila[campo] if isinstance(fila, dict) else getattr(fila, campo)
+
+
+def codificar_cursor(fila, orden: str) -> str:
+    campo, _ = ORDENES[orden]
+    valor = _valor(fila, campo)
+    if hasattr(valor, 'isoformat'):
+        valor = valor.isoformat()
+    crudo = json.dumps([valor, _valor(fila, 'id')], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor: str, orden: str) -> tuple:
+    campo, _ = ORDENES[orden]
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valor, pk = json.loads(crudo)
+        return Cliente._meta.get_field(campo).to_python(valor), int(pk)
+    except (binascii.Error, ValueError, TypeError, ValidationError) as exc:
+        raise CursorInvalido('Cursor de paginación inválido.') from exc
+
+
+def _pasado(campo: str, descendente: bool, valor, pk: int) -> Q:
+    """Filas estrictamente después de (valor, pk) en el orden dado.
+
+    El rango sobre `campo` va aparte del OR para que el motor recorra el
+    índice (campo, id) desde el cursor en vez de evaluar el OR fila a fila.
+    """
+    op = 'lt' if descendente else 'gt'
+    return Q(**{f'{campo}__{op}e': valor}) & (Q(**{f'{campo}__{op}': valor}) | Q(**{f'id__{op}': pk}))
+
+
+def paginar(qs: QuerySet, orden: str = ORDEN_POR_DEFECTO, por_pagina: int = POR_PAGINA,
+            despues: str | None = None, antes: str | None = None) -> Pagina:
+    """Una página de `qs` ordenada por `orden`, después de `despues` o antes de `antes`.
+
+    `qs` puede ser de modelos o de `.values(...)` (debe incluir `id` y el campo del orden).
+    """
+    campo, descendente = ORDENES[orden]
+    if antes:
+        # Hacia atrás: se recorre en el orden inverso y se da vuelta la página
+        valor, pk = decodificar_cursor(antes, orden)
+        qs = ordenar(qs.filter(_pasado(campo, not descendente, valor, pk)), orden).reverse()
+    else:
+        if despues:
+            valor, pk = decodificar_cursor(despues, orden)
+            qs = qs.filter(_pasado(campo, descendente, valor, pk))
+        qs = ordenar(qs, orden)
+
+    filas = list(qs[:por_pagina + 1])
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if antes:
+        filas.reverse()
+        hay_siguiente, hay_anterior = True, hay_mas
+    else:
+        hay_siguiente, hay_anterior = hay_mas, bool(despues)
+
+    return Pagina(
+        clientes=filas,
+        orden=orden,
+        por_pagina=por_pagina,
+        siguiente=codificar_cursor(filas[-1], orden) if filas and hay_siguiente else None,
+        anterior=codificar_cursor(filas[0], orden) if filas and hay_anterior else None,
+    )
+
+
+def paginar_peticion(qs: QuerySet, datos, por_pagina: int = POR_PAGINA) -> Pagina:
+    """`filtrar` + `paginar` con los parámetros de la petición (orden, por_pagina, despues, antes)."""
+    orden = orden_de(datos)
+    return paginar(
+        filtrar(qs, datos),
+        orden=orden,
+        por_pagina=por_pagina_de(datos, por_pagina),
+        despues=datos.get('despues') or None,
+        antes=datos.get('antes') or None,
+    )
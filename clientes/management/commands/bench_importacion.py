@@ -0,0 +1,174 @@
+"""Benchmark de importación de clientes: por bloques vs fila a fila.
+
+Genera un CSV sintético (con ~2% de filas inválidas y algunos emails ya
+existentes), lo importa con `importar_archivo` y, para tamaños hasta
+`--legado-hasta`, con el camino anterior (`iterrows` + `exists()` +
+`create()` por fila). Cada corrida se deshace al terminar.
+
+Con `--upsert` se cargan primero `n` clientes y se reimporta una versión del
+archivo con ~10% de filas modificadas y ~5% nuevas, comparando el modo upsert
+con borrar y volver a insertar los emails del archivo.
+
+    python manage.py bench_importacion --filas 10000 100000 1000000
+    python manage.py bench_importacion --upsert --filas 10000 100000
+"""
+from __future__ import annotations
+
+import io
+import random
+import re
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from clientes.importacion import MODO_UPSERT, importar_archivo, importar_dataframe
+from clientes.lectura import leer_por_bloques
+from clientes.models import Cliente
+
+
+def _csv_sintetico(n: int, existentes: list[str]) -> bytes:
+    rnd = random.Random(42)
+    filas = []
+    for i in range(n):
+        email = f'bench{i}@ejemplo.com'
+        nombre = f'Nombre{i}'
+        suerte = rnd.random()
+        if suerte < 0.01:
+            email = f'invalido{i}'
+        elif suerte < 0.02:
+            nombre = ''
+        elif suerte < 0.03 and existentes:
+            email = rnd.choice(existentes)
+        filas.append({
+            'nombre': nombre,
+            'apellido': 'Apellido',
+            'email': email,
+            'telefono': f'0{5_550_000 + i}',
+            'direccion': 'Calle 1',
+            'estado': rnd.choice(['activo', 'inactivo']),
+            'nivel_riesgo': rnd.choice(['Bajo', 'medio', 'ALTO', '0.45', '72', '']),
+        })
+    return pd.DataFrame(filas).to_csv(index=False).encode()
+
+
+def _importar_legado(contenido: bytes) -> int:
+    """Camino anterior: dos consultas por fila."""
+    df = pd.read_csv(io.BytesIO(contenido))
+    creadas = 0
+    for _, row in df.iterrows():
+        email = str(row.get('email', '')).strip()
+        nombre = str(row.get('nombre', '')).strip()
+        apellido = str(row.get('apellido', '')).strip()
+        if not nombre or not apellido or not email:
+            continue
+        if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
+            continue
+        if Cliente.objects.filter(email=email).exists():
+            continue
+        Cliente.objects.create(
+            nombre=nombre, apellido=apellido, email=email,
+            telefono=row.get('telefono', ''), direccion=row.get('direccion', ''),
+            estado=row.get('estado', 'activo'),
+        )
+        creadas += 1
+    return creadas
+
+
+def _csv_actualizado(n: int) -> tuple[bytes, bytes]:
+    """(archivo inicial limpio, archivo con ~10% de filas cambiadas y ~5% nuevas)."""
+    rnd = random.Random(7)
+    base = pd.DataFrame({
+        'nombre': [f'Nombre{i}' for i in range(n)],
+        'apellido': 'Apellido',
+        'email': [f'upsert{i}@ejemplo.com' for i in range(n)],
+        'telefono': [f'0{5_550_000 + i}' for i in range(n)],
+        'direccion': 'Calle 1',
+        'estado': 'activo',
+        'nivel_riesgo': 'Bajo',
+    })
+    nuevo = base.copy()
+    cambiadas = [i for i in range(n) if rnd.random() < 0.10]
+    nuevo.loc[cambiadas, 'direccion'] = 'Calle 2'
+    nuevo.loc[cambiadas[::2], 'estado'] = 'inactivo'
+    extra = base.head(n // 20).copy()
+    extra['email'] = [f'upsert-nuevo{i}@ejemplo.com' for i in range(len(extra))]
+    nuevo = pd.concat([nuevo, extra], ignore_index=True)
+    return base.to_csv(index=False).encode(), nuevo.to_csv(index=False).encode()
+
+
+def _borrar_y_reinsertar(contenido: bytes, tamano_bloque: int) -> int:
+    """Alternativa al upsert: borra los emails de cada bloque y lo vuelve a insertar."""
+    insertadas = 0
+    for bloque in leer_por_bloques(io.BytesIO(contenido), 'bench.csv', tamano_bloque=tamano_bloque):
+        with transaction.atomic():
+            Cliente.objects.filter(email__in=bloque.datos['email'].tolist()).delete()
+            insertadas += importar_dataframe(bloque.datos, tamano_bloque=tamano_bloque).importadas
+    return insertadas
+
+
+def _medir(funcion, preparar=None) -> tuple[float, object]:
+    with transaction.atomic():
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        segundos = time.perf_counter() - inicio
+        transaction.set_rollback(True)
+    return segundos, resultado
+
+
+class Command(BaseCommand):
+    help = 'Mide el throughput de importar clientes por bloques contra el camino fila a fila (o del upsert).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--tamano-bloque', type=int, default=5000)
+        parser.add_argument('--legado-hasta', type=int, default=10_000,
+                            help='Tamaño máximo al que también se mide el camino fila a fila.')
+        parser.add_argument('--upsert', action='store_true',
+                            help='Compara el modo upsert con borrar y reinsertar sobre clientes ya cargados.')
+
+    def handle(self, *args, filas, tamano_bloque, legado_hasta, upsert, **options):
+        if upsert:
+            return self._comparar_upsert(filas, tamano_bloque)
+        existentes = list(Cliente.objects.values_list('email', flat=True)[:1000])
+        self.stdout.write(f"{'filas':>10} {'modo':<10} {'segundos':>10} {'filas/s':>10} {'importadas':>11}")
+        for n in filas:
+            contenido = _csv_sintetico(n, existentes)
+
+            segundos, resumen = _medir(lambda: importar_archivo(
+                io.BytesIO(contenido), nombre='bench.csv', tamano_bloque=tamano_bloque,
+            ))
+            self.stdout.write(f'{n:>10} {"bloques":<10} {segundos:>10.2f} {n / segundos:>10.0f} {resumen.importadas:>11}')
+
+            if n <= legado_hasta:
+                segundos, creadas = _medir(lambda: _importar_legado(contenido))
+                self.stdout.write(f'{n:>10} {"fila":<10} {segundos:>10.2f} {n / segundos:>10.0f} {creadas:>11}')
+
+    def _comparar_upsert(self, filas, tamano_bloque):
+        self.stdout.write(
+            f"{'filas':>10} {'modo':<18} {'segundos':>10} {'filas/s':>10} "
+            f"{'insertadas':>11} {'actualizadas':>13} {'sin cambios':>12}"
+        )
+        for n in filas:
+            inicial, actualizado = _csv_actualizado(n)
+            total = n + n // 20
+
+            def cargar():
+                importar_archivo(io.BytesIO(inicial), nombre='bench.csv', tamano_bloque=tamano_bloque)
+
+            segundos, resumen = _medir(lambda: importar_archivo(
+                io.BytesIO(actualizado), nombre='bench.csv', tamano_bloque=tamano_bloque, modo=MODO_UPSERT,
+            ), preparar=cargar)
+            self.stdout.write(
+                f'{n:>10} {"upsert":<18} {segundos:>10.2f} {total / segundos:>10.0f} '
+                f'{resumen.importadas:>11} {resumen.actualizadas:>13} {resumen.sin_cambios:>12}'
+            )
+
+            segundos, insertadas = _medir(lambda: _borrar_y_reinsertar(actualizado, tamano_bloque), preparar=cargar)
+            self.stdout.write(
+                f'{n:>10} {"borrar+reinsertar":<18} {segundos:>10.2f} {total / segundos:>10.0f} '
+                f'{insertadas:>11} {"-":>13} {"-":>12}'
+            )
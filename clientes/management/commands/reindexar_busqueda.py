@@ -0,0 +1,25 @@
+"""Regenera el índice FTS5 de búsqueda de clientes desde la tabla.
+
+Los triggers lo mantienen al día; esto hace falta solo si se escribió en
+`clientes_cliente` con los triggers desactivados o tras restaurar un volcado.
+
+    python manage.py reindexar_busqueda
+"""
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from clientes.busqueda import reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = 'Regenera el índice FTS5 de búsqueda de clientes.'
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        if not reconstruir_indice():
+            self.stdout.write(self.style.WARNING('La base de datos no tiene índice FTS5; la búsqueda usa icontains.'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Índice de búsqueda regenerado en {time.perf_counter() - inicio:.2f} s'))
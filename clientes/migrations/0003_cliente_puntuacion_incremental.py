@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_cliente_riesgo_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='datos_modificados_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='puntuado_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='version_modelo',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
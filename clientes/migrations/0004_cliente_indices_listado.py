@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0003_cliente_puntuacion_incremental'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['probabilidad_abandono', 'id'], name='clientes_prob_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['fecha_registro', 'id'], name='clientes_registro_id_idx'),
+        ),
+    ]
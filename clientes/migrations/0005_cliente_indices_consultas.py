@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0004_cliente_indices_listado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['estado', 'probabilidad_abandono', 'id'], name='clientes_estado_prob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['estado', 'fecha_registro', 'id'], name='clientes_estado_registro_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['nivel_riesgo', 'probabilidad_abandono', 'id'], name='clientes_nivel_prob_idx'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+"""Índice FTS5 de búsqueda sobre nombre, apellido, email y teléfono (solo SQLite).
+
+La tabla virtual usa `clientes_cliente` como contenido externo y se mantiene
+con triggers, así que la cubren `save()`, `delete()`, `bulk_create` y el
+upsert de la importación sin código adicional. En otras bases de datos, o si
+SQLite no tiene FTS5, la migración no hace nada y la búsqueda usa `icontains`.
+"""
+from django.db import migrations
+
+CREAR = [
+    """
+    CREATE VIRTUAL TABLE clientes_cliente_fts USING fts5(
+        nombre, apellido, email, telefono,
+        content='clientes_cliente', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER clientes_cliente_fts_ai AFTER INSERT ON clientes_cliente BEGIN
+        INSERT INTO clientes_cliente_fts(rowid, nombre, apellido, email, telefono)
+        VALUES (new.id, new.nombre, new.apellido, new.email, new.telefono);
+    END
+    """,
+    """
+    CREATE TRIGGER clientes_cliente_fts_ad AFTER DELETE ON clientes_cliente BEGIN
+        INSERT INTO clientes_cliente_fts(clientes_cliente_fts, rowid, nombre, apellido, email, telefono)
+        VALUES ('delete', old.id, old.nombre, old.apellido, old.email, old.telefono);
+    END
+    """,
+    # Solo las columnas indexadas: el recálculo de riesgo no toca el índice
+    """
+    CREATE TRIGGER clientes_cliente_fts_au AFTER UPDATE OF nombre, apellido, email, telefono
+    ON clientes_cliente BEGIN
+        INSERT INTO clientes_cliente_fts(clientes_cliente_fts, rowid, nombre, apellido, email, telefono)
+        VALUES ('delete', old.id, old.nombre, old.apellido, old.email, old.telefono);
+        INSERT INTO clientes_cliente_fts(rowid, nombre, apellido, email, telefono)
+        VALUES (new.id, new.nombre, new.apellido, new.email, new.telefono);
+    END
+    """,
+    "INSERT INTO clientes_cliente_fts(clientes_cliente_fts) VALUES ('rebuild')",
+]
+
+BORRAR = [
+    'DROP TRIGGER IF EXISTS clientes_cliente_fts_au',
+    'DROP TRIGGER IF EXISTS clientes_cliente_fts_ad',
+    'DROP TRIGGER IF EXISTS clientes_cliente_fts_ai',
+    'DROP TABLE IF EXISTS clientes_cliente_fts',
+]
+
+
+def _fts5_disponible(schema_editor) -> bool:
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def crear_indice(apps, schema_editor):
+    if _fts5_disponible(schema_editor):
+        for sql in CREAR:
+            schema_editor.execute(sql)
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in BORRAR:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0005_cliente_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
@@ -1,8 +1,38 @@
 from django.db import models
+from django.utils import timezone
 
 # clientes/models.py
 from django.db import models
 
+
+class ClienteQuerySet(models.QuerySet):
+    """`update()` y `bulk_update()` no pasan por `Cliente.save()`: aquí se marca
+    `datos_modificados_en` cuando escriben algún campo de `CAMPOS_MODELO`
+    (aunque el valor no cambie). Si la misma escritura registra una
+    puntuación (`puntuado_en`), es salida del modelo y no se marca.
+    """
+
+    @staticmethod
+    def _cambia_datos(campos) -> bool:
+        return 'puntuado_en' not in campos and any(c in campos for c in Cliente.CAMPOS_MODELO)
+
+    def update(self, **kwargs):
+        if self._cambia_datos(kwargs):
+            kwargs.setdefault('datos_modificados_en', timezone.now())
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        fields = list(fields)
+        if self._cambia_datos(fields):
+            objs = list(objs)
+            ahora = timezone.now()
+            for obj in objs:
+                obj.datos_modificados_en = ahora
+            if 'datos_modificados_en' not in fields:
+                fields.append('datos_modificados_en')
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+
 class Cliente(models.Model):
     ESTADO_CHOICES = [
         ('activo', 'Activo'),
@@ -29,6 +59,88 @@ class Cliente(models.Model):
     # Probabilidad (0..1) calculada por el modelo, útil para ordenar/filtrar
     probabilidad_abandono = models.FloatField(default=0.0)
 
+    # Columnas que lee el modelo de abandono (ver predicciones.scoring)
+    CAMPOS_MODELO = ('telefono', 'estado', 'nivel_riesgo')
+
+    # Recálculo incremental: un cliente está pendiente si nunca se puntuó, si
+    # sus CAMPOS_MODELO cambiaron después de puntuarlo o si lo puntuó otra versión.
+    # Lo marcan save(), ClienteQuerySet.update()/bulk_update() y el upsert de
+    # clientes.importacion.
+    #
+    # nivel_riesgo es entrada y salida del modelo. Cuando se escribe junto con
+    # una puntuación (registrar_puntuacion, recálculo) es salida y no marca el
+    # cliente: la probabilidad guardada se calculó con el nivel anterior y el
+    # cliente queda al día hasta que cambien sus datos o la versión. Marcarlo
+    # lo volvería a puntuar en cada corrida sin llegar a un punto fijo.
+    datos_modificados_en = models.DateTimeField(null=True, blank=True, editable=False)
+    puntuado_en = models.DateTimeField(null=True, blank=True, editable=False)
+    version_modelo = models.CharField(max_length=64, blank=True, default='', editable=False)
+
+    objects = ClienteQuerySet.as_manager()
+
+    class Meta:
+        # Cada índice sirve también como índice simple de su primera columna
+        # (fecha_registro, estado, nivel_riesgo, probabilidad_abandono).
+        # Las consultas cubiertas se verifican con EXPLAIN en clientes/tests.py
+        indexes = [
+            # Cursores del listado (ver clientes.listado) y umbrales de probabilidad
+            models.Index(fields=['probabilidad_abandono', 'id'], name='clientes_prob_id_idx'),
+            # Listado por registro y conteo de los últimos 30 días del dashboard
+            models.Index(fields=['fecha_registro', 'id'], name='clientes_registro_id_idx'),
+            # Listado filtrado por estado / nivel, ordenado por riesgo o registro
+            models.Index(fields=['estado', 'probabilidad_abandono', 'id'], name='clientes_estado_prob_idx'),
+            models.Index(fields=['estado', 'fecha_registro', 'id'], name='clientes_estado_registro_idx'),
+            models.Index(fields=['nivel_riesgo', 'probabilidad_abandono', 'id'], name='clientes_nivel_prob_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._guardar_originales()
+        return instancia
+
+    def _guardar_originales(self):
+        # Solo los campos cargados (los diferidos no están en __dict__)
+        self._originales = {
+            campo: self.__dict__[campo]
+            for campo in self.CAMPOS_MODELO + ('puntuado_en',)
+            if campo in self.__dict__
+        }
+
+    def save(self, *args, **kwargs):
+        originales = getattr(self, '_originales', None)
+        if originales is None:
+            cambiaron = True
+        else:
+            # Si este save registra una puntuación, el nivel_riesgo nuevo es
+            # salida del modelo, no un cambio de datos
+            puntuando = 'puntuado_en' in originales and originales['puntuado_en'] != self.puntuado_en
+            cambiaron = not puntuando and any(
+                valor != getattr(self, campo) for campo, valor in originales.items() if campo != 'puntuado_en'
+            )
+        if cambiaron:
+            self.datos_modificados_en = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'datos_modificados_en'}
+        super().save(*args, **kwargs)
+        self._guardar_originales()
+
+    def registrar_puntuacion(self, probabilidad: float, version: str) -> None:
+        """Asigna probabilidad, nivel y versión del modelo (sin guardar)."""
+        self.probabilidad_abandono = probabilidad
+        self.nivel_riesgo = self.nivel_desde_probabilidad(probabilidad)
+        self.puntuado_en = timezone.now()
+        self.version_modelo = version
+
+    @staticmethod
+    def nivel_desde_probabilidad(probabilidad: float) -> str:
+        if probabilidad < 0.3:
+            return 'Bajo'
+        if probabilidad < 0.6:
+            return 'Medio'
+        return 'Alto'
+
     def __str__(self):
         return f"{self.nombre} {self.apellido} ({self.email})"
 
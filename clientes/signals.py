@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+# Enviada tras insertar clientes con bulk_create (que no dispara post_save).
+# Argumentos: cantidad (int), fecha (date de fecha_registro)
+clientes_creados_en_lote = Signal()
+
+# Enviada tras actualizar clientes existentes con bulk_create(update_conflicts) en la importación.
+# Argumentos: cantidad (int), fechas (set de date de fecha_registro de las filas actualizadas)
+clientes_actualizados_en_lote = Signal()
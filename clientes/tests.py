@@ -1,3 +1,603 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from predicciones.jobs import get_runner
+from predicciones.models import Trabajo
+
+from . import busqueda, exportacion, importacion, listado
+from .importacion import (
+    MODO_UPSERT, guardar_subida, importar_archivo, importar_dataframe, parsear_riesgo, ruta_errores, validar,
+)
+from .lectura import FormatoNoSoportado, leer_por_bloques
+from .models import Cliente
+
+TABLA = Cliente._meta.db_table
+
+
+def plan_de_consulta(sql: str, params=()) -> list[str]:
+    """Pasos de `EXPLAIN QUERY PLAN` (SQLite) para una consulta."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [fila[-1] for fila in cursor.fetchall()]
+
+
+def escaneos_completos(plan: list[str], tabla: str = TABLA) -> list[str]:
+    """Pasos que recorren `tabla` entera sin índice ('SCAN tabla' sin 'USING ... INDEX')."""
+    patron = re.compile(rf'^SCAN {re.escape(tabla)}\b(?!.*\bINDEX\b)')
+    return [paso for paso in plan if patron.match(paso)]
+
+
+class PlanesDeConsulta:
+    """Captura las consultas de un bloque y explica las SELECT sobre `tabla`.
+
+        with PlanesDeConsulta() as planes:
+            self.client.get(...)
+        self.assertEqual(planes.escaneos_completos(), [])
+    """
+
+    def __init__(self, tabla: str = TABLA):
+        self.tabla = tabla
+        self.capturadas = CaptureQueriesContext(connection)
+
+    def __enter__(self):
+        self.capturadas.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.capturadas.__exit__(*exc)
+
+    def consultas(self) -> list[str]:
+        return [
+            q['sql'] for q in self.capturadas.captured_queries
+            if q['sql'].lstrip().upper().startswith('SELECT') and f'"{self.tabla}"' in q['sql']
+        ]
+
+    def escaneos_completos(self) -> list[tuple[str, list[str]]]:
+        """(sql, pasos con escaneo completo) de cada consulta que recorre la tabla entera."""
+        resultado = []
+        for sql in self.consultas():
+            escaneos = escaneos_completos(plan_de_consulta(sql), self.tabla)
+            if escaneos:
+                resultado.append((sql, escaneos))
+        return resultado
+
+
+class DatosModificadosTests(TestCase):
+    def setUp(self):
+        Cliente.objects.create(nombre='N', apellido='A', email='a@ejemplo.com', telefono='1')
+        self.cliente = Cliente.objects.get(email='a@ejemplo.com')
+        self.marca = self.cliente.datos_modificados_en
+
+    def marca_actual(self):
+        return Cliente.objects.values_list('datos_modificados_en', flat=True).get(pk=self.cliente.pk)
+
+    def test_save_marca_solo_campos_del_modelo(self):
+        self.assertIsNotNone(self.marca)
+        self.cliente.nombre = 'Otro'
+        self.cliente.save()
+        self.assertEqual(self.marca_actual(), self.marca)
+
+        self.cliente.telefono = '2'
+        self.cliente.save(update_fields=['telefono'])
+        self.assertGreater(self.marca_actual(), self.marca)
+
+    def test_puntuar_no_marca(self):
+        self.cliente.registrar_puntuacion(0.9, 'v1')
+        self.cliente.save(update_fields=['probabilidad_abandono', 'nivel_riesgo', 'puntuado_en', 'version_modelo'])
+        self.assertEqual(self.cliente.nivel_riesgo, 'Alto')
+        self.assertEqual(self.marca_actual(), self.marca)
+
+    def test_update_y_bulk_update_marcan(self):
+        Cliente.objects.filter(pk=self.cliente.pk).update(nombre='Otro')
+        self.assertEqual(self.marca_actual(), self.marca)
+        Cliente.objects.filter(pk=self.cliente.pk).update(estado='inactivo')
+        marca_update = self.marca_actual()
+        self.assertGreater(marca_update, self.marca)
+        # Con puntuado_en es una puntuación: no marca
+        Cliente.objects.filter(pk=self.cliente.pk).update(nivel_riesgo='Alto', puntuado_en=timezone.now())
+        self.assertEqual(self.marca_actual(), marca_update)
+
+        self.cliente.telefono = '3'
+        Cliente.objects.bulk_update([self.cliente], ['telefono'])
+        self.assertGreater(self.marca_actual(), marca_update)
+
+
+class ValidacionImportacionTests(TestCase):
+    def test_validar_normaliza_y_reporta_filas_del_archivo(self):
+        df = pd.DataFrame({
+            'nombre': [' Ana ', 'Luis', '', 'Eva', 'Juan', 'Rosa'],
+            'apellido': ['Ruiz', 'Paz', 'Sol', 'Mar', 'Gil', 'Luz'],
+            'email': ['ana@ejemplo.com', 'luis@', 'sol@ejemplo.com', 'eva@ejemplo.com', 'ana@ejemplo.com', 'rosa@ejemplo.com'],
+            'estado': ['', 'activo', 'activo', 'dormido', 'activo', 'INACTIVO'],
+            'nivel_riesgo': ['alto', '', '', '', '', '0.45'],
+        })
+        validas, errores = validar(df, primera_fila=10)
+
+        self.assertEqual(validas.index.tolist(), [10, 15])
+        self.assertEqual(validas['nombre'].tolist(), ['Ana', 'Rosa'])
+        self.assertEqual(validas['estado'].tolist(), ['activo', 'inactivo'])
+        self.assertEqual(validas['nivel_riesgo'].tolist(), ['Alto', 'Medio'])
+        self.assertEqual(validas['probabilidad_abandono'].tolist(), [0.0, 0.45])
+        # Ordenados por fila; cada fila se rechaza por el primer motivo
+        self.assertEqual(errores, [
+            (11, 'email', 'Email inválido', 'luis@'),
+            (12, 'email', 'Campos obligatorios vacíos', 'sol@ejemplo.com'),
+            (13, 'estado', 'Estado inválido', 'dormido'),
+            (14, 'email', 'Email duplicado en el archivo', 'ana@ejemplo.com'),
+        ])
+
+    def test_validar_sin_columnas_opcionales(self):
+        df = pd.DataFrame({'nombre': ['Ana'], 'apellido': ['Ruiz'], 'email': ['ana@ejemplo.com']})
+        validas, errores = validar(df)
+        self.assertEqual(errores, [])
+        self.assertEqual(validas.loc[2, ['telefono', 'estado', 'nivel_riesgo']].tolist(), ['', 'activo', 'Bajo'])
+
+    def test_parsear_riesgo(self):
+        serie = pd.Series(['BAJO', 'Medio', 'alto', '0.1', '0.3', '0.75', '45', '150', '-2', 'x', ''])
+        nivel, probabilidad = parsear_riesgo(serie)
+        self.assertEqual(nivel.tolist(), [
+            'Bajo', 'Medio', 'Alto', 'Bajo', 'Medio', 'Alto', 'Medio', 'Alto', 'Bajo', 'Bajo', 'Bajo',
+        ])
+        self.assertEqual(probabilidad.tolist(), [0.0, 0.0, 0.0, 0.1, 0.3, 0.75, 0.45, 1.0, 0.0, 0.0, 0.0])
+
+    def test_importar_dataframe_una_consulta_de_emails_por_bloque(self):
+        Cliente.objects.create(nombre='Ya', apellido='Existe', email='c2@ejemplo.com')
+        df = pd.DataFrame({
+            'nombre': [f'N{i}' for i in range(5)],
+            'apellido': ['A'] * 5,
+            'email': [f'c{i}@ejemplo.com' for i in range(5)],
+            'nivel_riesgo': ['alto'] * 5,
+        })
+        with CaptureQueriesContext(connection) as consultas:
+            resumen = importar_dataframe(df, tamano_bloque=3)
+
+        self.assertEqual((resumen.leidas, resumen.importadas, resumen.rechazadas), (5, 4, 1))
+        self.assertEqual(resumen.errores, [(4, 'email', 'Email duplicado', 'c2@ejemplo.com')])
+        sql = [q['sql'] for q in consultas.captured_queries]
+        self.assertEqual(sum(s.startswith('SELECT') and TABLA in s for s in sql), 2)
+        self.assertEqual(sum(s.startswith('INSERT INTO') and f'"{TABLA}"' in s for s in sql), 2)
+        self.assertEqual(Cliente.objects.filter(nivel_riesgo='Alto').count(), 4)
+
+
+def csv_de_clientes(n: int, desde: int = 0) -> bytes:
+    lineas = ['nombre,apellido,email,telefono']
+    lineas += [f'N{i},A{i},c{i}@ejemplo.com,0{i:09d}' for i in range(desde, desde + n)]
+    return ('\n'.join(lineas) + '\n').encode()
+
+
+class LecturaPorBloquesTests(TestCase):
+    def test_csv_por_bloques_con_bytes_leidos(self):
+        contenido = csv_de_clientes(10)
+        bloques = list(leer_por_bloques(io.BytesIO(contenido), 'clientes.csv', tamano_bloque=4))
+
+        self.assertEqual([len(b.datos) for b in bloques], [4, 4, 2])
+        self.assertEqual([b.primera_fila for b in bloques], [2, 6, 10])
+        self.assertEqual({b.bytes_totales for b in bloques}, {len(contenido)})
+        self.assertEqual(bloques[-1].bytes_leidos, len(contenido))
+        leidos = [b.bytes_leidos for b in bloques]
+        self.assertEqual(leidos, sorted(leidos))
+        # Como texto: conserva los ceros a la izquierda
+        self.assertEqual(bloques[0].datos.loc[0, 'telefono'], '0000000000')
+
+    def test_xlsx_por_bloques_omite_filas_vacias(self):
+        from openpyxl import Workbook
+
+        libro = Workbook()
+        hoja = libro.active
+        hoja.append(['nombre', 'apellido', 'email', 'telefono'])
+        for i in range(5):
+            hoja.append([f'N{i}', f'A{i}', f'c{i}@ejemplo.com', 991234560 + i])
+            if i == 1:
+                hoja.append([None, None, None, None])
+        archivo = io.BytesIO()
+        libro.save(archivo)
+        archivo.seek(0)
+
+        bloques = list(leer_por_bloques(archivo, 'clientes.xlsx', tamano_bloque=2))
+        self.assertEqual([len(b.datos) for b in bloques], [2, 2, 1])
+        self.assertEqual([b.primera_fila for b in bloques], [2, 4, 6])
+        self.assertEqual(bloques[1].datos['email'].tolist(), ['c2@ejemplo.com', 'c3@ejemplo.com'])
+        self.assertEqual(bloques[0].datos.loc[0, 'telefono'], '991234560')
+        self.assertEqual(bloques[-1].bytes_leidos, bloques[-1].bytes_totales)
+
+    def test_xlsx_con_filas_de_distinto_largo(self):
+        import re
+        import zipfile
+
+        from openpyxl import Workbook
+
+        libro = Workbook()
+        hoja = libro.active
+        hoja.append(['nombre', 'apellido', 'email', 'telefono'])
+        hoja.append(['N0', 'A0'])
+        hoja.append(['N1', 'A1', 'c1@ejemplo.com', '0991234561', 'sobra'])
+        original = io.BytesIO()
+        libro.save(original)
+
+        # Sin <dimension> (como lo escriben otras herramientas) openpyxl no rellena las filas
+        archivo = io.BytesIO()
+        with zipfile.ZipFile(original) as origen, zipfile.ZipFile(archivo, 'w') as destino:
+            for item in origen.infolist():
+                contenido = origen.read(item.filename)
+                if item.filename == 'xl/worksheets/sheet1.xml':
+                    contenido = re.sub(rb'<dimension[^>]*/>', b'', contenido)
+                destino.writestr(item, contenido)
+        archivo.seek(0)
+
+        bloque, = leer_por_bloques(archivo, 'clientes.xlsx')
+        self.assertEqual(list(bloque.datos.columns), ['nombre', 'apellido', 'email', 'telefono'])
+        self.assertEqual(bloque.datos.values.tolist(), [
+            ['N0', 'A0', '', ''],
+            ['N1', 'A1', 'c1@ejemplo.com', '0991234561'],
+        ])
+
+    def test_formato_no_soportado(self):
+        with self.assertRaises(FormatoNoSoportado):
+            list(leer_por_bloques(io.BytesIO(b''), 'clientes.txt'))
+
+    def test_importar_archivo_reporta_progreso_y_salta_filas(self):
+        contenido = csv_de_clientes(7)
+        avances = []
+        resumen = importar_archivo(
+            io.BytesIO(contenido), 'clientes.csv', tamano_bloque=3,
+            progreso=lambda r, leidos, total: avances.append((r.importadas, leidos, total)),
+        )
+        self.assertEqual(resumen.importadas, 7)
+        self.assertEqual([importadas for importadas, _, _ in avances], [3, 6, 7])
+        self.assertEqual(avances[-1][1:], (len(contenido), len(contenido)))
+
+        # `saltar` retoma en medio de un bloque; los números de fila siguen siendo los del archivo
+        Cliente.objects.all().delete()
+        contenido = csv_de_clientes(7).replace(b'c4@ejemplo.com', b'c4@')
+        resumen = importar_archivo(io.BytesIO(contenido), 'clientes.csv', tamano_bloque=3, saltar=2)
+        self.assertEqual((resumen.leidas, resumen.importadas), (5, 4))
+        self.assertEqual(resumen.errores, [(6, 'email', 'Email inválido', 'c4@')])
+        self.assertEqual(
+            sorted(Cliente.objects.values_list('email', flat=True)),
+            [f'c{i}@ejemplo.com' for i in (2, 3, 5, 6)],
+        )
+
+
+class ImportacionUpsertTests(TestCase):
+    def setUp(self):
+        for i in range(3):
+            Cliente.objects.create(nombre=f'N{i}', apellido='A', email=f'c{i}@ejemplo.com', telefono=str(i))
+        self.puntuado = Cliente.objects.get(email='c0@ejemplo.com')
+        self.puntuado.registrar_puntuacion(0.9, 'v1')
+        self.puntuado.save(update_fields=['probabilidad_abandono', 'nivel_riesgo', 'puntuado_en', 'version_modelo'])
+        self.marcas = dict(Cliente.objects.values_list('email', 'datos_modificados_en'))
+
+    def test_cuenta_creadas_actualizadas_y_sin_cambios(self):
+        df = pd.DataFrame({
+            'nombre': ['N0', 'N1', 'N2', 'N3'],
+            'apellido': ['A'] * 4,
+            'email': [f'c{i}@ejemplo.com' for i in range(4)],
+            'telefono': ['0', '1', '2', '3'],
+            'direccion': ['Calle 2', '', '', ''],
+            'estado': ['activo', 'activo', 'inactivo', 'activo'],
+            'nivel_riesgo': ['', 'x', '0.2', 'alto'],
+        })
+        resumen = importar_dataframe(df, modo=MODO_UPSERT)
+        self.assertEqual(
+            (resumen.importadas, resumen.actualizadas, resumen.sin_cambios, resumen.rechazadas), (1, 2, 1, 0),
+        )
+
+        clientes = {c.email: c for c in Cliente.objects.all()}
+        self.assertEqual(clientes['c3@ejemplo.com'].nivel_riesgo, 'Alto')
+        # Una celda de riesgo vacía o inválida no borra la puntuación del modelo
+        puntuado = clientes['c0@ejemplo.com']
+        self.assertEqual(puntuado.direccion, 'Calle 2')
+        self.assertEqual(
+            (puntuado.nivel_riesgo, puntuado.probabilidad_abandono, puntuado.puntuado_en),
+            ('Alto', 0.9, self.puntuado.puntuado_en),
+        )
+        # Solo el cambio de estado (dato del modelo) lo deja pendiente de puntuar
+        self.assertEqual(puntuado.datos_modificados_en, self.marcas['c0@ejemplo.com'])
+        self.assertEqual(clientes['c1@ejemplo.com'].datos_modificados_en, self.marcas['c1@ejemplo.com'])
+        self.assertGreater(clientes['c2@ejemplo.com'].datos_modificados_en, self.marcas['c2@ejemplo.com'])
+        self.assertEqual(clientes['c2@ejemplo.com'].nivel_riesgo, 'Bajo')
+
+
+class ExportacionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Cliente.objects.bulk_create(
+            Cliente(nombre=f'Núñez{i}', apellido='A', email=f'c{i}@ejemplo.com', probabilidad_abandono=i / 10)
+            for i in range(7)
+        )
+
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@ejemplo.com', 'x'))
+
+    def test_csv_sale_por_bloques_en_el_orden_del_listado(self):
+        trozos = exportacion.csv_en_trozos(Cliente.objects.all(), '-riesgo', tamano_bloque=3)
+        with CaptureQueriesContext(connection) as consultas:
+            encabezado = next(trozos)
+        # El encabezado sale antes de consultar la base
+        self.assertEqual(len(consultas), 0)
+        self.assertEqual(encabezado.decode('utf-8-sig').strip(), ','.join(exportacion.COLUMNAS))
+        with CaptureQueriesContext(connection) as consultas:
+            cuerpo = b''.join(trozos)
+        self.assertEqual(len(consultas), 3)
+
+        filas = list(csv.reader(io.StringIO((encabezado + cuerpo).decode('utf-8-sig'))))[1:]
+        self.assertEqual([f[3] for f in filas], [f'c{i}@ejemplo.com' for i in range(6, -1, -1)])
+
+        comprimido = b''.join(exportacion.csv_en_trozos(Cliente.objects.all(), '-riesgo', comprimir=True))
+        self.assertEqual(gzip.decompress(comprimido), encabezado + cuerpo)
+
+    @override_settings(CLIENTES_EXPORTACION_XLSX_MAX_FILAS=3)
+    def test_xlsx_limitado_en_filas(self):
+        respuesta = self.client.get(reverse('clientes:exportar'), {'formato': 'xlsx'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('use formato=csv', respuesta.json()['error'])
+
+        Cliente.objects.filter(probabilidad_abandono__gte=0.3).update(nivel_riesgo='Alto')
+        respuesta = self.client.get(reverse('clientes:exportar'), {'formato': 'xlsx', 'nivel_riesgo': 'Bajo'})
+        self.assertEqual(respuesta.status_code, 200)
+        from openpyxl import load_workbook
+
+        hoja = load_workbook(io.BytesIO(b''.join(respuesta.streaming_content)), read_only=True).worksheets[0]
+        filas = list(hoja.iter_rows(values_only=True))
+        self.assertEqual(filas[0], exportacion.COLUMNAS)
+        self.assertEqual([f[3] for f in filas[1:]], ['c2@ejemplo.com', 'c1@ejemplo.com', 'c0@ejemplo.com'])
+
+
+@override_settings(PREDICCIONES_JOB_WORKERS=0)
+class ImportacionEnTrabajoTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        configuracion = override_settings(CLIENTES_IMPORTACIONES_DIR=Path(directorio.name))
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        runner = mock.patch('predicciones.jobs._runner', None)
+        runner.start()
+        self.addCleanup(runner.stop)
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@ejemplo.com', 'x'))
+
+    def test_importacion_caida_se_reanuda_desde_el_punto_de_control(self):
+        contenido = csv_de_clientes(8).replace(b'c1@ejemplo.com', b'c1@').replace(b'c6@ejemplo.com', b'c6@')
+        ruta = guardar_subida(SimpleUploadedFile('clientes.csv', contenido))
+        real = importacion.importar_dataframe
+        llamadas = []
+
+        def cae_en_el_segundo_bloque(*args, **kwargs):
+            llamadas.append(1)
+            if len(llamadas) == 2:
+                raise RuntimeError('worker caído')
+            return real(*args, **kwargs)
+
+        with mock.patch('clientes.importacion.importar_dataframe', cae_en_el_segundo_bloque), \
+                self.captureOnCommitCallbacks(execute=True):
+            trabajo = get_runner().enviar(
+                Trabajo.TIPO_IMPORTACION, 'clientes.importacion.importar_en_trabajo', str(ruta), 'clientes.csv',
+                tamano_bloque=3,
+            )
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.punto_control['filas'], 3)
+        self.assertEqual(Cliente.objects.count(), 2)
+
+        # Como si el proceso hubiera muerto a mitad del bloque: sigue "en curso"
+        # y dejó en errores.csv líneas que no llegaron a confirmarse
+        proceso = subprocess.Popen([sys.executable, '-c', ''])
+        proceso.wait()
+        Trabajo.objects.filter(pk=trabajo.pk).update(
+            estado=Trabajo.EN_CURSO, finalizado=None, proceso=f'{socket.gethostname()}:{proceso.pid}',
+        )
+        with open(ruta_errores(ruta), 'ab') as f:
+            f.write(b'6,email,Email duplicado,c4@ejemplo.com\r\n')
+
+        self.assertContains(self.client.get(reverse('clientes:importar')), 'Reanudar')
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, Trabajo.FALLIDO)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('clientes:importacion_reanudar', args=[trabajo.pk]))
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, Trabajo.COMPLETADO)
+        self.assertEqual(
+            {k: trabajo.resultado[k] for k in ('leidas', 'importadas', 'rechazadas')},
+            {'leidas': 8, 'importadas': 6, 'rechazadas': 2},
+        )
+        self.assertEqual(Cliente.objects.count(), 6)
+        self.assertEqual(ruta_errores(ruta).read_text().splitlines(), [
+            'fila,columna,motivo,valor',
+            '3,email,Email inválido,c1@',
+            '8,email,Email inválido,c6@',
+        ])
+        self.assertFalse(ruta.exists())
+
+
+class ListadoCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Empates de probabilidad para que el id tenga que desempatar
+        probabilidades = [0.5, 0.9, 0.5, 0.1, 0.5, 0.7, 0.5, 0.3, 0.9, 0.2, 0.5]
+        inicio = timezone.now() - timedelta(days=30)
+        Cliente.objects.bulk_create(
+            Cliente(nombre=f'N{i}', apellido='A', email=f'c{i}@ejemplo.com', probabilidad_abandono=p,
+                    nivel_riesgo=Cliente.nivel_desde_probabilidad(p), fecha_registro=inicio + timedelta(days=i % 4))
+            for i, p in enumerate(probabilidades)
+        )
+
+    def recorrer(self, orden: str, por_pagina: int = 4) -> list:
+        paginas = [listado.paginar(Cliente.objects.all(), orden, por_pagina)]
+        while paginas[-1].siguiente:
+            paginas.append(listado.paginar(Cliente.objects.all(), orden, por_pagina, despues=paginas[-1].siguiente))
+        return paginas
+
+    def test_adelante_y_atras_recorren_el_orden_completo(self):
+        for orden in listado.ORDENES:
+            with self.subTest(orden=orden):
+                esperado = list(listado.ordenar(Cliente.objects.all(), orden).values_list('id', flat=True))
+                paginas = self.recorrer(orden)
+                self.assertEqual([c.id for p in paginas for c in p.clientes], esperado)
+                self.assertEqual([len(p.clientes) for p in paginas], [4, 4, 3])
+                self.assertIsNone(paginas[0].anterior)
+                self.assertIsNone(paginas[-1].siguiente)
+
+                # Desde la última página, `anterior` devuelve exactamente las páginas previas
+                actual = paginas[-1]
+                for previa in reversed(paginas[:-1]):
+                    actual = listado.paginar(Cliente.objects.all(), orden, 4, antes=actual.anterior)
+                    self.assertEqual([c.id for c in actual.clientes], [c.id for c in previa.clientes])
+                    self.assertIsNotNone(actual.siguiente)
+                self.assertIsNone(actual.anterior)
+
+    def test_filtros_y_vista_json(self):
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@ejemplo.com', 'x'))
+        url = reverse('clientes:listar_json')
+        primera = self.client.get(url, {'nivel_riesgo': 'Medio', 'estado': 'otro', 'por_pagina': 3}).json()
+        self.assertEqual(len(primera['resultados']), 3)
+        self.assertEqual({c['nivel_riesgo'] for c in primera['resultados']}, {'Medio'})
+        segunda = self.client.get(url, {'nivel_riesgo': 'Medio', 'por_pagina': 3, 'despues': primera['siguiente']}).json()
+        self.assertIsNone(segunda['siguiente'])
+        self.assertEqual(
+            {c['id'] for c in primera['resultados'] + segunda['resultados']},
+            set(Cliente.objects.filter(nivel_riesgo='Medio').values_list('id', flat=True)),
+        )
+
+    def test_cursor_invalido(self):
+        otro_orden = listado.codificar_cursor(Cliente.objects.first(), '-registro')
+        for cursor in ('no es base64!', 'e30', 'WzEsMiwzXQ', otro_orden):
+            with self.subTest(cursor=cursor), self.assertRaises(listado.CursorInvalido):
+                listado.paginar(Cliente.objects.all(), '-riesgo', despues=cursor)
+
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@ejemplo.com', 'x'))
+        respuesta = self.client.get(reverse('clientes:listar_json'), {'despues': 'no es base64!'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json(), {'error': 'Cursor de paginación inválido.'})
+        self.assertEqual(self.client.get(reverse('clientes:listar'), {'antes': 'e30'}).status_code, 404)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN es de SQLite')
+class ConsultasIndexadasTests(TestCase):
+    """Las consultas de las vistas y la importación no deben recorrer toda la tabla.
+
+    Quedan fuera, a propósito, los recorridos completos por diseño (entrenamiento,
+    recálculo y alertas, que leen todos los clientes por bloques de pk).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser('admin', 'admin@ejemplo.com', 'x')
+        Cliente.objects.bulk_create(
+            Cliente(
+                nombre=f'N{i}', apellido='A', email=f'c{i}@ejemplo.com',
+                estado=('activo', 'inactivo')[i % 2],
+                nivel_riesgo=('Bajo', 'Medio', 'Alto')[i % 3],
+                probabilidad_abandono=i / 40,
+            )
+            for i in range(40)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def assertSinEscaneosCompletos(self, planes):
+        self.assertTrue(planes.consultas(), 'No se capturó ninguna consulta sobre la tabla')
+        self.assertEqual(planes.escaneos_completos(), [])
+
+    def test_listado_con_filtros_y_cursor(self):
+        filtros = [{}, {'estado': 'activo'}, {'nivel_riesgo': 'Alto'}, {'estado': 'inactivo', 'nivel_riesgo': 'Bajo'}]
+        for orden in listado.ORDENES:
+            for filtro in filtros:
+                with self.subTest(orden=orden, **filtro):
+                    params = {'orden': orden, 'por_pagina': 5, **filtro}
+                    with PlanesDeConsulta() as planes:
+                        datos = self.client.get(reverse('clientes:listar_json'), params).json()
+                        self.client.get(reverse('clientes:listar_json'), {**params, 'despues': datos['siguiente']})
+                        self.client.get(reverse('clientes:listar'), {**params, 'antes': datos['siguiente']})
+                    self.assertSinEscaneosCompletos(planes)
+
+    def test_clientes_recientes_del_dashboard(self):
+        # Mismo conteo que dashboard.views.inicio
+        desde_30_dias = timezone.localdate() - timedelta(days=30)
+        with PlanesDeConsulta() as planes:
+            Cliente.objects.filter(fecha_registro__gte=desde_30_dias).count()
+        self.assertSinEscaneosCompletos(planes)
+
+    def test_umbrales_de_riesgo(self):
+        consultas = [
+            Cliente.objects.filter(probabilidad_abandono__gte=0.8).order_by('-probabilidad_abandono'),
+            Cliente.objects.filter(nivel_riesgo='Alto').order_by('-probabilidad_abandono'),
+            Cliente.objects.filter(estado='inactivo').values('estado', 'nivel_riesgo', 'telefono'),
+        ]
+        for qs in consultas:
+            with self.subTest(sql=str(qs.query)):
+                sql, params = qs.query.sql_with_params()
+                self.assertEqual(escaneos_completos(plan_de_consulta(sql, params)), [])
+
+    def test_importacion_busca_emails_existentes_por_indice(self):
+        df = pd.DataFrame({
+            'nombre': ['Nuevo', 'N1'], 'apellido': ['B', 'A'],
+            'email': ['nuevo@ejemplo.com', 'c1@ejemplo.com'], 'estado': ['activo', 'activo'],
+        })
+        with PlanesDeConsulta() as planes:
+            importar_dataframe(df)
+            importar_dataframe(df, modo=MODO_UPSERT)
+        self.assertSinEscaneosCompletos(planes)
+
+    def test_detecta_escaneo_completo(self):
+        # Sin índice sobre apellido la consulta recorre la tabla: la utilidad lo reporta
+        sql, params = Cliente.objects.filter(apellido='A').query.sql_with_params()
+        self.assertTrue(escaneos_completos(plan_de_consulta(sql, params)))
+
+
+class BusquedaFtsTests(TestCase):
+    def setUp(self):
+        # Se comprueba sobre la base de pruebas, ya migrada
+        if not busqueda.fts_disponible():
+            self.skipTest('La base de datos no tiene índice FTS5')
+
+    def test_indice_sigue_a_save_delete_e_importacion(self):
+        cliente = Cliente.objects.create(nombre='José', apellido='Pérez', email='jperez@ejemplo.com', telefono='0991234567')
+        self.assertEqual([c['id'] for c in busqueda.buscar('jose per').clientes], [cliente.id])
+        self.assertEqual([c['id'] for c in busqueda.buscar('0991').clientes], [cliente.id])
+
+        cliente.nombre = 'Josefina'
+        cliente.save()
+        self.assertEqual(len(busqueda.buscar('josefina').clientes), 1)
+        cliente.delete()
+        self.assertEqual(busqueda.buscar('josefina').clientes, [])
+
+        df = pd.DataFrame({'nombre': ['Marisol'], 'apellido': ['Ruiz'], 'email': ['mr@ejemplo.com']})
+        importar_dataframe(df)
+        self.assertEqual(len(busqueda.buscar('maris').clientes), 1)
+        importar_dataframe(df.assign(nombre='Maritza'), modo=MODO_UPSERT)
+        self.assertEqual(busqueda.buscar('maris').clientes, [])
+        self.assertEqual(len(busqueda.buscar('maritza ruiz').clientes), 1)
+
+    def test_nombre_pesa_mas_que_email(self):
+        Cliente.objects.create(nombre='Otro', apellido='X', email='ruiz@ejemplo.com')
+        Cliente.objects.create(nombre='Ana', apellido='Ruiz', email='ana@ejemplo.com')
+        resultado = busqueda.buscar('ruiz')
+        self.assertEqual(resultado.motor, busqueda.MOTOR_FTS)
+        self.assertEqual([c['email'] for c in resultado.clientes], ['ana@ejemplo.com', 'ruiz@ejemplo.com'])
+
+    def test_operadores_fts_no_se_interpretan(self):
+        Cliente.objects.create(nombre='Ana', apellido='Ruiz', email='ana@ejemplo.com')
+        self.assertEqual(len(busqueda.buscar('ana"*').clientes), 1)
+        # OR es una palabra más (todas deben aparecer), no el operador de FTS5
+        self.assertEqual(busqueda.buscar('ana" OR "ruiz').clientes, [])
+        self.assertEqual(busqueda.buscar('a').clientes, [])
@@ -7,8 +7,14 @@ app_name = 'clientes'
 
 urlpatterns = [
     path('importar/', importar_clientes, name='importar'),
+    path('importaciones/<int:trabajo_id>/', views.importacion_estado, name='importacion_estado'),
+    path('importaciones/<int:trabajo_id>/errores/', views.importacion_errores, name='importacion_errores'),
+    path('importaciones/<int:trabajo_id>/reanudar/', views.importacion_reanudar, name='importacion_reanudar'),
     path('', views.clientes_list, name='index'),
     path('', views.clientes_list, name='listar'),
+    path('json/', views.clientes_list_json, name='listar_json'),
+    path('buscar/', views.clientes_buscar, name='buscar'),
+    path('exportar/', views.clientes_exportar, name='exportar'),
     path('crear/', views.cliente_create, name='crear'),
     path('editar/<int:pk>/', views.cliente_update, name='editar'),
     path('eliminar/<int:pk>/', views.cliente_delete, name='eliminar'),
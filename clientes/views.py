@@ -1,122 +1,184 @@
 from __future__ import annotations
 
-import re
+import shutil
 
-import pandas as pd
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.generic import CreateView, DeleteView, ListView, UpdateView
 from django.urls import reverse_lazy
+from django.views.decorators.http import require_POST
 
+from predicciones.jobs import TrabajoEnCurso, get_runner
+from predicciones.models import Trabajo
+
+from . import busqueda, exportacion, listado
 from .decorators import role_required
 from .forms import ClienteForm
+from .importacion import MODO_INSERTAR, MODO_UPSERT, guardar_subida, ruta_errores
 from .models import Cliente
 
 @login_required
 def home(request):
     return redirect('clientes:index')
 
+def _es_admin(user) -> bool:
+    return getattr(user, 'is_superuser', False) or getattr(user, 'rol', None) == 'admin'
+
 @login_required
 def importar_clientes(request):
-    if not getattr(request.user, 'is_superuser', False) and getattr(request.user, 'rol', None) != 'admin':
+    """Sube el archivo y encola la importación; la página muestra el avance de las últimas."""
+    if not _es_admin(request.user):
         messages.error(request, "No tienes permisos para realizar esta acción.")
         return redirect('dashboard:inicio')
 
     if request.method == 'POST' and request.FILES.get('archivo'):
         archivo = request.FILES['archivo']
-        try:
-            # Leer archivo con pandas
-            if archivo.name.endswith('.csv'):
-                df = pd.read_csv(archivo)
-            elif archivo.name.endswith(('.xls', '.xlsx')):
-                df = pd.read_excel(archivo)
-            else:
-                messages.error(request, "Formato de archivo no soportado.")
-                return redirect('clientes:importar')
-
-            # Validación de datos
-            errores = []
-            for _, row in df.iterrows():
-                email = str(row.get('email', '')).strip()
-                nombre = str(row.get('nombre', '')).strip()
-                apellido = str(row.get('apellido', '')).strip()
-                
-                # Campos obligatorios
-                if not nombre or not apellido or not email:
-                    errores.append(f"Fila con email {email} tiene campos obligatorios vacíos.")
-                    continue
-
-                # Validar email simple
-                if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-                    errores.append(f"Email inválido: {email}")
-                    continue
-
-                # Evitar duplicados
-                if Cliente.objects.filter(email=email).exists():
-                    errores.append(f"Email duplicado: {email}")
-                    continue
-
-                # Guardar cliente
-                raw_riesgo = row.get('nivel_riesgo', '')
-                nivel_riesgo = 'Bajo'
-                probabilidad_abandono = 0.0
-
-                if raw_riesgo is not None:
-                    raw_riesgo_str = str(raw_riesgo).strip()
-                    raw_riesgo_norm = raw_riesgo_str.lower()
-
-                    if raw_riesgo_norm in {'bajo', 'medio', 'alto'}:
-                        nivel_riesgo = raw_riesgo_norm.capitalize()
-                    else:
-                        try:
-                            val = float(raw_riesgo_str)
-                            # Acepta probabilidad 0..1 o porcentaje 0..100
-                            probabilidad_abandono = val / 100.0 if val > 1 else val
-                            if probabilidad_abandono < 0:
-                                probabilidad_abandono = 0.0
-                            if probabilidad_abandono > 1:
-                                probabilidad_abandono = 1.0
-
-                            if probabilidad_abandono < 0.3:
-                                nivel_riesgo = 'Bajo'
-                            elif probabilidad_abandono < 0.6:
-                                nivel_riesgo = 'Medio'
-                            else:
-                                nivel_riesgo = 'Alto'
-                        except (TypeError, ValueError):
-                            pass
-
-                Cliente.objects.create(
-                    nombre=nombre,
-                    apellido=apellido,
-                    email=email,
-                    telefono=row.get('telefono', ''),
-                    direccion=row.get('direccion', ''),
-                    estado=row.get('estado', 'activo'),
-                    nivel_riesgo=nivel_riesgo,
-                    probabilidad_abandono=probabilidad_abandono,
-                )
-
-            if errores:
-                for err in errores:
-                    messages.error(request, err)
-            else:
-                messages.success(request, "Clientes importados correctamente.")
-
-        except Exception as e:
-            messages.error(request, f"Error al procesar el archivo: {str(e)}")
+        if not archivo.name.lower().endswith(('.csv', '.xls', '.xlsx')):
+            messages.error(request, "Formato de archivo no soportado.")
+            return redirect('clientes:importar')
 
+        # Con "actualizar existentes" los emails ya registrados se actualizan en vez de rechazarse
+        modo = MODO_UPSERT if request.POST.get('actualizar') else MODO_INSERTAR
+        ruta = guardar_subida(archivo)
+        try:
+            trabajo = get_runner().enviar(
+                Trabajo.TIPO_IMPORTACION,
+                'clientes.importacion.importar_en_trabajo',
+                str(ruta),
+                archivo.name,
+                usuario=request.user,
+                modo=modo,
+            )
+        except TrabajoEnCurso as exc:
+            shutil.rmtree(ruta.parent, ignore_errors=True)
+            messages.error(request, f"Ya hay una importación en curso (#{exc.trabajo.pk}).")
+            return redirect('clientes:importar')
+
+        messages.success(request, f"Importación #{trabajo.pk} en curso.")
         return redirect('clientes:importar')
 
-    return render(request, 'clientes/importar.html')
+    # Una importación cuyo proceso murió queda como fallida, con su botón de reanudar
+    get_runner().marcar_abandonados(Trabajo.TIPO_IMPORTACION)
+    importaciones = Trabajo.objects.filter(tipo=Trabajo.TIPO_IMPORTACION).order_by('-creado')[:10]
+    return render(request, 'clientes/importar.html', {'importaciones': importaciones})
+
+@login_required
+def importacion_estado(request, trabajo_id):
+    if not _es_admin(request.user):
+        return HttpResponseForbidden("No tienes permisos para realizar esta acción.")
+    get_runner().marcar_abandonados(Trabajo.TIPO_IMPORTACION)
+    trabajo = get_object_or_404(Trabajo, pk=trabajo_id, tipo=Trabajo.TIPO_IMPORTACION)
+    return JsonResponse(trabajo.como_dict())
+
+@login_required
+def importacion_errores(request, trabajo_id):
+    """Descarga el CSV de filas rechazadas (fila, columna, motivo, valor)."""
+    if not _es_admin(request.user):
+        return HttpResponseForbidden("No tienes permisos para realizar esta acción.")
+    trabajo = get_object_or_404(Trabajo, pk=trabajo_id, tipo=Trabajo.TIPO_IMPORTACION)
+    ruta = ruta_errores(trabajo.parametros['args'][0]) if trabajo.parametros.get('args') else None
+    if ruta is None or not ruta.exists():
+        raise Http404("No hay archivo de errores para esta importación")
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=f'errores_importacion_{trabajo.pk}.csv')
+
+@login_required
+@require_POST
+def importacion_reanudar(request, trabajo_id):
+    if not _es_admin(request.user):
+        return HttpResponseForbidden("No tienes permisos para realizar esta acción.")
+    trabajo = get_object_or_404(Trabajo, pk=trabajo_id, tipo=Trabajo.TIPO_IMPORTACION)
+    try:
+        get_runner().reanudar(trabajo)
+    except TrabajoEnCurso as exc:
+        messages.error(request, f"Ya hay una importación en curso (#{exc.trabajo.pk}).")
+    except ValueError as exc:
+        messages.error(request, str(exc))
+    else:
+        messages.success(request, f"Importación #{trabajo.pk} reanudada.")
+    return redirect('clientes:importar')
+
+def _contexto_listado(pagina):
+    return {
+        'clientes': pagina.clientes,
+        'pagina': pagina,
+        'ordenes': listado.ETIQUETAS_ORDEN.items(),
+        'estados': Cliente.ESTADO_CHOICES,
+        'niveles': Cliente.RIESGO_CHOICES,
+        'max_filas_xlsx': exportacion.max_filas_xlsx(),
+    }
 
 @login_required
 @role_required(roles=['admin', 'analista'])
 def clientes_list(request):
-    clientes = Cliente.objects.all()
-    return render(request, 'clientes/list.html', {'clientes': clientes})
+    """Listado paginado por cursor; acepta estado, nivel_riesgo, orden, por_pagina, despues y antes."""
+    try:
+        pagina = listado.paginar_peticion(Cliente.objects.all(), request.GET)
+    except listado.CursorInvalido as exc:
+        raise Http404(str(exc))
+    return render(request, 'clientes/list.html', _contexto_listado(pagina))
+
+@login_required
+@role_required(roles=['admin', 'analista'])
+def clientes_list_json(request):
+    """Misma consulta que `clientes_list`, en JSON; `siguiente`/`anterior` son los cursores."""
+    filas = Cliente.objects.values(
+        'id', 'nombre', 'apellido', 'email', 'telefono', 'estado',
+        'nivel_riesgo', 'probabilidad_abandono', 'fecha_registro',
+    )
+    try:
+        pagina = listado.paginar_peticion(filas, request.GET)
+    except listado.CursorInvalido as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(pagina.como_dict())
+
+@login_required
+@role_required(roles=['admin', 'analista'])
+def clientes_exportar(request):
+    """Descarga los clientes del listado (mismos filtros y orden) como CSV, CSV.gz o XLSX."""
+    formato = request.GET.get('formato', 'csv')
+    if formato not in ('csv', 'xlsx'):
+        return JsonResponse({'error': 'formato debe ser csv o xlsx'}, status=400)
+    qs = listado.filtrar(Cliente.objects.all(), request.GET)
+    orden = listado.orden_de(request.GET)
+    nombre = f"clientes_{timezone.localtime():%Y%m%d_%H%M}"
+
+    if formato == 'xlsx':
+        # El XLSX se arma completo antes de enviarse: solo para exportaciones acotadas
+        limite = exportacion.max_filas_xlsx()
+        if qs.count() > limite:
+            return JsonResponse(
+                {'error': f'XLSX admite hasta {limite} filas; use formato=csv (o gzip=1) para exportaciones más grandes'},
+                status=400,
+            )
+        respuesta = StreamingHttpResponse(
+            exportacion.xlsx_en_trozos(qs, orden),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+        nombre += '.xlsx'
+    elif request.GET.get('gzip'):
+        respuesta = StreamingHttpResponse(exportacion.csv_en_trozos(qs, orden, comprimir=True),
+                                          content_type='application/gzip')
+        nombre += '.csv.gz'
+    else:
+        respuesta = StreamingHttpResponse(exportacion.csv_en_trozos(qs, orden),
+                                          content_type='text/csv; charset=utf-8')
+        nombre += '.csv'
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return respuesta
+
+@login_required
+@role_required(roles=['admin', 'analista'])
+def clientes_buscar(request):
+    """Búsqueda por prefijo en nombre, apellido, email y teléfono (`q`, `limite`)."""
+    try:
+        limite = int(request.GET.get('limite', busqueda.LIMITE))
+    except ValueError:
+        return JsonResponse({'error': 'limite debe ser un entero'}, status=400)
+    return JsonResponse(busqueda.buscar(request.GET.get('q', '').strip(), limite).como_dict())
 
 @login_required
 @role_required(roles=['admin'])
@@ -156,6 +218,20 @@ class ClienteListView(ListView):
     model = Cliente
     template_name = 'clientes/list.html'
     context_object_name = 'clientes'
+    paginate_by = listado.POR_PAGINA
+
+    def paginate_queryset(self, queryset, page_size):
+        # Paginación por cursor en vez del Paginator de Django (OFFSET)
+        try:
+            pagina = listado.paginar_peticion(queryset, self.request.GET, page_size)
+        except listado.CursorInvalido as exc:
+            raise Http404(str(exc))
+        return None, pagina, pagina.clientes, bool(pagina.siguiente or pagina.anterior)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(_contexto_listado(context['page_obj']))
+        return context
 
 @method_decorator(login_required, name='dispatch')
 class ClienteCreateView(CreateView):
@@ -1,3 +1,22 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import CeldaReporte, Indicador, ReportePendiente
+
+
+@admin.register(Indicador)
+class IndicadorAdmin(admin.ModelAdmin):
+    list_display = ('clave', 'valor', 'actualizado')
+    search_fields = ('clave',)
+    readonly_fields = ('clave', 'valor', 'actualizado')
+
+
+@admin.register(CeldaReporte)
+class CeldaReporteAdmin(admin.ModelAdmin):
+    list_display = ('granularidad', 'periodo', 'estado', 'nivel_riesgo', 'clientes', 'alto_riesgo')
+    list_filter = ('granularidad', 'estado', 'nivel_riesgo')
+    date_hierarchy = 'periodo'
+
+
+@admin.register(ReportePendiente)
+class ReportePendienteAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'marcado')
@@ -0,0 +1,264 @@
+"""Informes PDF del dashboard: generación en un pool de procesos, con caché en disco.
+
+Cada PDF se guarda en `DASHBOARD_INFORMES_DIR` con un nombre derivado de su
+clave: hash de (plantilla, contexto, versión de los cubos de reportes). Una
+solicitud idéntica sobre los mismos datos devuelve el archivo existente sin
+renderizar; cambiar el contexto o los datos (la versión sube con cada
+actualización de `dashboard.reportes`) produce otro archivo, nunca
+sobrescribe uno distinto.
+
+Etapas, con su tiempo en `Informe.tiempos`:
+
+- `contexto`: en el proceso que llama (lee celdas de los cubos, no clientes);
+- `html` y `pdf`: en un `ProcessPoolExecutor` (contexto `spawn`, cada proceso
+  hace su propio `django.setup()`). WeasyPrint se
+  importa solo ahí. Con `DASHBOARD_INFORMES_PROCESOS` <= 1, o con un único
+  informe que generar, corren en el mismo proceso (arrancar el pool cuesta
+  un `django.setup()` por proceso, ~0,5 s).
+
+`generar_lote` arma un informe por segmento (estado, nivel de riesgo) o por
+analista; los archivos ya generados se reutilizan y el resto se reparte en
+el pool.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.template.loader import render_to_string
+
+from clientes.models import Cliente
+
+from . import reportes
+from .models import CeldaReporte
+
+logger = logging.getLogger(__name__)
+
+PLANTILLA_SEMANAL = 'dashboard/report_template.html'
+# Prefijo de los archivos por plantilla (por defecto, el nombre de la plantilla)
+PREFIJOS = {PLANTILLA_SEMANAL: 'reporte_semanal'}
+SEMANAS = 12
+PROCESOS = min(4, os.cpu_count() or 1)
+# Claves de segmento aceptadas (filtros de los cubos y destinatario)
+CLAVES_SEGMENTO = ('estado', 'nivel_riesgo', 'analista')
+
+
+@dataclass
+class Informe:
+    clave: str
+    ruta: Path
+    segmento: dict = field(default_factory=dict)
+    desde_cache: bool = False
+    tiempos: dict = field(default_factory=dict)
+    bytes: int = 0
+    error: str = ''
+
+    def como_dict(self) -> dict:
+        return {
+            'clave': self.clave,
+            'ruta': str(self.ruta),
+            'segmento': self.segmento,
+            'desde_cache': self.desde_cache,
+            'milisegundos': {etapa: round(s * 1000, 1) for etapa, s in self.tiempos.items()},
+            'bytes': self.bytes,
+            'error': self.error or None,
+        }
+
+
+def directorio() -> Path:
+    return Path(getattr(settings, 'DASHBOARD_INFORMES_DIR', Path(settings.BASE_DIR) / 'reports'))
+
+
+def clave(plantilla: str, contexto: dict, version: int) -> str:
+    """Hash estable de (plantilla, contexto, versión de datos)."""
+    serializado = json.dumps([plantilla, contexto, version], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(serializado.encode('utf-8')).hexdigest()
+
+
+def _nombre(plantilla: str, segmento: dict, clave_: str) -> str:
+    partes = [PREFIJOS.get(plantilla, Path(plantilla).stem)]
+    partes += [str(segmento[c]) for c in CLAVES_SEGMENTO if segmento.get(c)]
+    base = re.sub(r'[^\w-]+', '-', '-'.join(partes)).strip('-').lower()
+    return f'{base}-{clave_[:20]}.pdf'
+
+
+def escribir_pdf(html: str, ruta: Path) -> int:
+    """Convierte `html` a PDF en `ruta` (vía un temporal: el archivo final aparece completo)."""
+    from weasyprint import HTML
+
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(suffix='.pdf', dir=ruta.parent)
+    os.close(descriptor)
+    try:
+        HTML(string=html, base_url=str(settings.BASE_DIR)).write_pdf(target=temporal)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.remove(temporal)
+        raise
+    return ruta.stat().st_size
+
+
+def renderizar(plantilla: str, contexto: dict, ruta: str) -> dict:
+    """Etapas html y pdf; punto de entrada en los procesos del pool."""
+    inicio = time.perf_counter()
+    html = render_to_string(plantilla, contexto)
+    renderizado = time.perf_counter()
+    tamano = escribir_pdf(html, Path(ruta))
+    return {'html': renderizado - inicio, 'pdf': time.perf_counter() - renderizado, 'bytes': tamano}
+
+
+def contexto_semanal(estado: str = '', nivel_riesgo: str = '', analista: str = '') -> dict:
+    """Contexto de `report_template.html`: las últimas semanas de los cubos para el segmento.
+
+    Solo depende de los datos (no de la hora), así que dos llamadas sobre la
+    misma versión de los cubos dan el mismo contexto y la misma clave.
+    """
+    reporte = reportes.consultar(CeldaReporte.SEMANA, estado=estado, nivel_riesgo=nivel_riesgo, periodos=SEMANAS)
+    destinatario = ''
+    if analista:
+        usuario = get_user_model().objects.filter(username=analista).first()
+        destinatario = (getattr(usuario, 'nombre_completo', '') or analista) if usuario else analista
+    return {
+        'titulo': 'Reporte semanal de clientes',
+        'segmento': {
+            'estado': dict(Cliente.ESTADO_CHOICES).get(estado, estado),
+            'nivel_riesgo': nivel_riesgo,
+        },
+        'destinatario': destinatario,
+        'umbral_alto_riesgo': round(reportes.umbral_alto_riesgo() * 100),
+        'reporte': reporte.como_dict(),
+    }
+
+
+def segmentos_por(dimension: str) -> list[dict]:
+    """Un segmento por valor de `dimension`: 'estado', 'nivel_riesgo' o 'analista' (usuarios activos)."""
+    if dimension == 'estado':
+        return [{'estado': valor} for valor, _ in Cliente.ESTADO_CHOICES]
+    if dimension == 'nivel_riesgo':
+        return [{'nivel_riesgo': valor} for valor, _ in Cliente.RIESGO_CHOICES]
+    if dimension == 'analista':
+        usuarios = get_user_model().objects.filter(is_active=True, rol='analista').order_by('username')
+        return [{'analista': username} for username in usuarios.values_list('username', flat=True)]
+    raise ValueError(f'dimensión desconocida: {dimension}')
+
+
+def _procesos() -> int:
+    return getattr(settings, 'DASHBOARD_INFORMES_PROCESOS', PROCESOS)
+
+
+def _ejecutar(trabajos: list[tuple[Informe, str, dict]], procesos: int) -> None:
+    """Corre las etapas html y pdf de `trabajos` y completa cada `Informe`."""
+    def completar(informe: Informe, resultado: dict | None, error: BaseException | None) -> None:
+        if error is not None:
+            informe.error = f'{type(error).__name__}: {error}'
+            logger.error('No se pudo generar el informe %s: %s', informe.ruta.name, informe.error)
+            return
+        informe.bytes = resultado.pop('bytes')
+        informe.tiempos.update(resultado)
+
+    if procesos <= 1 or len(trabajos) == 1:
+        for informe, plantilla, contexto in trabajos:
+            try:
+                completar(informe, renderizar(plantilla, contexto, str(informe.ruta)), None)
+            except Exception as exc:
+                completar(informe, None, exc)
+        return
+
+    # django.setup() como initializer: corre antes de deserializar `renderizar`
+    # (importar este módulo requiere las apps cargadas)
+    with ProcessPoolExecutor(
+        max_workers=min(procesos, len(trabajos)),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    ) as pool:
+        futuros = [
+            (informe, pool.submit(renderizar, plantilla, contexto, str(informe.ruta)))
+            for informe, plantilla, contexto in trabajos
+        ]
+        for informe, futuro in futuros:
+            try:
+                completar(informe, futuro.result(), None)
+            except Exception as exc:
+                completar(informe, None, exc)
+
+
+def ubicar(plantilla: str, contexto: dict, segmento: dict | None = None, version: int | None = None) -> Informe:
+    """`Informe` con la clave y la ruta en caché de (plantilla, contexto, versión de datos).
+
+    Si el archivo ya existe queda marcado `desde_cache`.
+    """
+    version = reportes.version() if version is None else version
+    segmento = {c: segmento[c] for c in CLAVES_SEGMENTO if (segmento or {}).get(c)}
+    clave_ = clave(plantilla, contexto, version)
+    informe = Informe(clave_, directorio() / _nombre(plantilla, segmento, clave_), segmento)
+    if informe.ruta.exists():
+        informe.desde_cache = True
+        informe.bytes = informe.ruta.stat().st_size
+    return informe
+
+
+def generar_pdf(plantilla: str, contexto: dict, segmento: dict | None = None,
+                copiar_a: str | Path | None = None) -> Informe:
+    """PDF de `plantilla` con `contexto` (en el mismo proceso), desde la caché si ya existe.
+
+    Con `copiar_a` el PDF de la caché además se copia a esa ruta.
+    """
+    inicio = time.perf_counter()
+    informe = ubicar(plantilla, contexto, segmento)
+    informe.tiempos['contexto'] = time.perf_counter() - inicio
+    if not informe.desde_cache:
+        _ejecutar([(informe, plantilla, contexto)], procesos=0)
+    if copiar_a and not informe.error:
+        Path(copiar_a).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(informe.ruta, copiar_a)
+    _registrar(informe)
+    return informe
+
+
+def generar_lote(segmentos: list[dict], plantilla: str = PLANTILLA_SEMANAL,
+                 procesos: int | None = None) -> list[Informe]:
+    """Un informe por segmento; los que no están en caché se generan en paralelo."""
+    version = reportes.version()
+    informes: list[Informe] = []
+    trabajos: list[tuple[Informe, str, dict]] = []
+    por_clave: dict[str, Informe] = {}
+    for segmento in segmentos:
+        inicio = time.perf_counter()
+        contexto = contexto_semanal(**{c: segmento[c] for c in CLAVES_SEGMENTO if segmento.get(c)})
+        informe = ubicar(plantilla, contexto, segmento, version)
+        informe.tiempos['contexto'] = time.perf_counter() - inicio
+        informes.append(informe)
+        if not informe.desde_cache and informe.clave not in por_clave:
+            por_clave[informe.clave] = informe
+            trabajos.append((informe, plantilla, contexto))
+
+    if trabajos:
+        _ejecutar(trabajos, _procesos() if procesos is None else procesos)
+    for informe in informes:
+        generado = por_clave.get(informe.clave)
+        if generado is not None and generado is not informe:
+            # Segmento repetido en el lote: mismo archivo
+            informe.bytes, informe.error = generado.bytes, generado.error
+        _registrar(informe)
+    return informes
+
+
+def _registrar(informe: Informe) -> None:
+    tiempos = ' '.join(f'{etapa}={s * 1000:.1f}ms' for etapa, s in informe.tiempos.items())
+    logger.info(
+        'Informe %s %s %s', informe.ruta.name,
+        'desde caché' if informe.desde_cache else ('con error' if informe.error else 'generado'), tiempos,
+    )
@@ -0,0 +1,169 @@
+"""KPIs del inicio del dashboard sin agregados SQL por petición.
+
+Los conteos viven en la tabla `Indicador` y se mantienen así:
+
+- las señales (`dashboard.signals`) los ajustan con `F()` en la misma
+  transacción de cada alta o baja de clientes (incluidas las importaciones
+  con bulk_create), de cada cambio de usuarios y de cada lote escrito o
+  purgado del historial de predicciones;
+- `reconciliar()` los recalcula con COUNT desde las tablas; corre como tarea
+  periódica (`dashboard.tasks.reconciliar_kpis`) y la primera vez que se
+  pide una foto sin contadores. También corrige el conteo de predicciones
+  tras borrar clientes (su historial se borra en cascada, sin señal).
+
+`foto()` arma el diccionario de la vista desde la caché (TTL
+`DASHBOARD_KPIS_TTL`); si expiró lo reconstruye leyendo los contadores por
+clave primaria. Los clientes de los últimos 30 días salen de contadores por
+día de registro. Cada foto lleva su antigüedad y la de la última
+reconciliación.
+"""
+from __future__ import annotations
+
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from clientes.models import Cliente
+from predicciones.models import HistorialPrediccion
+
+from .models import Indicador
+
+CLAVE_CACHE = 'dashboard:kpis'
+TTL = 60
+
+CLIENTES = 'clientes'
+USUARIOS_ACTIVOS = 'usuarios_activos'
+PREDICCIONES = 'predicciones'
+# Marca de la última reconciliación (segundos desde epoch)
+RECONCILIADO = 'reconciliado_en'
+PREFIJO_REGISTRADOS = 'registrados:'
+VENTANA_DIAS = 30
+
+
+def clave_registrados(fecha: date) -> str:
+    return f'{PREFIJO_REGISTRADOS}{fecha.isoformat()}'
+
+
+def _dias_ventana(hoy: date) -> list[date]:
+    # Igual que el filtro original fecha_registro >= hoy - 30 días
+    return [hoy - timedelta(days=n) for n in range(VENTANA_DIAS + 1)]
+
+
+def invalidar() -> None:
+    """Descarta la foto en caché cuando confirme la transacción en curso."""
+    transaction.on_commit(lambda: cache.delete(CLAVE_CACHE))
+
+
+def ajustar(clave: str, delta: int, crear: bool = False) -> None:
+    """Suma `delta` al contador `clave` si ya existe (o lo crea en 0 con `crear`).
+
+    Antes de la primera reconciliación no hay contadores y no se ajusta nada:
+    la reconciliación parte de los conteos reales.
+    """
+    if not Indicador.objects.filter(clave=CLIENTES).exists():
+        return
+    if crear:
+        Indicador.objects.bulk_create([Indicador(clave=clave)], ignore_conflicts=True)
+    Indicador.objects.filter(clave=clave).update(valor=F('valor') + delta, actualizado=timezone.now())
+    invalidar()
+
+
+def fijar(clave: str, valor: int) -> None:
+    Indicador.objects.update_or_create(clave=clave, defaults={'valor': valor})
+    invalidar()
+
+
+def contar_usuarios_activos() -> int:
+    return get_user_model().objects.filter(is_active=True).count()
+
+
+def contar_predicciones() -> int:
+    return HistorialPrediccion.objects.count()
+
+
+def ultimas_predicciones() -> list[dict]:
+    # Índice por fecha_prediccion: recorre 5 entradas sin importar el tamaño del historial
+    return [
+        {
+            'cliente_nombre': p.cliente.nombre,
+            'version_modelo': p.version_modelo,
+            'origen': p.get_origen_display(),
+            'fecha_prediccion': p.fecha_prediccion,
+            'nivel_riesgo': p.nivel_riesgo,
+        }
+        for p in HistorialPrediccion.objects.select_related('cliente').order_by('-fecha_prediccion')[:5]
+    ]
+
+
+def reconciliar() -> dict:
+    """Recalcula todos los contadores desde las tablas y descarta la foto en caché."""
+    inicio = time.perf_counter()
+    hoy = timezone.localdate()
+    dias = _dias_ventana(hoy)
+    por_dia = dict(
+        Cliente.objects.filter(fecha_registro__gte=dias[-1])
+        .values_list('fecha_registro')
+        .annotate(n=Count('id'))
+    )
+    valores = {
+        CLIENTES: Cliente.objects.count(),
+        USUARIOS_ACTIVOS: contar_usuarios_activos(),
+        PREDICCIONES: contar_predicciones(),
+        **{clave_registrados(d): por_dia.get(d, 0) for d in dias},
+        RECONCILIADO: int(time.time()),
+    }
+
+    with transaction.atomic():
+        Indicador.objects.filter(clave__startswith=PREFIJO_REGISTRADOS).exclude(clave__in=valores).delete()
+        Indicador.objects.bulk_create(
+            [Indicador(clave=clave, valor=valor) for clave, valor in valores.items()],
+            update_conflicts=True,
+            unique_fields=['clave'],
+            update_fields=['valor', 'actualizado'],
+        )
+        invalidar()
+    return {'ok': True, 'valores': valores, 'segundos': round(time.perf_counter() - inicio, 3)}
+
+
+def _construir(hoy: date) -> dict:
+    claves = [CLIENTES, USUARIOS_ACTIVOS, PREDICCIONES, RECONCILIADO]
+    claves += [clave_registrados(d) for d in _dias_ventana(hoy)]
+    valores = dict(Indicador.objects.filter(clave__in=claves).values_list('clave', 'valor'))
+    if CLIENTES not in valores:
+        reconciliar()
+        valores = dict(Indicador.objects.filter(clave__in=claves).values_list('clave', 'valor'))
+
+    return {
+        'total_clientes': valores[CLIENTES],
+        'clientes_ult_30_dias': sum(valores.get(clave_registrados(d), 0) for d in _dias_ventana(hoy)),
+        'total_usuarios_activos': valores.get(USUARIOS_ACTIVOS, 0),
+        'total_predicciones': valores.get(PREDICCIONES, 0),
+        'ultimas_predicciones': ultimas_predicciones(),
+        'generado_en': time.time(),
+        'reconciliado_en': valores.get(RECONCILIADO),
+    }
+
+
+def foto() -> dict:
+    """KPIs del inicio con metadatos de frescura (`edad_segundos`, `reconciliado_hace_segundos`)."""
+    datos = cache.get(CLAVE_CACHE)
+    desde_cache = datos is not None
+    if not desde_cache:
+        datos = _construir(timezone.localdate())
+        cache.set(CLAVE_CACHE, datos, getattr(settings, 'DASHBOARD_KPIS_TTL', TTL))
+
+    ahora = time.time()
+    return {
+        **datos,
+        'desde_cache': desde_cache,
+        'edad_segundos': round(ahora - datos['generado_en'], 1),
+        'reconciliado_hace_segundos': (
+            round(ahora - datos['reconciliado_en']) if datos['reconciliado_en'] is not None else None
+        ),
+    }
@@ -0,0 +1,42 @@
+"""Genera informes PDF del dashboard (uno por segmento) con tiempos por etapa.
+
+    python manage.py generar_informes                          # todos los clientes
+    python manage.py generar_informes --por estado             # uno por estado
+    python manage.py generar_informes --por analista --procesos 4
+    python manage.py generar_informes --estado activo --nivel-riesgo Alto
+"""
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard import informes
+
+
+class Command(BaseCommand):
+    help = 'Genera (o reutiliza de la caché) informes PDF del dashboard e informa los tiempos por etapa.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--por', choices=['estado', 'nivel_riesgo', 'analista'],
+                            help='Un informe por cada valor de esta dimensión.')
+        parser.add_argument('--estado', default='')
+        parser.add_argument('--nivel-riesgo', default='')
+        parser.add_argument('--procesos', type=int, default=None,
+                            help='Procesos del pool (por defecto DASHBOARD_INFORMES_PROCESOS; 1 = sin pool).')
+
+    def handle(self, *args, por, estado, nivel_riesgo, procesos, **options):
+        segmentos = informes.segmentos_por(por) if por else [{'estado': estado, 'nivel_riesgo': nivel_riesgo}]
+        inicio = time.perf_counter()
+        resultado = informes.generar_lote(segmentos, procesos=procesos)
+        for informe in resultado:
+            datos = informe.como_dict()
+            tiempos = ' '.join(f'{etapa}={ms:.0f}ms' for etapa, ms in datos['milisegundos'].items())
+            if informe.error:
+                self.stdout.write(self.style.ERROR(f'{informe.ruta.name}: {informe.error}'))
+            else:
+                origen = 'caché' if informe.desde_cache else 'generado'
+                self.stdout.write(f'{informe.ruta} ({origen}, {informe.bytes} bytes) {tiempos}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(resultado)} informes en {time.perf_counter() - inicio:.2f} s'
+        ))
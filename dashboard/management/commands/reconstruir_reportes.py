@@ -0,0 +1,32 @@
+"""Reconstruye los cubos de reportes del dashboard desde `clientes_cliente`.
+
+Las señales y la tarea periódica los mantienen al día; esto hace falta tras
+escrituras masivas sin señales, al cambiar el umbral de alto riesgo o para
+medir el costo de una reconstrucción completa.
+
+    python manage.py reconstruir_reportes
+    python manage.py reconstruir_reportes --pendientes   # solo los periodos pendientes
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from dashboard import reportes
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los cubos de reportes del dashboard e informa el tiempo de construcción.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pendientes', action='store_true',
+            help='Recalcula solo las semanas y meses con clientes escritos desde la última actualización.',
+        )
+
+    def handle(self, *args, **options):
+        resultado = reportes.actualizar_pendientes() if options['pendientes'] else reportes.construir()
+        tipo = 'completa' if resultado['completa'] else f"{resultado['periodos']} periodos"
+        self.stdout.write(self.style.SUCCESS(
+            f"Cubos de reportes ({tipo}): {resultado.get('celdas', 0)} celdas, versión {resultado['version']}, "
+            f"construidos en {resultado['segundos']:.2f} s"
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_indicador'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportePendiente',
+            fields=[
+                ('fecha', models.DateField(primary_key=True, serialize=False)),
+                ('marcado', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CeldaReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularidad', models.CharField(choices=[('semana', 'Semana'), ('mes', 'Mes')], max_length=6)),
+                ('periodo', models.DateField(help_text='Lunes de la semana o primer día del mes')),
+                ('estado', models.CharField(max_length=10)),
+                ('nivel_riesgo', models.CharField(max_length=10)),
+                ('clientes', models.BigIntegerField(default=0)),
+                ('suma_probabilidad', models.FloatField(default=0.0)),
+                ('alto_riesgo', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('granularidad', 'periodo', 'estado', 'nivel_riesgo'), name='dash_celda_uniq')],
+            },
+        ),
+    ]
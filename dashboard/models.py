@@ -1,3 +1,73 @@
 from django.db import models
 
-# Create your models here.
+
+class Indicador(models.Model):
+    """Contador de un KPI del dashboard (ver dashboard.kpis).
+
+    Las señales lo ajustan en la misma transacción que la escritura que lo
+    cambia y `kpis.reconciliar` lo recalcula periódicamente desde las tablas.
+    Los clientes registrados por día usan claves `registrados:AAAA-MM-DD`.
+    """
+
+    clave = models.CharField(max_length=64, primary_key=True)
+    valor = models.BigIntegerField(default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.clave}={self.valor}"
+
+
+class CeldaReporte(models.Model):
+    """Celda de los cubos de reportes (ver dashboard.reportes).
+
+    Agregados de clientes por granularidad y periodo de registro, estado y
+    nivel de riesgo. Se reconstruyen completos con `reportes.construir()` y
+    por periodo con `reportes.actualizar_pendientes()`.
+    """
+
+    SEMANA = 'semana'
+    MES = 'mes'
+    GRANULARIDAD_CHOICES = [
+        (SEMANA, 'Semana'),
+        (MES, 'Mes'),
+    ]
+
+    granularidad = models.CharField(max_length=6, choices=GRANULARIDAD_CHOICES)
+    periodo = models.DateField(help_text='Lunes de la semana o primer día del mes')
+    estado = models.CharField(max_length=10)
+    nivel_riesgo = models.CharField(max_length=10)
+    clientes = models.BigIntegerField(default=0)
+    suma_probabilidad = models.FloatField(default=0.0)
+    alto_riesgo = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # También sirve las lecturas por granularidad ordenadas por periodo
+            models.UniqueConstraint(
+                fields=['granularidad', 'periodo', 'estado', 'nivel_riesgo'], name='dash_celda_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.granularidad} {self.periodo} {self.estado}/{self.nivel_riesgo}: {self.clientes}"
+
+    def como_dict(self) -> dict:
+        return {
+            'granularidad': self.granularidad,
+            'periodo': self.periodo.isoformat(),
+            'estado': self.estado,
+            'nivel_riesgo': self.nivel_riesgo,
+            'clientes': self.clientes,
+            'probabilidad_media': round(self.suma_probabilidad / self.clientes * 100, 2) if self.clientes else None,
+            'alto_riesgo': self.alto_riesgo,
+        }
+
+
+class ReportePendiente(models.Model):
+    """Fecha de registro con clientes escritos después de la última actualización de los cubos."""
+
+    fecha = models.DateField(primary_key=True)
+    marcado = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.fecha} ({self.marcado:%Y-%m-%d %H:%M})"
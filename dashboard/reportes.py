@@ -0,0 +1,274 @@
+"""Cubos de reportes de clientes: estado x nivel de riesgo x periodo de registro.
+
+Cada `CeldaReporte` guarda clientes, suma de probabilidades de abandono y
+clientes de alto riesgo (probabilidad >= `DASHBOARD_REPORTES_UMBRAL_ALTO_RIESGO`)
+para una semana o un mes de `fecha_registro`. La página de reportes y su JSON
+solo leen celdas (unas decenas por periodo), sin tocar `clientes_cliente`.
+
+- `construir()` agrupa toda la tabla en una sola consulta (por día, estado y
+  nivel) y pliega los días en semanas y meses en Python.
+- Las señales de `dashboard.signals` marcan en `ReportePendiente` la fecha de
+  registro de cada cliente escrito; `actualizar_pendientes()` recalcula solo
+  las semanas y meses de esas fechas (consultas por rango sobre el índice de
+  `fecha_registro`). Corre como tarea periódica.
+- Las escrituras masivas sin señales (el recálculo de riesgo por SQL directo)
+  se recogen con la reconstrucción diaria.
+
+Cada actualización incrementa la versión de los cubos (`Indicador`
+`reportes:version`), que identifica la foto de datos servida.
+"""
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from clientes.models import Cliente
+
+from .models import CeldaReporte, Indicador, ReportePendiente
+
+GRANULARIDADES = (CeldaReporte.SEMANA, CeldaReporte.MES)
+UMBRAL_ALTO_RIESGO = 0.8  # el mismo umbral que las alertas de alto riesgo
+PERIODOS = 12
+MAX_PERIODOS = 260
+# Con más periodos pendientes que esto, reconstruir todo es más barato
+MAX_PERIODOS_INCREMENTAL = 200
+
+VERSION = 'reportes:version'
+CONSTRUIDO = 'reportes:construido_en'
+ACTUALIZADO = 'reportes:actualizado_en'
+MILISEGUNDOS = 'reportes:milisegundos'
+
+
+def inicio_periodo(fecha: date, granularidad: str) -> date:
+    if granularidad == CeldaReporte.SEMANA:
+        return fecha - timedelta(days=fecha.weekday())
+    return fecha.replace(day=1)
+
+
+def fin_periodo(inicio: date, granularidad: str) -> date:
+    """Primer día del periodo siguiente."""
+    if granularidad == CeldaReporte.SEMANA:
+        return inicio + timedelta(days=7)
+    return (inicio + timedelta(days=32)).replace(day=1)
+
+
+def umbral_alto_riesgo() -> float:
+    return getattr(settings, 'DASHBOARD_REPORTES_UMBRAL_ALTO_RIESGO', UMBRAL_ALTO_RIESGO)
+
+
+def _por_dia(filtro: Q | None = None):
+    """(fecha_registro, estado, nivel_riesgo, clientes, suma, altos) agrupados en una consulta."""
+    qs = Cliente.objects.all() if filtro is None else Cliente.objects.filter(filtro)
+    return (
+        qs.order_by()
+        .values_list('fecha_registro', 'estado', 'nivel_riesgo')
+        .annotate(
+            clientes=Count('id'),
+            suma=Sum('probabilidad_abandono'),
+            altos=Count('id', filter=Q(probabilidad_abandono__gte=umbral_alto_riesgo())),
+        )
+        .iterator(chunk_size=5000)
+    )
+
+
+def _plegar(filas, periodos: set[tuple[str, date]] | None = None) -> list[CeldaReporte]:
+    """Suma las filas por día en celdas de semana y mes (solo `periodos`, si se indican)."""
+    celdas: dict[tuple, list] = defaultdict(lambda: [0, 0.0, 0])
+    for fecha, estado, nivel, clientes, suma, altos in filas:
+        for granularidad in GRANULARIDADES:
+            periodo = inicio_periodo(fecha, granularidad)
+            if periodos is not None and (granularidad, periodo) not in periodos:
+                continue
+            celda = celdas[(granularidad, periodo, estado, nivel)]
+            celda[0] += clientes
+            celda[1] += suma or 0.0
+            celda[2] += altos
+    return [
+        CeldaReporte(
+            granularidad=granularidad, periodo=periodo, estado=estado, nivel_riesgo=nivel,
+            clientes=clientes, suma_probabilidad=suma, alto_riesgo=altos,
+        )
+        for (granularidad, periodo, estado, nivel), (clientes, suma, altos) in celdas.items()
+    ]
+
+
+def _registrar_version(segundos: float, completa: bool) -> int:
+    ahora = int(time.time())
+    Indicador.objects.bulk_create([Indicador(clave=VERSION)], ignore_conflicts=True)
+    Indicador.objects.filter(clave=VERSION).update(valor=F('valor') + 1)
+    valores = {ACTUALIZADO: ahora, MILISEGUNDOS: round(segundos * 1000)}
+    if completa:
+        valores[CONSTRUIDO] = ahora
+    Indicador.objects.bulk_create(
+        [Indicador(clave=clave, valor=valor) for clave, valor in valores.items()],
+        update_conflicts=True,
+        unique_fields=['clave'],
+        update_fields=['valor', 'actualizado'],
+    )
+    return Indicador.objects.get(clave=VERSION).valor
+
+
+def version() -> int:
+    """Versión de los cubos; 0 si nunca se construyeron."""
+    return Indicador.objects.filter(clave=VERSION).values_list('valor', flat=True).first() or 0
+
+
+def marcar(fecha: date | None) -> None:
+    """Deja pendiente la fecha de registro `fecha` (en la transacción en curso)."""
+    if fecha is None:
+        return
+    ReportePendiente.objects.bulk_create(
+        [ReportePendiente(fecha=fecha, marcado=timezone.now())],
+        update_conflicts=True,
+        unique_fields=['fecha'],
+        update_fields=['marcado'],
+    )
+
+
+def construir() -> dict:
+    """Reconstruye todas las celdas en una pasada sobre `Cliente`."""
+    inicio = time.perf_counter()
+    marca = timezone.now()
+    # La lectura va fuera de la transacción: en SQLite la escritura bloquea a los demás
+    celdas = _plegar(_por_dia())
+    with transaction.atomic():
+        CeldaReporte.objects.all().delete()
+        CeldaReporte.objects.bulk_create(celdas, batch_size=1000)
+        # Lo marcado hasta aquí ya quedó incluido
+        ReportePendiente.objects.filter(marcado__lte=marca).delete()
+        segundos = time.perf_counter() - inicio
+        nueva = _registrar_version(segundos, completa=True)
+    return {'ok': True, 'completa': True, 'celdas': len(celdas), 'version': nueva, 'segundos': round(segundos, 3)}
+
+
+def actualizar_pendientes() -> dict:
+    """Recalcula solo las semanas y meses con fechas pendientes."""
+    if not version():
+        return construir()
+
+    inicio = time.perf_counter()
+    marca = timezone.now()
+    fechas = list(ReportePendiente.objects.filter(marcado__lte=marca).values_list('fecha', flat=True))
+    if not fechas:
+        return {'ok': True, 'completa': False, 'periodos': 0, 'version': version(), 'segundos': 0.0}
+    periodos = {(g, inicio_periodo(f, g)) for f in fechas for g in GRANULARIDADES}
+    if len(periodos) > MAX_PERIODOS_INCREMENTAL:
+        return construir()
+
+    # Semanas que cruzan meses: se leen todos los días de cada periodo
+    rangos = sorted((p, fin_periodo(p, g)) for g, p in periodos)
+    unidos = [list(rangos[0])]
+    for desde, hasta in rangos[1:]:
+        if desde <= unidos[-1][1]:
+            unidos[-1][1] = max(unidos[-1][1], hasta)
+        else:
+            unidos.append([desde, hasta])
+    filtro = Q()
+    for desde, hasta in unidos:
+        filtro |= Q(fecha_registro__gte=desde, fecha_registro__lt=hasta)
+    celdas = _plegar(_por_dia(filtro), periodos)
+
+    borrar = Q()
+    for granularidad, periodo in periodos:
+        borrar |= Q(granularidad=granularidad, periodo=periodo)
+    with transaction.atomic():
+        CeldaReporte.objects.filter(borrar).delete()
+        CeldaReporte.objects.bulk_create(celdas, batch_size=1000)
+        ReportePendiente.objects.filter(fecha__in=fechas, marcado__lte=marca).delete()
+        segundos = time.perf_counter() - inicio
+        nueva = _registrar_version(segundos, completa=False)
+    return {
+        'ok': True, 'completa': False, 'periodos': len(periodos), 'celdas': len(celdas),
+        'version': nueva, 'segundos': round(segundos, 3),
+    }
+
+
+@dataclass
+class Reporte:
+    granularidad: str
+    estado: str = ''
+    nivel_riesgo: str = ''
+    limite: int = PERIODOS
+    filas: list[dict] = field(default_factory=list)
+    pivote: list[dict] = field(default_factory=list)
+    total: dict = field(default_factory=dict)
+    version: int = 0
+    actualizado_en: datetime | None = None
+    pendientes: int = 0
+
+    def como_dict(self) -> dict:
+        return {
+            'granularidad': self.granularidad,
+            'filtros': {'estado': self.estado or None, 'nivel_riesgo': self.nivel_riesgo or None},
+            'periodos': self.filas,
+            'estado_x_nivel': self.pivote,
+            'total': self.total,
+            'version': self.version,
+            'actualizado_en': self.actualizado_en.isoformat() if self.actualizado_en else None,
+            'pendientes': self.pendientes,
+        }
+
+
+def _resumen(clientes: int, suma: float, altos: int) -> dict:
+    return {
+        'clientes': clientes,
+        'probabilidad_media': round(suma / clientes * 100, 2) if clientes else None,
+        'alto_riesgo': altos,
+    }
+
+
+def consultar(granularidad: str = CeldaReporte.MES, estado: str = '', nivel_riesgo: str = '',
+              periodos: int = PERIODOS) -> Reporte:
+    """Los últimos `periodos` periodos de `granularidad`, leídos solo de las celdas."""
+    celdas = CeldaReporte.objects.filter(granularidad=granularidad)
+    if estado:
+        celdas = celdas.filter(estado=estado)
+    if nivel_riesgo:
+        celdas = celdas.filter(nivel_riesgo=nivel_riesgo)
+    recientes = list(
+        celdas.order_by('-periodo').values_list('periodo', flat=True).distinct()[:periodos]
+    )
+    if recientes:
+        celdas = celdas.filter(periodo__gte=recientes[-1])
+    else:
+        celdas = celdas.none()
+
+    por_periodo: dict[date, dict] = {}
+    pivote: dict[tuple, list] = defaultdict(lambda: [0, 0.0, 0])
+    total = [0, 0.0, 0]
+    for celda in celdas.order_by('-periodo', 'estado', 'nivel_riesgo'):
+        fila = por_periodo.setdefault(celda.periodo, {'suma': [0, 0.0, 0], 'por_nivel': {}})
+        for acumulado in (fila['suma'], pivote[(celda.estado, celda.nivel_riesgo)], total):
+            acumulado[0] += celda.clientes
+            acumulado[1] += celda.suma_probabilidad
+            acumulado[2] += celda.alto_riesgo
+        fila['por_nivel'][celda.nivel_riesgo] = fila['por_nivel'].get(celda.nivel_riesgo, 0) + celda.clientes
+
+    meta = dict(Indicador.objects.filter(clave__in=[VERSION, ACTUALIZADO]).values_list('clave', 'valor'))
+    return Reporte(
+        granularidad=granularidad,
+        estado=estado,
+        nivel_riesgo=nivel_riesgo,
+        limite=periodos,
+        filas=[
+            {'periodo': periodo.isoformat(), **_resumen(*fila['suma']), 'por_nivel': fila['por_nivel']}
+            for periodo, fila in por_periodo.items()
+        ],
+        pivote=[
+            {'estado': estado_, 'nivel_riesgo': nivel, **_resumen(*valores)}
+            for (estado_, nivel), valores in sorted(pivote.items())
+        ],
+        total=_resumen(*total),
+        version=meta.get(VERSION, 0),
+        actualizado_en=(
+            datetime.fromtimestamp(meta[ACTUALIZADO], tz=dt_timezone.utc) if ACTUALIZADO in meta else None
+        ),
+        pendientes=ReportePendiente.objects.count(),
+    )
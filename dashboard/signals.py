@@ -0,0 +1,55 @@
+"""Mantienen los contadores de `dashboard.kpis` y los cubos de `dashboard.reportes` al escribir."""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from clientes.models import Cliente
+from clientes.signals import clientes_actualizados_en_lote, clientes_creados_en_lote
+from predicciones.signals import predicciones_registradas
+
+from . import kpis, reportes
+
+
+@receiver(post_save, sender=Cliente)
+def cliente_guardado(sender, instance, created, **kwargs):
+    reportes.marcar(instance.fecha_registro)
+    if created:
+        kpis.ajustar(kpis.CLIENTES, 1)
+        kpis.ajustar(kpis.clave_registrados(instance.fecha_registro), 1, crear=True)
+
+
+@receiver(clientes_creados_en_lote)
+def clientes_importados(sender, cantidad, fecha, **kwargs):
+    reportes.marcar(fecha)
+    kpis.ajustar(kpis.CLIENTES, cantidad)
+    kpis.ajustar(kpis.clave_registrados(fecha), cantidad, crear=True)
+
+
+@receiver(clientes_actualizados_en_lote)
+def clientes_actualizados(sender, fechas, **kwargs):
+    for fecha in fechas:
+        reportes.marcar(fecha)
+
+
+@receiver(post_delete, sender=Cliente)
+def cliente_borrado(sender, instance, **kwargs):
+    reportes.marcar(instance.fecha_registro)
+    kpis.ajustar(kpis.CLIENTES, -1)
+    # Fuera de la ventana no hay contador por día (la reconciliación los poda)
+    kpis.ajustar(kpis.clave_registrados(instance.fecha_registro), -1)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def usuario_cambiado(sender, instance, **kwargs):
+    # Los logins solo tocan last_login; el resto se recuenta (la tabla es chica)
+    if kwargs.get('update_fields') and set(kwargs['update_fields']) <= {'last_login'}:
+        return
+    if kpis.Indicador.objects.filter(clave=kpis.CLIENTES).exists():
+        kpis.fijar(kpis.USUARIOS_ACTIVOS, kpis.contar_usuarios_activos())
+
+
+
+@receiver(predicciones_registradas)
+def predicciones_escritas(sender, cantidad, **kwargs):
+    kpis.ajustar(kpis.PREDICCIONES, cantidad)
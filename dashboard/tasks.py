@@ -0,0 +1,33 @@
+from dashboard import informes, kpis, reportes
+from predicciones.task_queue import shared_task
+
+
+@shared_task
+def reconciliar_kpis():
+    """Recalcula los contadores del dashboard desde las tablas (corrige la deriva de las señales)."""
+    return kpis.reconciliar()
+
+
+@shared_task
+def actualizar_reportes():
+    """Incorpora a los cubos de reportes los periodos con clientes escritos desde la última vez."""
+    return reportes.actualizar_pendientes()
+
+
+@shared_task
+def reconstruir_reportes():
+    """Reconstruye los cubos completos (recoge escrituras masivas sin señales, como el recálculo)."""
+    return reportes.construir()
+
+
+@shared_task
+def generar_informes(segmentos=None, por=None, procesos=None):
+    """Genera (o reutiliza de la caché) un informe PDF por segmento; devuelve rutas y tiempos por etapa.
+
+    `segmentos` es una lista de dicts (`estado`, `nivel_riesgo`, `analista`);
+    `por` arma uno por valor de esa dimensión (ver `informes.segmentos_por`).
+    """
+    if por:
+        segmentos = informes.segmentos_por(por)
+    resultado = informes.generar_lote(segmentos or [{}], procesos=procesos)
+    return {'ok': not any(i.error for i in resultado), 'informes': [i.como_dict() for i in resultado]}
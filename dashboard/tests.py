@@ -1,3 +1,192 @@
-from django.test import TestCase
+import tempfile
+from datetime import date
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from clientes.models import Cliente
+from predicciones.models import Tarea
+
+from . import informes, kpis, reportes
+from .models import CeldaReporte
+from .tasks import generar_informes
+
+
+class KpisTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@ejemplo.com', 'x')
+        Cliente.objects.bulk_create(Cliente(nombre='N', apellido='A', email=f'c{i}@ejemplo.com') for i in range(5))
+
+    def valores(self):
+        foto = kpis.foto()
+        return foto['total_clientes'], foto['clientes_ult_30_dias'], foto['total_usuarios_activos']
+
+    def test_senales_mantienen_los_contadores(self):
+        self.assertEqual(self.valores(), (5, 5, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            Cliente.objects.create(nombre='N', apellido='A', email='nuevo@ejemplo.com')
+        self.assertEqual(self.valores(), (6, 6, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            Cliente.objects.filter(email__in=['c0@ejemplo.com', 'c1@ejemplo.com']).delete()
+        self.assertEqual(self.valores(), (4, 4, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            get_user_model().objects.create_user('analista', 'analista@ejemplo.com', 'x')
+        self.assertEqual(self.valores(), (4, 4, 2))
+
+    def test_reconciliar_corrige_la_deriva(self):
+        kpis.foto()
+        with self.captureOnCommitCallbacks(execute=True):
+            kpis.ajustar(kpis.CLIENTES, 100)
+        self.assertEqual(self.valores()[0], 105)
+        with self.captureOnCommitCallbacks(execute=True):
+            kpis.reconciliar()
+        self.assertEqual(self.valores(), (5, 5, 1))
+
+    def test_inicio_desde_cache_sin_agregados(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('dashboard:inicio'))
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('dashboard:inicio'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse([q['sql'] for q in consultas.captured_queries if 'COUNT(' in q['sql'].upper()])
+        self.assertTrue(respuesta.context['desde_cache'])
+
+
+class ReportesTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@ejemplo.com', 'x')
+        datos = [
+            # (fecha_registro, estado, nivel_riesgo, probabilidad)
+            (date(2026, 3, 30), 'activo', 'Alto', 0.9),    # semana que cruza a abril
+            (date(2026, 4, 2), 'activo', 'Alto', 0.7),
+            (date(2026, 4, 2), 'inactivo', 'Bajo', 0.1),
+            (date(2026, 4, 20), 'activo', 'Medio', 0.4),
+            (date(2026, 5, 5), 'inactivo', 'Alto', 0.85),
+        ]
+        for i, (fecha, estado, nivel, probabilidad) in enumerate(datos):
+            cliente = Cliente.objects.create(
+                nombre='N', apellido='A', email=f'r{i}@ejemplo.com',
+                estado=estado, nivel_riesgo=nivel, probabilidad_abandono=probabilidad,
+            )
+            # fecha_registro es auto_now_add; update() no pasa por las señales
+            Cliente.objects.filter(pk=cliente.pk).update(fecha_registro=fecha)
+
+    def celdas(self):
+        return sorted(
+            (c.granularidad, c.periodo, c.estado, c.nivel_riesgo, c.clientes, round(c.suma_probabilidad, 6), c.alto_riesgo)
+            for c in CeldaReporte.objects.all()
+        )
+
+    def test_construir_agrupa_por_semana_y_mes(self):
+        resultado = reportes.construir()
+        self.assertEqual(resultado['version'], 1)
+        abril = CeldaReporte.objects.get(granularidad='mes', periodo=date(2026, 4, 1), estado='activo', nivel_riesgo='Alto')
+        self.assertEqual((abril.clientes, abril.alto_riesgo), (1, 0))
+        semana = CeldaReporte.objects.get(granularidad='semana', periodo=date(2026, 3, 30), estado='activo', nivel_riesgo='Alto')
+        self.assertEqual((semana.clientes, semana.alto_riesgo), (2, 1))
+        self.assertAlmostEqual(semana.suma_probabilidad, 1.6)
+
+    def test_actualizacion_incremental_igual_a_reconstruir(self):
+        reportes.construir()
+        cliente = Cliente.objects.get(email='r1@ejemplo.com')
+        cliente.estado = 'inactivo'
+        cliente.save()
+        Cliente.objects.get(email='r4@ejemplo.com').delete()
+        Cliente.objects.create(nombre='N', apellido='A', email='nuevo@ejemplo.com', probabilidad_abandono=0.95)
+
+        resultado = reportes.actualizar_pendientes()
+        self.assertFalse(resultado['completa'])
+        incremental = self.celdas()
+        reportes.construir()
+        self.assertEqual(incremental, self.celdas())
+        self.assertEqual(reportes.actualizar_pendientes()['periodos'], 0)
+
+    def test_reportes_solo_leen_celdas(self):
+        reportes.construir()
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('dashboard:reportes_json'), {'granularidad': 'mes', 'estado': 'activo'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse([q['sql'] for q in consultas.captured_queries if 'clientes_cliente' in q['sql']])
+        datos = respuesta.json()
+        self.assertEqual([p['periodo'] for p in datos['periodos']], ['2026-04-01', '2026-03-01'])
+        self.assertEqual(datos['total']['clientes'], 3)
+
+        self.assertEqual(self.client.get(reverse('dashboard:reportes_json'), {'granularidad': 'dia'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('dashboard:reportes')).status_code, 200)
+
+
+def _pdf_falso(html, ruta):
+    # Sin WeasyPrint en los tests: el "PDF" es el HTML renderizado
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.write_text(html)
+    return ruta.stat().st_size
+
+
+@mock.patch('dashboard.informes.escribir_pdf', _pdf_falso)
+class InformesTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(DASHBOARD_INFORMES_DIR=Path(directorio.name), DASHBOARD_INFORMES_PROCESOS=0)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@ejemplo.com', 'x')
+        Cliente.objects.create(nombre='N', apellido='A', email='a@ejemplo.com', estado='activo')
+        Cliente.objects.create(nombre='N', apellido='A', email='i@ejemplo.com', estado='inactivo')
+        reportes.construir()
+
+    def test_lote_por_segmento_usa_la_cache(self):
+        primeros = informes.generar_lote(informes.segmentos_por('estado'))
+        self.assertEqual(len({i.ruta for i in primeros}), 2)
+        self.assertFalse(any(i.desde_cache or i.error for i in primeros))
+        self.assertEqual(set(primeros[0].tiempos), {'contexto', 'html', 'pdf'})
+        self.assertIn('Activo', primeros[0].ruta.read_text())
+
+        segundos = informes.generar_lote(informes.segmentos_por('estado'))
+        self.assertTrue(all(i.desde_cache for i in segundos))
+        self.assertEqual([i.ruta for i in segundos], [i.ruta for i in primeros])
+
+        # Datos nuevos: otra versión, otro archivo; el anterior no se pisa
+        Cliente.objects.create(nombre='N', apellido='A', email='a2@ejemplo.com', estado='activo')
+        reportes.actualizar_pendientes()
+        terceros = informes.generar_lote([{'estado': 'activo'}])
+        self.assertFalse(terceros[0].desde_cache)
+        self.assertNotEqual(terceros[0].ruta, primeros[0].ruta)
+        self.assertTrue(primeros[0].ruta.exists())
+
+    @override_settings(PREDICCIONES_TASK_BACKEND='inmediato')
+    def test_vista_pdf(self):
+        self.client.force_login(self.admin)
+        respuesta = self.client.get(reverse('dashboard:reportes_pdf'), {'estado': 'activo'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+        respuesta.close()
+
+    def test_vista_pdf_encola_si_no_esta_en_cache(self):
+        self.client.force_login(self.admin)
+        respuesta = self.client.get(reverse('dashboard:reportes_pdf'), {'estado': 'inactivo'})
+        self.assertEqual(respuesta.status_code, 202)
+        self.assertEqual(respuesta.json()['estado'], 'en_cola')
+
+    @override_settings(PREDICCIONES_TASK_BACKEND='local')
+    def test_vista_pdf_encola_una_sola_tarea_por_segmento(self):
+        self.client.force_login(self.admin)
+        url = reverse('dashboard:reportes_pdf')
+        for _ in range(2):
+            self.assertEqual(self.client.get(url, {'estado': 'inactivo'}).status_code, 202)
+        self.assertEqual(Tarea.objects.filter(nombre=generar_informes.name).count(), 1)
+
+        # Otro segmento es otra tarea; una vez terminada, se puede volver a encolar
+        self.client.get(url, {'estado': 'activo'})
+        self.assertEqual(Tarea.objects.filter(nombre=generar_informes.name).count(), 2)
+        Tarea.objects.update(estado=Tarea.COMPLETADA)
+        self.client.get(url, {'estado': 'inactivo'})
+        self.assertEqual(Tarea.objects.filter(nombre=generar_informes.name, estado=Tarea.PENDIENTE).count(), 1)
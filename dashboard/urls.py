@@ -10,4 +10,6 @@ urlpatterns = [
     path('configuracion/', views.configuracion, name='configuracion'),
     path('ayuda/', views.ayuda, name='ayuda'),
     path('reportes/', views.reportes, name='reportes'),
+    path('reportes/json/', views.reportes_json, name='reportes_json'),
+    path('reportes/pdf/', views.reportes_pdf, name='reportes_pdf'),
 ]
@@ -1,83 +1,22 @@
 from __future__ import annotations
 
-from datetime import timedelta
-from functools import lru_cache
-
-from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.db import OperationalError
-from django.db import models
+from django.http import FileResponse, JsonResponse
 from django.shortcuts import render
-from django.utils import timezone
 
 from clientes.models import Cliente
+from predicciones.task_queue import encolar_una_vez
 
-
-@lru_cache(maxsize=1)
-def _get_predicciones_models():
-    class PrediccionesCliente(models.Model):
-        nombre = models.CharField(max_length=100)
-        email = models.EmailField()
-
-        class Meta:
-            managed = False
-            db_table = 'predicciones_cliente'
-            app_label = 'predicciones'
-
-        def __str__(self) -> str:  # pragma: no cover
-            return self.nombre
-
-    class Prediccion(models.Model):
-        fecha_prediccion = models.DateTimeField()
-        algoritmo_usado = models.CharField(max_length=50)
-        probabilidad_churn = models.FloatField()
-        nivel_riesgo = models.CharField(max_length=10)
-        cliente = models.ForeignKey(
-            PrediccionesCliente,
-            on_delete=models.DO_NOTHING,
-            db_column='cliente_id',
-            related_name='+',
-        )
-
-        class Meta:
-            managed = False
-            db_table = 'predicciones_prediccion'
-            app_label = 'predicciones'
-
-    return PrediccionesCliente, Prediccion
+from . import informes, kpis, reportes as cubos
+from .tasks import generar_informes
+from .models import CeldaReporte
 
 
 @login_required
 def inicio(request):
-    hoy = timezone.localdate()
-    desde_30_dias = hoy - timedelta(days=30)
-
-    total_clientes = Cliente.objects.count()
-    clientes_ult_30_dias = Cliente.objects.filter(fecha_registro__gte=desde_30_dias).count()
-
-    User = get_user_model()
-    total_usuarios_activos = User.objects.filter(is_active=True).count()
-
-    total_predicciones = None
-    ultimas_predicciones = []
-    try:
-        _, Prediccion = _get_predicciones_models()
-        total_predicciones = Prediccion.objects.count()
-        ultimas_predicciones = list(
-            Prediccion.objects.select_related('cliente')
-            .order_by('-fecha_prediccion')[:5]
-        )
-    except OperationalError:
-        # Tablas no disponibles (p.ej. migraciones no aplicadas en esa app)
-        total_predicciones = None
-        ultimas_predicciones = []
-
+    # Conteos desde dashboard.kpis (caché + contadores), sin agregados por petición
     context = {
-        'total_clientes': total_clientes,
-        'total_usuarios_activos': total_usuarios_activos,
-        'total_predicciones': total_predicciones,
-        'ultimas_predicciones': ultimas_predicciones,
-        'clientes_ult_30_dias': clientes_ult_30_dias,
+        **kpis.foto(),
         'page_title': 'Dashboard',
         'page_subtitle': 'Resumen del sistema',
     }
@@ -94,9 +33,72 @@ def ayuda(request):
     return render(request, 'dashboard/ayuda.html', {'page_title': 'Ayuda'})
 
 
+def _reporte_de(datos):
+    """Lee los filtros de `datos` (GET) y arma el reporte; ValueError si alguno no es válido."""
+    granularidad = datos.get('granularidad') or CeldaReporte.MES
+    if granularidad not in cubos.GRANULARIDADES:
+        raise ValueError(f'granularidad debe ser una de: {", ".join(cubos.GRANULARIDADES)}')
+    try:
+        periodos = int(datos.get('periodos') or cubos.PERIODOS)
+    except ValueError:
+        raise ValueError('periodos debe ser un entero') from None
+    periodos = max(1, min(periodos, cubos.MAX_PERIODOS))
+    return cubos.consultar(
+        granularidad,
+        estado=datos.get('estado', ''),
+        nivel_riesgo=datos.get('nivel_riesgo', ''),
+        periodos=periodos,
+    )
+
+
 @login_required
 def reportes(request):
-    return render(request, 'dashboard/reportes.html', {'page_title': 'Reportes'})
+    # Solo lee celdas precalculadas (dashboard.reportes), no la tabla de clientes
+    try:
+        reporte = _reporte_de(request.GET)
+    except ValueError:
+        reporte = cubos.consultar()
+    return render(request, 'dashboard/reportes.html', {
+        'page_title': 'Reportes',
+        'reporte': reporte,
+        'granularidades': CeldaReporte.GRANULARIDAD_CHOICES,
+        'estados': Cliente.ESTADO_CHOICES,
+        'niveles': Cliente.RIESGO_CHOICES,
+        'umbral_alto_riesgo': round(cubos.umbral_alto_riesgo() * 100),
+    })
+
+
+@login_required
+def reportes_json(request):
+    try:
+        reporte = _reporte_de(request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(reporte.como_dict())
+
+
+@login_required
+def reportes_pdf(request):
+    """Reporte semanal en PDF del segmento; si no está en caché se encola y responde 202."""
+    segmento = {
+        'estado': request.GET.get('estado', ''),
+        'nivel_riesgo': request.GET.get('nivel_riesgo', ''),
+    }
+    contexto = informes.contexto_semanal(**segmento)
+    informe = informes.ubicar(informes.PLANTILLA_SEMANAL, contexto, segmento)
+    if not informe.desde_cache:
+        # Una sola tarea por segmento aunque se pida varias veces mientras espera;
+        # con el backend 'inmediato' se genera acá mismo
+        encolar_una_vez(generar_informes, segmentos=[informe.segmento])
+        informe = informes.ubicar(informes.PLANTILLA_SEMANAL, contexto, segmento)
+    if informe.desde_cache:
+        return FileResponse(
+            open(informe.ruta, 'rb'), as_attachment=True, filename=informe.ruta.name, content_type='application/pdf',
+        )
+    return JsonResponse(
+        {'estado': 'en_cola', 'clave': informe.clave, 'url': request.get_full_path()},
+        status=202,
+    )
 
 
 # Backwards-compatible alias (si ya se estaba importando en otras partes)
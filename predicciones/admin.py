@@ -1,3 +1,32 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import HistorialPrediccion, ResumenMensualPrediccion, Tarea, Trabajo
+
+
+@admin.register(Trabajo)
+class TrabajoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'estado', 'etapa', 'creado', 'finalizado')
+    list_filter = ('tipo', 'estado')
+    readonly_fields = ('creado', 'iniciado', 'finalizado')
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'nombre', 'estado', 'intentos', 'periodica', 'ejecutar_desde', 'finalizado')
+    list_filter = ('estado', 'nombre')
+    readonly_fields = ('creado', 'iniciado', 'finalizado')
+
+
+@admin.register(HistorialPrediccion)
+class HistorialPrediccionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'cliente', 'fecha_prediccion', 'probabilidad', 'nivel_riesgo', 'version_modelo', 'origen')
+    list_filter = ('origen', 'nivel_riesgo')
+    raw_id_fields = ('cliente',)
+    # El COUNT(*) del paginador recorre toda la tabla
+    show_full_result_count = False
+
+
+@admin.register(ResumenMensualPrediccion)
+class ResumenMensualPrediccionAdmin(admin.ModelAdmin):
+    list_display = ('mes', 'nivel_riesgo', 'cantidad', 'probabilidad_media')
+    list_filter = ('nivel_riesgo',)
@@ -1,6 +1,31 @@
+import logging
+
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 
 class PrediccionesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'predicciones'
+
+    def ready(self):
+        # Reporte opcional por worker: mapea el bosque compilado al arrancar y
+        # registra memoria residente vs compartida (ver memoria.uso_memoria).
+        if getattr(settings, 'PREDICCIONES_MEMORY_REPORT', False):
+            from .memoria import uso_memoria
+            from .model_cache import modelo_vigente
+
+            try:
+                vigente = modelo_vigente().obtener()
+                vigente.bosque
+            except FileNotFoundError:
+                logger.info('No hay un bosque compilado publicado en el registro')
+                return
+            uso = uso_memoria([vigente.ruta('bosque')])
+            logger.info(
+                'Worker %s: rss=%s KB compartida=%s KB privada=%s KB; modelo mapeado: %s',
+                uso['pid'], uso.get('rss_kb'), uso.get('compartida_kb'), uso.get('privada_kb'),
+                uso.get('archivos'),
+            )
@@ -0,0 +1,92 @@
+"""Codificador de features de Cliente ajustado en entrenamiento.
+
+Reemplaza `pd.get_dummies` + el bucle de columnas faltantes en inferencia:
+las categorías se fijan al entrenar y `transform` produce directamente un
+`np.ndarray` en el orden de columnas del modelo, sin pandas.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+
+def _numero(valor) -> float:
+    if valor is None:
+        return 0.0
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = str(valor).strip()
+    if not texto.isdigit():
+        texto = ''.join(ch for ch in texto if ch.isdigit())
+    return float(texto) if texto else 0.0
+
+
+def _lector(filas):
+    """Devuelve una función (fila, campo) -> valor para dicts o instancias."""
+    if filas and isinstance(filas[0], dict):
+        return lambda fila, campo: fila.get(campo)
+    return getattr
+
+
+class ClienteEncoder:
+    """One-hot con `drop_first` sobre categorías aprendidas en `fit`.
+
+    Las columnas se nombran igual que `pd.get_dummies` (`campo_valor`) y la
+    primera categoría (orden alfabético) de cada campo queda como base, de modo
+    que un valor desconocido en inferencia se codifica como la categoría base.
+    """
+
+    def __init__(self, numericas=('telefono',), categoricas=('nivel_riesgo',)):
+        self.numericas = tuple(numericas)
+        self.categoricas = tuple(categoricas)
+        self.categorias_: dict[str, list[str]] = {}
+        self.columnas_: list[str] = []
+        self._indices: dict[str, dict[str, int]] = {}
+
+    @property
+    def campos(self) -> tuple[str, ...]:
+        return self.numericas + self.categoricas
+
+    def fit(self, filas) -> 'ClienteEncoder':
+        filas = list(filas)
+        leer = _lector(filas)
+        self.categorias_ = {
+            campo: sorted({str(v) for v in (leer(f, campo) for f in filas) if v is not None})
+            for campo in self.categoricas
+        }
+        self.columnas_ = list(self.numericas)
+        for campo in self.categoricas:
+            self.columnas_.extend(f'{campo}_{cat}' for cat in self.categorias_[campo][1:])
+        self._construir_indices()
+        return self
+
+    def _construir_indices(self) -> None:
+        posicion = {col: i for i, col in enumerate(self.columnas_)}
+        self._indices = {
+            campo: {cat: posicion[f'{campo}_{cat}'] for cat in cats[1:]}
+            for campo, cats in self.categorias_.items()
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._construir_indices()
+
+    def transform(self, filas) -> np.ndarray:
+        """Matriz float64 (n_filas, n_columnas) para dicts o instancias de Cliente."""
+        filas = filas if isinstance(filas, list) else list(filas)
+        X = np.zeros((len(filas), len(self.columnas_)), dtype=np.float64)
+        if not filas:
+            return X
+        leer = _lector(filas)
+
+        for j, campo in enumerate(self.numericas):
+            X[:, j] = [_numero(leer(f, campo)) for f in filas]
+
+        for campo, indices in self._indices.items():
+            cols = [indices.get(str(leer(f, campo)), -1) for f in filas]
+            cols = np.fromiter(cols, dtype=np.intp, count=len(filas))
+            filas_activas = np.flatnonzero(cols >= 0)
+            X[filas_activas, cols[filas_activas]] = 1.0
+        return X
+
+    def transform_uno(self, fila) -> np.ndarray:
+        return self.transform([fila])
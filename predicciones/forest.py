@@ -0,0 +1,181 @@
+"""Bosque aleatorio compilado a arreglos planos de NumPy.
+
+`BosqueCompilado.desde_sklearn` aplana todos los árboles de un
+RandomForest/ExtraTrees (o un solo DecisionTree) en arreglos contiguos
+`feature`, `threshold`, `hijos` (left/right) y `value`, con índices globales
+de nodo. `predict_proba` recorre todos los árboles para todo el lote a la vez,
+un nivel por iteración (solo los pares fila/árbol que aún no llegan a una
+hoja), sin validaciones de sklearn ni despacho por árbol.
+
+El recorrido por niveles elimina el overhead fijo por llamada (validación,
+DataFrames, despacho por árbol) y gana en lotes chicos; en lotes grandes el
+recorrido en Cython de sklearn sigue siendo más rápido (ver `bench_forest`).
+
+Conserva `feature_importances_` del modelo original (las usan las
+explicaciones del perfil en `churn_dashboard`).
+
+Solo depende de NumPy (y joblib para persistir), así que también se puede
+usar desde `churn_dashboard` fuera de Django.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import numpy as np
+
+_CAMPOS = ('feature', 'threshold', 'hijos', 'value', 'raices', 'clases')
+
+
+class BosqueCompilado:
+    # Filas por bloque en predict_proba; acota los arreglos (filas x árboles) de nodos
+    tamano_bloque = 8192
+
+    def __init__(self, feature, threshold, hijos, value, raices, clases, n_features, profundidad, hoja=None,
+                 importancias=None):
+        self.feature = feature
+        self.threshold = threshold
+        # hijos[i] = (izquierdo, derecho); plano, `hijos_planos[2 * i + va_a_la_derecha]`
+        self.hijos = hijos
+        self.value = value
+        self.raices = raices
+        self.clases = clases
+        self.n_features_in_ = int(n_features)
+        self.profundidad = int(profundidad)
+        self._hijos_planos = hijos.reshape(-1)
+        self._hoja = hoja if hoja is not None else self.left == np.arange(self.left.shape[0])
+        self.importancias = importancias
+
+    @property
+    def feature_importances_(self):
+        # Como en sklearn: sin importancias (bosques guardados antes de conservarlas) no hay atributo
+        if self.importancias is None:
+            raise AttributeError('El bosque compilado no tiene feature_importances_')
+        return self.importancias
+
+    @property
+    def left(self):
+        return self.hijos[:, 0]
+
+    @property
+    def right(self):
+        return self.hijos[:, 1]
+
+    @property
+    def classes_(self):
+        return self.clases
+
+    @classmethod
+    def desde_sklearn(cls, modelo) -> 'BosqueCompilado':
+        estimadores = getattr(modelo, 'estimators_', None)
+        if estimadores is None:
+            estimadores = [modelo]
+        if not estimadores or not all(hasattr(e, 'tree_') for e in estimadores):
+            raise TypeError(f'{type(modelo).__name__} no es un modelo de árboles compilable')
+        if getattr(modelo, 'n_outputs_', 1) != 1:
+            raise TypeError('Solo se soportan modelos de una salida')
+
+        features, thresholds, lefts, rights, values, raices = [], [], [], [], [], []
+        desplazamiento = 0
+        profundidad = 0
+        for estimador in estimadores:
+            arbol = estimador.tree_
+            n = arbol.node_count
+            hoja = arbol.children_left < 0
+            propio = np.arange(desplazamiento, desplazamiento + n, dtype=np.int64)
+
+            # Las hojas apuntan a sí mismas: iterar de más no cambia el resultado
+            features.append(np.where(hoja, 0, arbol.feature).astype(np.int64))
+            thresholds.append(np.where(hoja, np.inf, arbol.threshold))
+            lefts.append(np.where(hoja, propio, arbol.children_left + desplazamiento))
+            rights.append(np.where(hoja, propio, arbol.children_right + desplazamiento))
+
+            valor = arbol.value[:, 0, :].astype(np.float64)
+            total = valor.sum(axis=1, keepdims=True)
+            values.append(np.divide(valor, total, out=np.zeros_like(valor), where=total > 0))
+
+            raices.append(desplazamiento)
+            profundidad = max(profundidad, arbol.max_depth)
+            desplazamiento += n
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features)),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds)),
+            hijos=np.ascontiguousarray(np.stack([np.concatenate(lefts), np.concatenate(rights)], axis=1)),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            raices=np.asarray(raices, dtype=np.int64),
+            clases=np.asarray(modelo.classes_),
+            n_features=modelo.n_features_in_,
+            profundidad=profundidad,
+            importancias=getattr(modelo, 'feature_importances_', None),
+        )
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Probabilidades (n_filas, n_clases), promedio de los árboles como sklearn."""
+        # sklearn compara en float32 contra umbrales float64
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f'X tiene {X.shape[1]} columnas; el modelo espera {self.n_features_in_}'
+            )
+
+        n_clases = self.value.shape[1]
+        n_arboles = self.raices.shape[0]
+        salida = np.empty((X.shape[0], n_clases), dtype=np.float64)
+        for inicio in range(0, X.shape[0], self.tamano_bloque):
+            bloque = X[inicio:inicio + self.tamano_bloque]
+            n = bloque.shape[0]
+            planos = bloque.ravel()
+
+            # Un par (fila, árbol) por posición; solo se avanzan los que no llegaron a una hoja
+            nodos = np.tile(self.raices, n)
+            base_fila = np.repeat(np.arange(n, dtype=np.int64) * self.n_features_in_, n_arboles)
+            activos = np.flatnonzero(~self._hoja[nodos])
+            while activos.size:
+                actuales = nodos[activos]
+                derecha = planos[base_fila[activos] + self.feature[actuales]] > self.threshold[actuales]
+                actuales = self._hijos_planos[2 * actuales + derecha]
+                nodos[activos] = actuales
+                activos = activos[~self._hoja[actuales]]
+
+            salida[inicio:inicio + n] = self.value[nodos].reshape(n, n_arboles, n_clases).mean(axis=1)
+        return salida
+
+    def como_arrays(self) -> dict:
+        datos = {campo: getattr(self, campo) for campo in _CAMPOS}
+        datos['hoja'] = self._hoja
+        datos['n_features'] = self.n_features_in_
+        datos['profundidad'] = self.profundidad
+        if self.importancias is not None:
+            datos['importancias'] = self.importancias
+        return datos
+
+    @classmethod
+    def desde_arrays(cls, datos: dict) -> 'BosqueCompilado':
+        return cls(**{campo: datos[campo] for campo in _CAMPOS},
+                   n_features=datos['n_features'], profundidad=datos['profundidad'],
+                   hoja=datos.get('hoja'), importancias=datos.get('importancias'))
+
+    def guardar(self, path: Path | str) -> str:
+        """Guarda sin compresión (mapeable) y reemplaza el archivo de forma atómica.
+
+        Nunca se sobrescribe en sitio: otros procesos pueden tener mapeado el
+        archivo anterior y truncarlo les provocaría SIGBUS.
+        """
+        import joblib
+
+        path = Path(path)
+        temporal = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        joblib.dump(self.como_arrays(), temporal)
+        os.replace(temporal, path)
+        return str(path)
+
+    @classmethod
+    def cargar(cls, path: Path | str, mmap_mode: str | None = 'r') -> 'BosqueCompilado':
+        """Con `mmap_mode='r'` los arreglos se mapean de solo lectura y los
+        procesos que cargan el mismo archivo comparten sus páginas."""
+        import joblib
+
+        return cls.desde_arrays(joblib.load(path, mmap_mode=mmap_mode))
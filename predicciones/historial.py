@@ -0,0 +1,251 @@
+"""Escritura por lotes del historial de predicciones, resúmenes mensuales y retención.
+
+- `escribir()` inserta un lote con un solo `executemany` y acumula
+  `ResumenMensualPrediccion` en la misma transacción. El recálculo la llama por
+  bloque, dentro de la transacción que actualiza los clientes.
+- Las vistas de una fila usan `registrar()`, que encola en un
+  `BufferHistorial` por proceso: se vacía al juntar
+  `PREDICCIONES_HISTORIAL_LOTE` filas o a los
+  `PREDICCIONES_HISTORIAL_MAX_ESPERA_S` segundos (en un hilo temporizador).
+  Si el proceso muere con filas en el buffer, esas filas se pierden. Si el
+  lote falla por la FK (un cliente borrado mientras su fila esperaba), se
+  descartan solo las filas de clientes inexistentes y se reintenta.
+- `purgar()` borra por bloques las filas más viejas que
+  `PREDICCIONES_HISTORIAL_RETENCION_DIAS`; los resúmenes mensuales se conservan.
+
+Cada escritura o purga envía `predicciones_registradas` (la escucha el
+contador de predicciones del dashboard).
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from clientes.models import Cliente
+
+from .models import HistorialPrediccion, ResumenMensualPrediccion
+from .signals import predicciones_registradas
+
+logger = logging.getLogger(__name__)
+
+
+def nuevas(predicciones, version: str, origen: str, fecha=None) -> list[HistorialPrediccion]:
+    """Filas sin guardar para `predicciones` = [(cliente_id, probabilidad), ...]."""
+    fecha = fecha or timezone.now()
+    return [
+        HistorialPrediccion(
+            cliente_id=cliente_id,
+            fecha_prediccion=fecha,
+            probabilidad=probabilidad,
+            nivel_riesgo=Cliente.nivel_desde_probabilidad(probabilidad),
+            version_modelo=version,
+            origen=origen,
+        )
+        for cliente_id, probabilidad in predicciones
+    ]
+
+
+def _acumular_resumenes(filas: list[HistorialPrediccion], db: str) -> None:
+    grupos: dict[tuple, list] = defaultdict(lambda: [0, 0.0])
+    meses = {}  # un lote suele compartir fecha_prediccion
+    for fila in filas:
+        mes = meses.get(fila.fecha_prediccion)
+        if mes is None:
+            mes = meses[fila.fecha_prediccion] = timezone.localdate(fila.fecha_prediccion).replace(day=1)
+        grupo = grupos[(mes, fila.nivel_riesgo)]
+        grupo[0] += 1
+        grupo[1] += fila.probabilidad
+
+    # Pocos grupos por lote (meses x niveles): crear los que falten y sumar con F()
+    ResumenMensualPrediccion.objects.using(db).bulk_create(
+        [ResumenMensualPrediccion(mes=mes, nivel_riesgo=nivel) for mes, nivel in grupos],
+        ignore_conflicts=True,
+    )
+    for (mes, nivel), (cantidad, suma) in grupos.items():
+        ResumenMensualPrediccion.objects.using(db).filter(mes=mes, nivel_riesgo=nivel).update(
+            cantidad=F('cantidad') + cantidad,
+            suma_probabilidad=F('suma_probabilidad') + suma,
+        )
+
+
+def _insertar(filas: list[HistorialPrediccion], db: str) -> None:
+    # INSERT parametrizado con executemany (como scoring.actualizar_por_pk):
+    # bulk_create arma un VALUES por fila en Python, que domina en lotes grandes
+    meta = HistorialPrediccion._meta
+    connection = connections[db]
+    qn = connection.ops.quote_name
+    columnas = [f for f in meta.concrete_fields if not f.primary_key]
+    sql = (
+        f'INSERT INTO {qn(meta.db_table)} ({", ".join(qn(f.column) for f in columnas)}) '
+        f'VALUES ({", ".join(["%s"] * len(columnas))})'
+    )
+    parametros = [[f.get_db_prep_save(f.value_from_object(fila), connection) for f in columnas] for fila in filas]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, parametros)
+
+
+def escribir(filas: list[HistorialPrediccion]) -> int:
+    """Inserta `filas` y acumula sus resúmenes en una transacción."""
+    if not filas:
+        return 0
+    db = router.db_for_write(HistorialPrediccion)
+    with transaction.atomic(using=db):
+        _insertar(filas, db)
+        _acumular_resumenes(filas, db)
+        predicciones_registradas.send(sender=HistorialPrediccion, cantidad=len(filas))
+    return len(filas)
+
+
+class BufferHistorial:
+    """Acumula filas del historial y las escribe por lotes."""
+
+    def __init__(self, max_filas: int = 500, max_espera: float = 2.0):
+        self.max_filas = max_filas
+        self.max_espera = max_espera
+        self._filas: list[HistorialPrediccion] = []
+        self._lock = threading.Lock()
+        self._temporizador: threading.Timer | None = None
+
+        self.lotes = 0
+        self.escritas = 0
+        self.perdidas = 0
+        self.rechazadas = 0
+
+    def agregar(self, filas: list[HistorialPrediccion]) -> None:
+        with self._lock:
+            self._filas.extend(filas)
+            lleno = len(self._filas) >= self.max_filas
+            if not lleno and self._temporizador is None:
+                self._temporizador = threading.Timer(self.max_espera, self._al_vencer)
+                self._temporizador.daemon = True
+                self._temporizador.start()
+        if lleno:
+            self.vaciar()
+
+    def vaciar(self) -> int:
+        with self._lock:
+            lote, self._filas = self._filas, []
+            if self._temporizador is not None:
+                self._temporizador.cancel()
+                self._temporizador = None
+        if not lote:
+            return 0
+        try:
+            try:
+                escribir(lote)
+            except IntegrityError:
+                validas = self._descartar_sin_cliente(lote)
+                if len(validas) == len(lote):
+                    raise
+                lote = validas
+                escribir(lote)
+        except Exception:
+            self.perdidas += len(lote)
+            logger.exception('No se pudieron escribir %s filas del historial de predicciones', len(lote))
+            return 0
+        self.lotes += 1
+        self.escritas += len(lote)
+        return len(lote)
+
+    def _descartar_sin_cliente(self, lote: list[HistorialPrediccion]) -> list[HistorialPrediccion]:
+        """Filas de `lote` cuyo cliente todavía existe; registra las demás en el log."""
+        existentes = set(
+            Cliente.objects.using(router.db_for_read(Cliente))
+            .filter(pk__in={fila.cliente_id for fila in lote})
+            .values_list('pk', flat=True)
+        )
+        validas = [fila for fila in lote if fila.cliente_id in existentes]
+        if len(validas) < len(lote):
+            borrados = sorted({fila.cliente_id for fila in lote} - existentes)
+            self.rechazadas += len(lote) - len(validas)
+            logger.warning(
+                'Se descartan %s filas del historial de predicciones de clientes borrados: %s',
+                len(lote) - len(validas), borrados,
+            )
+        return validas
+
+    def _al_vencer(self) -> None:
+        try:
+            self.vaciar()
+        finally:
+            # El hilo del temporizador abre su propia conexión
+            close_old_connections()
+            connections.close_all()
+
+    def estadisticas(self) -> dict:
+        return {
+            'pendientes': len(self._filas),
+            'lotes': self.lotes,
+            'escritas': self.escritas,
+            'perdidas': self.perdidas,
+            'rechazadas': self.rechazadas,
+        }
+
+
+_buffer: BufferHistorial | None = None
+_buffer_lock = threading.Lock()
+
+
+def buffer_historial() -> BufferHistorial:
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = BufferHistorial(
+                max_filas=getattr(settings, 'PREDICCIONES_HISTORIAL_LOTE', 500),
+                max_espera=getattr(settings, 'PREDICCIONES_HISTORIAL_MAX_ESPERA_S', 2.0),
+            )
+            atexit.register(_buffer.vaciar)
+        return _buffer
+
+
+def registrar(predicciones, version: str, origen: str = HistorialPrediccion.ORIGEN_INDIVIDUAL) -> None:
+    """Encola `predicciones` = [(cliente_id, probabilidad), ...] en el buffer del proceso.
+
+    Con `PREDICCIONES_HISTORIAL_LOTE` <= 1 se escribe en el momento.
+    """
+    filas = nuevas(predicciones, version, origen)
+    buffer = buffer_historial()
+    if buffer.max_filas <= 1:
+        escribir(filas)
+    else:
+        buffer.agregar(filas)
+
+
+def purgar(dias: int | None = None, tamano_bloque: int = 10_000) -> dict:
+    """Borra el historial más viejo que `dias` (por defecto la retención configurada)."""
+    dias = getattr(settings, 'PREDICCIONES_HISTORIAL_RETENCION_DIAS', 365) if dias is None else dias
+    if not dias or dias <= 0:
+        return {'ok': True, 'borradas': 0, 'retencion_dias': None}
+
+    corte = timezone.now() - timedelta(days=dias)
+    db = router.db_for_write(HistorialPrediccion)
+    viejas = HistorialPrediccion.objects.using(db).filter(fecha_prediccion__lt=corte)
+    borradas = 0
+    inicio = time.perf_counter()
+    while True:
+        # Bloques por el índice de fecha; cada uno en su propia transacción corta
+        with transaction.atomic(using=db):
+            n, _ = HistorialPrediccion.objects.using(db).filter(
+                pk__in=viejas.order_by('fecha_prediccion').values('pk')[:tamano_bloque]
+            ).delete()
+            if n:
+                predicciones_registradas.send(sender=HistorialPrediccion, cantidad=-n)
+        borradas += n
+        if n < tamano_bloque:
+            break
+    return {
+        'ok': True,
+        'borradas': borradas,
+        'retencion_dias': dias,
+        'corte': corte.isoformat(),
+        'segundos': round(time.perf_counter() - inicio, 3),
+    }
@@ -0,0 +1,301 @@
+"""Ejecutor local de trabajos en segundo plano, sin broker externo.
+
+Los trabajos se registran en `Trabajo` y se ejecutan en un
+`ProcessPoolExecutor` (contexto `spawn`, cada proceso hace su propio
+`django.setup()` como initializer). El request solo crea el registro y
+devuelve su id; el estado y las etapas se consultan desde la base de datos.
+Si el pool se rompe (un proceso hijo murió), los trabajos que tenía quedan
+fallidos y el siguiente envío arma un pool nuevo.
+
+Con `PREDICCIONES_JOB_WORKERS = 0` los trabajos corren en el mismo proceso y
+de forma síncrona, útil en tests y scripts.
+
+Un trabajo es reanudable si su función acepta `punto_control`: recibe un
+`PuntoControl` con el avance guardado de una ejecución anterior y lo
+actualiza a medida que confirma trabajo. `JobRunner.reanudar` vuelve a
+ejecutar un trabajo fallido o abandonado con la misma función y argumentos.
+
+Un trabajo activo está abandonado si el proceso que lo tiene (`Trabajo.proceso`)
+ya no existe en esta máquina, o si es de otra máquina y no da señales de vida
+(`Trabajo.latido`, que actualizan `progreso` y `PuntoControl.guardar`) hace
+más de `JobRunner.timeout`.
+"""
+from __future__ import annotations
+
+import importlib
+import inspect
+import multiprocessing
+import os
+import socket
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import Trabajo
+
+
+class TrabajoEnCurso(Exception):
+    """Ya hay un trabajo del mismo tipo pendiente o ejecutándose."""
+
+    def __init__(self, trabajo: Trabajo):
+        super().__init__(f"Ya existe un trabajo en curso: #{trabajo.pk}")
+        self.trabajo = trabajo
+
+
+def _proceso_actual() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def proceso_vivo(proceso: str) -> bool | None:
+    """Si el proceso 'host:pid' sigue corriendo; None si no se puede saber desde aquí."""
+    host, _, pid = proceso.rpartition(':')
+    # En Windows os.kill termina el proceso en vez de consultarlo
+    if host != socket.gethostname() or not pid.isdigit() or os.name == 'nt':
+        return None
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Existe, pero es de otro usuario
+    return True
+
+
+def _resolver(ruta: str):
+    modulo, _, nombre = ruta.rpartition('.')
+    return getattr(importlib.import_module(modulo), nombre)
+
+
+class PuntoControl:
+    """Avance persistido de un trabajo reanudable (`Trabajo.punto_control`).
+
+    `guardar` escribe en la base de datos: llamado dentro de la misma
+    transacción que confirma el trabajo hecho, ambos quedan consistentes.
+    """
+
+    def __init__(self, trabajo_id: int, datos: dict | None = None):
+        self.trabajo_id = trabajo_id
+        self.datos = dict(datos or {})
+
+    def guardar(self, **datos) -> None:
+        self.datos.update(datos)
+        Trabajo.objects.filter(pk=self.trabajo_id).update(punto_control=self.datos, latido=timezone.now())
+
+
+def ejecutar_trabajo(trabajo_id: int, ruta_funcion: str, args: tuple = (), kwargs: dict | None = None) -> None:
+    """Punto de entrada en el proceso hijo: corre la función y registra el resultado.
+
+    La función recibe `progreso` (callable con el nombre de la etapa) además de
+    sus propios argumentos, y debe devolver un dict serializable a JSON.
+    """
+    ahora = timezone.now()
+    Trabajo.objects.filter(pk=trabajo_id).update(
+        estado=Trabajo.EN_CURSO, iniciado=ahora, error='', proceso=_proceso_actual(), latido=ahora,
+    )
+
+    def progreso(etapa: str) -> None:
+        Trabajo.objects.filter(pk=trabajo_id).update(etapa=etapa, latido=timezone.now())
+
+    kwargs = dict(kwargs or {})
+    try:
+        funcion = _resolver(ruta_funcion)
+        if 'punto_control' in inspect.signature(funcion).parameters:
+            datos = Trabajo.objects.filter(pk=trabajo_id).values_list('punto_control', flat=True).first()
+            kwargs['punto_control'] = PuntoControl(trabajo_id, datos)
+        resultado = funcion(*args, progreso=progreso, **kwargs)
+    except Exception as exc:
+        Trabajo.objects.filter(pk=trabajo_id).update(
+            estado=Trabajo.FALLIDO, error=str(exc) or exc.__class__.__name__, finalizado=timezone.now(),
+        )
+        return
+    Trabajo.objects.filter(pk=trabajo_id).update(
+        estado=Trabajo.COMPLETADO, resultado=resultado, finalizado=timezone.now(),
+    )
+
+
+class _EjecutorInmediato(Executor):
+    """Executor síncrono: corre la función en el hilo que llama a `submit`."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        futuro = Future()
+        try:
+            futuro.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            futuro.set_exception(exc)
+        return futuro
+
+
+class JobRunner:
+    """Crea registros `Trabajo` y los envía al executor.
+
+    Solo se permite un trabajo activo por tipo; un segundo envío lanza
+    `TrabajoEnCurso`, salvo que el activo esté abandonado (ver `abandonado`):
+    entonces se marca como fallido y se acepta el nuevo.
+    """
+
+    def __init__(self, executor: Executor | None = None, timeout: timedelta = timedelta(hours=1)):
+        self._executor = executor
+        self._lock = threading.Lock()
+        self.timeout = timeout
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    workers = getattr(settings, 'PREDICCIONES_JOB_WORKERS', 1)
+                    if workers <= 0:
+                        self._executor = _EjecutorInmediato()
+                    else:
+                        # django.setup() como initializer: corre antes de deserializar
+                        # `ejecutar_trabajo` (importar este módulo requiere las apps cargadas)
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=workers,
+                            mp_context=multiprocessing.get_context('spawn'),
+                            initializer=django.setup,
+                        )
+        return self._executor
+
+    def enviar(self, tipo: str, ruta_funcion: str, *args, usuario=None, **kwargs) -> Trabajo:
+        with transaction.atomic():
+            activo = (
+                Trabajo.objects.select_for_update()
+                .filter(tipo=tipo, estado__in=Trabajo.ACTIVOS)
+                .order_by('creado')
+                .first()
+            )
+            if activo is not None:
+                if not self.abandonado(activo):
+                    raise TrabajoEnCurso(activo)
+                self._marcar_abandonado(activo)
+
+            trabajo = Trabajo.objects.create(
+                tipo=tipo,
+                funcion=ruta_funcion,
+                parametros={'args': list(args), 'kwargs': kwargs},
+                creado_por=usuario if getattr(usuario, 'is_authenticated', False) else None,
+                # Hasta que un worker lo tome, responde el proceso que tiene el executor
+                proceso=_proceso_actual(),
+                latido=timezone.now(),
+            )
+
+        self._enviar_al_confirmar(trabajo)
+        return trabajo
+
+    def reanudar(self, trabajo: Trabajo) -> Trabajo:
+        """Vuelve a encolar un trabajo fallido (o abandonado) con su función y argumentos.
+
+        Si la función es reanudable, continúa desde su último punto de control.
+        """
+        with transaction.atomic():
+            trabajo = Trabajo.objects.select_for_update().get(pk=trabajo.pk)
+            if trabajo.estado == Trabajo.COMPLETADO:
+                raise ValueError(f'El trabajo #{trabajo.pk} ya terminó')
+            if not trabajo.funcion:
+                raise ValueError(f'El trabajo #{trabajo.pk} no guarda su función; no se puede reanudar')
+            otros = (
+                Trabajo.objects.select_for_update()
+                .filter(tipo=trabajo.tipo, estado__in=Trabajo.ACTIVOS)
+                .exclude(pk=trabajo.pk)
+            )
+            for otro in otros:
+                if not self.abandonado(otro):
+                    raise TrabajoEnCurso(otro)
+                self._marcar_abandonado(otro)
+            if trabajo.estado in Trabajo.ACTIVOS and not self.abandonado(trabajo):
+                raise TrabajoEnCurso(trabajo)
+
+            trabajo.estado = Trabajo.PENDIENTE
+            trabajo.finalizado = None
+            trabajo.proceso = _proceso_actual()
+            trabajo.latido = timezone.now()
+            trabajo.save(update_fields=['estado', 'finalizado', 'proceso', 'latido'])
+
+        self._enviar_al_confirmar(trabajo)
+        return trabajo
+
+    def abandonado(self, trabajo: Trabajo) -> bool:
+        """Si un trabajo activo ya no lo está ejecutando nadie.
+
+        Si su proceso es de esta máquina se comprueba directamente (un trabajo
+        cuyo proceso murió se puede reanudar en el acto); si no, cuenta el
+        tiempo desde su último latido.
+        """
+        if trabajo.estado not in Trabajo.ACTIVOS:
+            return False
+        vivo = proceso_vivo(trabajo.proceso) if trabajo.proceso else None
+        if vivo is not None:
+            return not vivo
+        return timezone.now() - (trabajo.latido or trabajo.creado) >= self.timeout
+
+    def marcar_abandonados(self, tipo: str) -> int:
+        """Marca como fallidos los trabajos activos de `tipo` abandonados; devuelve cuántos."""
+        marcados = 0
+        with transaction.atomic():
+            for trabajo in Trabajo.objects.select_for_update().filter(tipo=tipo, estado__in=Trabajo.ACTIVOS):
+                if self.abandonado(trabajo):
+                    self._marcar_abandonado(trabajo)
+                    marcados += 1
+        return marcados
+
+    @staticmethod
+    def _marcar_abandonado(trabajo: Trabajo) -> None:
+        trabajo.estado = Trabajo.FALLIDO
+        trabajo.error = 'El proceso del trabajo terminó o dejó de responder'
+        trabajo.finalizado = timezone.now()
+        trabajo.save(update_fields=['estado', 'error', 'finalizado'])
+
+    def _enviar_al_confirmar(self, trabajo: Trabajo) -> None:
+        parametros = trabajo.parametros or {}
+        args = tuple(parametros.get('args', ()))
+        kwargs = parametros.get('kwargs', {})
+        # Enviar solo cuando el registro ya es visible para otros procesos
+        transaction.on_commit(lambda: self._enviar(trabajo.pk, trabajo.funcion, args, kwargs))
+
+    def _enviar(self, trabajo_id: int, ruta_funcion: str, args: tuple, kwargs: dict) -> None:
+        executor = self.executor
+        try:
+            futuro = executor.submit(ejecutar_trabajo, trabajo_id, ruta_funcion, args, kwargs)
+        except BrokenProcessPool as exc:
+            futuro = Future()
+            futuro.set_exception(exc)
+        hilo = threading.get_ident()
+        futuro.add_done_callback(lambda f: self._al_terminar(executor, trabajo_id, f, hilo))
+
+    def _al_terminar(self, executor: Executor, trabajo_id: int, futuro: Future, hilo: int) -> None:
+        # ejecutar_trabajo registra los errores de la función; una excepción
+        # acá es del executor (p.ej. el proceso hijo murió y rompió el pool)
+        error = futuro.exception()
+        if error is None:
+            return
+        if isinstance(error, BrokenProcessPool):
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+        try:
+            Trabajo.objects.filter(pk=trabajo_id, estado__in=Trabajo.ACTIVOS).update(
+                estado=Trabajo.FALLIDO, error=str(error) or error.__class__.__name__, finalizado=timezone.now(),
+            )
+        finally:
+            # En el hilo de gestión del pool no deben quedar conexiones abiertas
+            if threading.get_ident() != hilo:
+                connections.close_all()
+
+
+_runner: JobRunner | None = None
+_runner_lock = threading.Lock()
+
+
+def get_runner() -> JobRunner:
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner()
+    return _runner
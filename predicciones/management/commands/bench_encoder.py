@@ -0,0 +1,68 @@
+"""Microbenchmark del costo por fila de codificar features.
+
+Compara `ClienteEncoder.transform` contra el camino anterior
+(`pd.get_dummies` + relleno de columnas) para una fila y para un lote.
+
+    python manage.py bench_encoder --filas 10000 --repeticiones 2000
+"""
+from __future__ import annotations
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from predicciones.encoder import ClienteEncoder
+
+
+def _filas_sinteticas(n: int) -> list[dict]:
+    rnd = random.Random(42)
+    return [
+        {
+            'telefono': str(5_550_000 + i),
+            'estado': rnd.choice(['activo', 'inactivo']),
+            'nivel_riesgo': rnd.choice(['Bajo', 'Medio', 'Alto']),
+        }
+        for i in range(n)
+    ]
+
+
+def _get_dummies(filas, columnas):
+    import pandas as pd
+
+    df = pd.DataFrame(filas)
+    df = pd.get_dummies(df, columns=['estado', 'nivel_riesgo'], drop_first=True)
+    for col in columnas:
+        if col not in df.columns:
+            df[col] = 0
+    return df[columnas]
+
+
+def _medir(func, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        func()
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+class Command(BaseCommand):
+    help = 'Mide el costo por fila de codificar clientes (encoder vs pd.get_dummies).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=10_000, help='Tamaño del lote.')
+        parser.add_argument('--repeticiones', type=int, default=2_000, help='Iteraciones para una fila.')
+
+    def handle(self, *args, filas, repeticiones, **options):
+        datos = _filas_sinteticas(filas)
+        encoder = ClienteEncoder().fit(datos)
+        columnas = encoder.columnas_
+        una = datos[:1]
+
+        resultados = [
+            ('encoder, 1 fila', _medir(lambda: encoder.transform(una), repeticiones), 1),
+            ('get_dummies, 1 fila', _medir(lambda: _get_dummies(una, columnas), repeticiones), 1),
+            (f'encoder, {filas} filas', _medir(lambda: encoder.transform(datos), 5), filas),
+            (f'get_dummies, {filas} filas', _medir(lambda: _get_dummies(datos, columnas), 5), filas),
+        ]
+        for nombre, segundos, n in resultados:
+            self.stdout.write(f'{nombre:<28} {segundos * 1e6 / n:10.2f} µs/fila')
@@ -0,0 +1,65 @@
+"""Compara la latencia del bosque compilado contra `predict_proba` de sklearn.
+
+Usa el modelo entrenado si existe; si no, entrena un RandomForest sintético
+con la misma configuración que `entrenar_modelo`.
+
+    python manage.py bench_forest --filas 1 16 128 1024 10000
+"""
+from __future__ import annotations
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from predicciones.forest import BosqueCompilado
+from predicciones.model_cache import modelo_vigente
+
+
+def _medir(func, minimo_segundos: float = 0.5) -> float:
+    """Segundos por llamada (repite hasta acumular `minimo_segundos`)."""
+    func()
+    repeticiones, total = 0, 0.0
+    while total < minimo_segundos:
+        inicio = time.perf_counter()
+        func()
+        total += time.perf_counter() - inicio
+        repeticiones += 1
+    return total / repeticiones
+
+
+class Command(BaseCommand):
+    help = 'Latencia de predict_proba: bosque compilado vs sklearn, por tamaño de lote.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, nargs='+', default=[1, 16, 128, 1024, 10_000])
+
+    def handle(self, *args, filas, **options):
+        rng = np.random.default_rng(42)
+        try:
+            modelo = modelo_vigente().obtener().modelo
+            self.stdout.write('Usando el modelo entrenado.')
+        except FileNotFoundError:
+            from sklearn.ensemble import RandomForestClassifier
+
+            X = rng.normal(size=(20_000, 3))
+            y = X[:, 0] + rng.normal(scale=0.5, size=X.shape[0]) > 0
+            modelo = RandomForestClassifier(n_estimators=100, random_state=42).fit(X, y)
+            self.stdout.write('Modelo no entrenado: usando un RandomForest sintético.')
+
+        bosque = BosqueCompilado.desde_sklearn(modelo)
+        X = rng.normal(size=(max(filas), modelo.n_features_in_))
+        diferencia = np.abs(bosque.predict_proba(X) - modelo.predict_proba(X)).max()
+        self.stdout.write(
+            f'{bosque.raices.shape[0]} árboles, {bosque.feature.shape[0]} nodos, '
+            f'profundidad {bosque.profundidad}; diferencia máx. vs sklearn: {diferencia:.2e}'
+        )
+
+        self.stdout.write(f"{'filas':>8} {'sklearn ms':>12} {'compilado ms':>13} {'aceleración':>12}")
+        for n in filas:
+            lote = X[:n]
+            t_sklearn = _medir(lambda: modelo.predict_proba(lote))
+            t_bosque = _medir(lambda: bosque.predict_proba(lote))
+            self.stdout.write(
+                f'{n:>8} {t_sklearn * 1e3:>12.3f} {t_bosque * 1e3:>13.3f} {t_sklearn / t_bosque:>11.1f}x'
+            )
@@ -0,0 +1,94 @@
+"""Latencia y throughput con micro-batching vs una predicción por request.
+
+Simula `--clientes` clientes concurrentes en un event loop (como un worker
+ASGI) que piden predicciones de una fila:
+
+- `por_request`: cada request llama a `puntuar_filas([fila])`. Las vistas sync
+  bajo ASGI corren en un único hilo (thread_sensitive), igual que aquí.
+- `microbatch`: cada request pasa por `MicroBatcher`.
+
+La caché de predicciones se desactiva durante la medición: con 1000 filas
+repetidas casi todo serían aciertos y no se mediría el modelo.
+
+    python manage.py bench_microbatch --clientes 50 --peticiones 5000
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from predicciones.microbatch import MicroBatcher
+from predicciones.model_cache import modelo_vigente
+from predicciones.scoring import puntuar_filas
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+async def _simular(llamar, clientes: int, peticiones: int, filas: list[dict]) -> tuple[list[float], float]:
+    latencias: list[float] = []
+    por_cliente = max(1, peticiones // clientes)
+
+    async def cliente(indice: int):
+        for j in range(por_cliente):
+            fila = filas[(indice * por_cliente + j) % len(filas)]
+            inicio = time.perf_counter()
+            await llamar(fila)
+            latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(i) for i in range(clientes)))
+    return latencias, time.perf_counter() - inicio
+
+
+class Command(BaseCommand):
+    help = 'Compara p50/p99 y throughput: micro-batching vs una predicción por request.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=50, help='Clientes concurrentes.')
+        parser.add_argument('--peticiones', type=int, default=5000, help='Total de peticiones por modo.')
+        parser.add_argument('--max-lote', type=int, default=64)
+        parser.add_argument('--max-espera-ms', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        with override_settings(PREDICCIONES_CACHE_MAX_ENTRADAS=0):
+            self.medir(**options)
+
+    def medir(self, *, clientes, peticiones, max_lote, max_espera_ms, **options):
+        try:
+            modelo_vigente().obtener()
+        except FileNotFoundError:
+            raise CommandError('Modelo no entrenado: entrena o publica una versión primero.')
+
+        rnd = random.Random(42)
+        filas = [
+            {'telefono': str(5_550_000 + i), 'nivel_riesgo': rnd.choice(['Bajo', 'Medio', 'Alto'])}
+            for i in range(1000)
+        ]
+        puntuar_filas(filas[:1])  # calentar artefactos
+
+        hilo_unico = ThreadPoolExecutor(max_workers=1)
+
+        async def por_request(fila):
+            loop = asyncio.get_running_loop()
+            return (await loop.run_in_executor(hilo_unico, puntuar_filas, [fila]))[0]
+
+        batcher = MicroBatcher(puntuar_filas, max_lote=max_lote, max_espera=max_espera_ms / 1000)
+
+        self.stdout.write(f"{'modo':<12} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>10}")
+        for nombre, llamar in (('por_request', por_request), ('microbatch', batcher.enviar)):
+            latencias, total = asyncio.run(_simular(llamar, clientes, peticiones, filas))
+            self.stdout.write(
+                f'{nombre:<12} {statistics.median(latencias) * 1e3:>9.2f} '
+                f'{_percentil(latencias, 99) * 1e3:>9.2f} {len(latencias) / total:>10.0f}'
+            )
+        self.stdout.write(f'microbatch: {batcher.estadisticas()}')
+        hilo_unico.shutdown()
@@ -0,0 +1,49 @@
+"""Worker de la cola de tareas local (`predicciones.task_queue`).
+
+    python manage.py procesar_tareas --workers 4            # hilos
+    python manage.py procesar_tareas --workers 2 --procesos # procesos spawn
+    python manage.py procesar_tareas --una-vez              # vacía la cola y sale (CI)
+    python manage.py procesar_tareas --estado               # solo muestra métricas
+"""
+from __future__ import annotations
+
+import json
+import signal
+
+from django.core.management.base import BaseCommand
+
+from predicciones.task_queue import ProcesadorTareas, metricas
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas @shared_task encoladas en la base de datos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Tareas simultáneas como máximo.')
+        parser.add_argument('--procesos', action='store_true', help='Usar procesos en lugar de hilos.')
+        parser.add_argument('--intervalo', type=float, default=1.0, help='Segundos entre sondeos de la cola.')
+        parser.add_argument('--una-vez', action='store_true', help='Salir cuando no queden tareas listas.')
+        parser.add_argument('--sin-programador', action='store_true',
+                            help='No encolar tareas periódicas (si otro worker ya lo hace).')
+        parser.add_argument('--estado', action='store_true', help='Mostrar métricas de la cola y salir.')
+
+    def handle(self, *args, workers, procesos, intervalo, una_vez, sin_programador, estado, **options):
+        if estado:
+            self.stdout.write(json.dumps(metricas(), indent=2, ensure_ascii=False))
+            return
+
+        procesador = ProcesadorTareas(
+            workers=workers, procesos=procesos, intervalo=intervalo, programador=not sin_programador,
+        )
+        signal.signal(signal.SIGTERM, lambda *_: procesador.detener())
+        try:
+            despachadas = procesador.ejecutar(una_vez=una_vez)
+        except KeyboardInterrupt:
+            procesador.detener()
+            return
+
+        resumen = metricas()
+        self.stdout.write(self.style.SUCCESS(
+            f"{despachadas} tareas despachadas; en cola: {resumen['listas']}, "
+            f"fallidas (24 h): {resumen['fallidas']}"
+        ))
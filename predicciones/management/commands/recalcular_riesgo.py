@@ -0,0 +1,36 @@
+"""Recalcula probabilidad_abandono / nivel_riesgo de toda la base.
+
+    python manage.py recalcular_riesgo --tamano-bloque 5000 --workers 4
+    python manage.py recalcular_riesgo --incremental   # solo clientes pendientes
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from predicciones.scoring import recalcular_todos
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el riesgo de todos los clientes por bloques (UPDATE con executemany vía scoring.actualizar_por_pk).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano-bloque', type=int, default=2000)
+        parser.add_argument('--workers', type=int, default=1, help='Hilos que puntúan bloques en paralelo.')
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Solo clientes sin puntuar, modificados o puntuados por otra versión del modelo.',
+        )
+
+    def handle(self, *args, tamano_bloque, workers, incremental, **options):
+        if tamano_bloque <= 0:
+            raise CommandError('--tamano-bloque debe ser mayor que 0')
+        try:
+            resumen = recalcular_todos(tamano_bloque=tamano_bloque, workers=workers, incremental=incremental)
+        except FileNotFoundError:
+            raise CommandError('Modelo no entrenado')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['filas']} clientes recalculados en {resumen['segundos']} s "
+            f"({resumen['filas_por_segundo']} filas/s)"
+            + (f"; {resumen['omitidas']} sin cambios omitidos" if incremental else '')
+        ))
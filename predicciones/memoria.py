@@ -0,0 +1,74 @@
+"""Uso de memoria del proceso: residente vs compartida.
+
+Con los artefactos del modelo mapeados en modo lectura (`mmap_mode='r'`),
+todos los workers de un host comparten las mismas páginas del page cache;
+aquí se mide cuánto de la memoria residente es compartida y cuánto de ella
+corresponde a los archivos del modelo. Solo Linux (`/proc`); en otros
+sistemas devuelve lo que pueda medir.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+_CLAVES = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def _leer_kb(lineas, acumulado: dict) -> None:
+    for linea in lineas:
+        clave, _, resto = linea.partition(':')
+        if clave in _CLAVES:
+            acumulado[clave] = acumulado.get(clave, 0) + int(resto.split()[0])
+
+
+def uso_memoria(archivos=()) -> dict:
+    """Memoria del proceso en KB y, para `archivos` mapeados, su parte residente.
+
+    Devuelve `rss_kb`, `compartida_kb`, `privada_kb`, `pss_kb` y `archivos`
+    (por ruta: `rss_kb` y `compartida_kb` de esos mapeos).
+    """
+    resultado: dict = {'pid': os.getpid()}
+    rollup = Path('/proc/self/smaps_rollup')
+    if rollup.exists():
+        totales: dict = {}
+        _leer_kb(rollup.read_text().splitlines(), totales)
+        resultado.update({
+            'rss_kb': totales.get('Rss'),
+            'pss_kb': totales.get('Pss'),
+            'compartida_kb': totales.get('Shared_Clean', 0) + totales.get('Shared_Dirty', 0),
+            'privada_kb': totales.get('Private_Clean', 0) + totales.get('Private_Dirty', 0),
+        })
+    elif Path('/proc/self/statm').exists():
+        pagina_kb = os.sysconf('SC_PAGE_SIZE') // 1024
+        _, residente, compartida, *_ = (int(v) for v in Path('/proc/self/statm').read_text().split())
+        resultado.update({
+            'rss_kb': residente * pagina_kb,
+            'compartida_kb': compartida * pagina_kb,
+            'privada_kb': (residente - compartida) * pagina_kb,
+        })
+    else:
+        import resource
+
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        resultado['rss_max_kb'] = maximo // 1024 if os.uname().sysname == 'Darwin' else maximo
+
+    rutas = {str(Path(a).resolve()) for a in archivos}
+    smaps = Path('/proc/self/smaps')
+    if rutas and smaps.exists():
+        por_archivo: dict = {ruta: {} for ruta in rutas}
+        actual = None
+        for linea in smaps.read_text().splitlines():
+            partes = linea.split()
+            # Cabecera de mapeo: "inicio-fin perms offset dev inode [ruta]"
+            if partes and '-' in partes[0] and ':' not in partes[0]:
+                actual = partes[5] if len(partes) >= 6 and partes[5] in rutas else None
+            elif actual is not None:
+                _leer_kb([linea], por_archivo[actual])
+        resultado['archivos'] = {
+            ruta: {
+                'rss_kb': datos.get('Rss', 0),
+                'compartida_kb': datos.get('Shared_Clean', 0) + datos.get('Shared_Dirty', 0),
+            }
+            for ruta, datos in por_archivo.items()
+        }
+    return resultado
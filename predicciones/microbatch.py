@@ -0,0 +1,97 @@
+"""Agrupación de predicciones concurrentes en lotes (micro-batching).
+
+Bajo ASGI (`sist_pred_client/asgi.py`), muchas requests de una sola fila
+llegan al mismo event loop. `MicroBatcher` las encola durante unos
+milisegundos (o hasta juntar `max_lote` filas), corre una sola llamada por
+lote en un hilo y devuelve a cada request su resultado.
+
+Bajo WSGI cada vista async corre en su propio loop, así que no hay nada que
+agrupar: funciona igual, con lotes de una fila.
+"""
+from __future__ import annotations
+
+import asyncio
+import weakref
+from typing import Any, Callable
+
+from django.conf import settings
+
+
+class MicroBatcher:
+    def __init__(self, funcion_lote: Callable[[list], list], max_lote: int = 64, max_espera: float = 0.005):
+        self.funcion_lote = funcion_lote
+        self.max_lote = max_lote
+        self.max_espera = max_espera
+        self._pendientes: list[tuple[Any, asyncio.Future]] = []
+        self._temporizador: asyncio.TimerHandle | None = None
+        self._tareas: set[asyncio.Task] = set()
+
+        self.lotes = 0
+        self.filas = 0
+
+    async def enviar(self, fila) -> Any:
+        """Encola `fila` y espera su resultado (el de `funcion_lote` en su posición)."""
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._pendientes.append((fila, futuro))
+        if len(self._pendientes) >= self.max_lote:
+            self._despachar()
+        elif self._temporizador is None:
+            self._temporizador = loop.call_later(self.max_espera, self._despachar)
+        return await futuro
+
+    def _despachar(self) -> None:
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        while self._pendientes:
+            lote, self._pendientes = self._pendientes[:self.max_lote], self._pendientes[self.max_lote:]
+            tarea = asyncio.get_running_loop().create_task(self._procesar(lote))
+            # Referencia fuerte hasta que termine (el loop solo guarda una débil)
+            self._tareas.add(tarea)
+            tarea.add_done_callback(self._tareas.discard)
+
+    async def _procesar(self, lote) -> None:
+        self.lotes += 1
+        self.filas += len(lote)
+        try:
+            resultados = await asyncio.to_thread(self.funcion_lote, [fila for fila, _ in lote])
+        except Exception as exc:
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(exc)
+            return
+        for (_, futuro), resultado in zip(lote, resultados):
+            if not futuro.done():
+                futuro.set_result(resultado)
+
+    def estadisticas(self) -> dict:
+        return {
+            'lotes': self.lotes,
+            'filas': self.filas,
+            'filas_por_lote': round(self.filas / self.lotes, 2) if self.lotes else None,
+            'max_lote': self.max_lote,
+            'max_espera_ms': self.max_espera * 1000,
+        }
+
+
+_por_loop: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, MicroBatcher]' = weakref.WeakKeyDictionary()
+
+
+def batcher_puntuacion() -> MicroBatcher:
+    """Batcher de `scoring.puntuar_con_version` para el event loop actual.
+
+    Cada `enviar` devuelve (probabilidad, versión del modelo).
+    """
+    from .scoring import puntuar_con_version
+
+    loop = asyncio.get_running_loop()
+    batcher = _por_loop.get(loop)
+    if batcher is None:
+        batcher = MicroBatcher(
+            puntuar_con_version,
+            max_lote=getattr(settings, 'PREDICCIONES_MICROBATCH_MAX_LOTE', 64),
+            max_espera=getattr(settings, 'PREDICCIONES_MICROBATCH_MAX_ESPERA_MS', 5) / 1000,
+        )
+        _por_loop[loop] = batcher
+    return batcher
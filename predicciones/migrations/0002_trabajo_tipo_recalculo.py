@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predicciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trabajo',
+            name='tipo',
+            field=models.CharField(choices=[('entrenamiento', 'Entrenamiento'), ('recalculo', 'Recálculo de riesgo')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predicciones', '0003_tarea'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajo',
+            name='funcion',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='trabajo',
+            name='parametros',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='trabajo',
+            name='punto_control',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='trabajo',
+            name='tipo',
+            field=models.CharField(choices=[('entrenamiento', 'Entrenamiento'), ('recalculo', 'Recálculo de riesgo'), ('importacion', 'Importación de clientes')], max_length=30),
+        ),
+    ]
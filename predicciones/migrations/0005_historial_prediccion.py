@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0006_cliente_busqueda_fts'),
+        ('predicciones', '0004_trabajo_reanudable'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenMensualPrediccion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes')),
+                ('nivel_riesgo', models.CharField(max_length=10)),
+                ('cantidad', models.BigIntegerField(default=0)),
+                ('suma_probabilidad', models.FloatField(default=0.0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('mes', 'nivel_riesgo'), name='pred_resumen_mes_nivel_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HistorialPrediccion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_prediccion', models.DateTimeField(default=django.utils.timezone.now)),
+                ('probabilidad', models.FloatField()),
+                ('nivel_riesgo', models.CharField(max_length=10)),
+                ('version_modelo', models.CharField(blank=True, default='', max_length=64)),
+                ('origen', models.CharField(choices=[('individual', 'Individual'), ('lote', 'Lote'), ('recalculo', 'Recálculo')], max_length=12)),
+                ('cliente', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='predicciones', to='clientes.cliente')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cliente', 'fecha_prediccion'], name='pred_hist_cli_fecha_idx'), models.Index(fields=['fecha_prediccion'], name='pred_hist_fecha_idx')],
+            },
+        ),
+    ]
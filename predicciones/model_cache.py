@@ -0,0 +1,157 @@
+"""Caché de proceso para el modelo de abandono.
+
+Cada worker carga la versión vigente del registro (`registry.py`) una sola
+vez y la reutiliza entre requests. Cuando se publica una versión nueva, el
+puntero `CURRENT` cambia de firma (mtime/tamaño/inode) y el siguiente acceso
+carga la nueva versión y la reemplaza de forma atómica: las requests en curso
+siguen usando la referencia anterior.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from .registry import ModeloCargado, RegistroModelos
+
+# Nombre del modelo de clientes en el registro
+NOMBRE_MODELO = 'clientes'
+
+
+def registro() -> RegistroModelos:
+    from django.conf import settings
+
+    return RegistroModelos(getattr(
+        settings,
+        'PREDICCIONES_MODEL_REGISTRY',
+        settings.BASE_DIR / 'models',
+    ))
+
+
+def _cargar_joblib(path: Path) -> Any:
+    import joblib
+
+    return joblib.load(path)
+
+
+@dataclass(frozen=True)
+class _Cargado:
+    firma: tuple
+    modelo: Any
+
+
+class ModeloCompartido:
+    """Contenedor thread-safe de un artefacto cargado desde disco.
+
+    `intervalo_revision` limita cada cuántos segundos se hace `os.stat` sobre el
+    archivo; dentro de ese intervalo `obtener()` no toca el disco.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        loader: Callable[[Path], Any] = _cargar_joblib,
+        intervalo_revision: float = 1.0,
+    ):
+        self.path = Path(path)
+        self.loader = loader
+        self.intervalo_revision = intervalo_revision
+        self._cargado: _Cargado | None = None
+        self._ultima_revision = 0.0
+        self._lock = threading.Lock()
+
+        self.cargas = 0
+        self.aciertos = 0
+        self.ultima_carga_segundos: float | None = None
+        self.total_carga_segundos = 0.0
+
+    def _firma(self) -> tuple:
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def obtener(self) -> Any:
+        """Devuelve el artefacto vigente. Lanza FileNotFoundError si no existe."""
+        cargado = self._cargado
+        ahora = time.monotonic()
+        if cargado is not None and ahora - self._ultima_revision < self.intervalo_revision:
+            self.aciertos += 1
+            return cargado.modelo
+
+        firma = self._firma()
+        if cargado is not None and cargado.firma == firma:
+            self._ultima_revision = ahora
+            self.aciertos += 1
+            return cargado.modelo
+
+        with self._lock:
+            # Otro hilo pudo haber recargado mientras esperábamos el lock
+            cargado = self._cargado
+            if cargado is not None and cargado.firma == firma:
+                self.aciertos += 1
+                return cargado.modelo
+
+            inicio = time.perf_counter()
+            modelo = self.loader(self.path)
+            duracion = time.perf_counter() - inicio
+
+            self._cargado = _Cargado(firma=firma, modelo=modelo)
+            self._ultima_revision = time.monotonic()
+            self.cargas += 1
+            self.ultima_carga_segundos = duracion
+            self.total_carga_segundos += duracion
+            return modelo
+
+    def invalidar(self) -> None:
+        """Fuerza que el próximo `obtener()` revise el archivo en disco."""
+        self._ultima_revision = 0.0
+
+    def estadisticas(self) -> dict:
+        cargado = self._cargado
+        return {
+            'path': str(self.path),
+            'cargado': cargado is not None,
+            'version': getattr(cargado.modelo, 'version', None) if cargado else None,
+            'cargas': self.cargas,
+            'aciertos': self.aciertos,
+            'ultima_carga_ms': (
+                round(self.ultima_carga_segundos * 1000, 3)
+                if self.ultima_carga_segundos is not None else None
+            ),
+            'promedio_carga_ms': (
+                round(self.total_carga_segundos / self.cargas * 1000, 3)
+                if self.cargas else None
+            ),
+            'pid': os.getpid(),
+        }
+
+
+_vigente: ModeloCompartido | None = None
+_vigente_lock = threading.Lock()
+
+
+def modelo_vigente() -> ModeloCompartido:
+    """Instancia única por proceso; `obtener()` devuelve un `ModeloCargado`.
+
+    Lanza FileNotFoundError si todavía no hay una versión publicada.
+    """
+    global _vigente
+    if _vigente is None:
+        with _vigente_lock:
+            if _vigente is None:
+                from django.conf import settings
+
+                reg = registro()
+                mmap_mode = getattr(settings, 'PREDICCIONES_MODEL_MMAP', 'r')
+
+                def cargar(_path: Path) -> ModeloCargado:
+                    return reg.cargar(NOMBRE_MODELO, mmap_mode=mmap_mode)
+
+                _vigente = ModeloCompartido(
+                    reg.ruta_actual(NOMBRE_MODELO),
+                    loader=cargar,
+                    intervalo_revision=getattr(settings, 'PREDICCIONES_MODEL_CHECK_INTERVAL', 1.0),
+                )
+    return _vigente
@@ -1,3 +1,218 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class Trabajo(models.Model):
+    """Trabajo en segundo plano (p.ej. entrenamiento) con su estado y resultado.
+
+    El estado vive en la base de datos para que cualquier worker pueda
+    consultarlo, sin importar qué proceso ejecuta el trabajo.
+    """
+
+    TIPO_ENTRENAMIENTO = 'entrenamiento'
+    TIPO_RECALCULO = 'recalculo'
+    TIPO_IMPORTACION = 'importacion'
+    TIPO_CHOICES = [
+        (TIPO_ENTRENAMIENTO, 'Entrenamiento'),
+        (TIPO_RECALCULO, 'Recálculo de riesgo'),
+        (TIPO_IMPORTACION, 'Importación de clientes'),
+    ]
+
+    PENDIENTE = 'pendiente'
+    EN_CURSO = 'en_curso'
+    COMPLETADO = 'completado'
+    FALLIDO = 'fallido'
+    ESTADO_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (COMPLETADO, 'Completado'),
+        (FALLIDO, 'Fallido'),
+    ]
+    ACTIVOS = (PENDIENTE, EN_CURSO)
+
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES)
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default=PENDIENTE)
+    etapa = models.CharField(max_length=50, blank=True, default='')
+    resultado = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    # Función y argumentos, para poder reanudar el trabajo (ver JobRunner.reanudar)
+    funcion = models.CharField(max_length=200, blank=True, default='')
+    parametros = models.JSONField(default=dict, blank=True)
+    # Avance confirmado de un trabajo reanudable (lo escribe la propia función)
+    punto_control = models.JSONField(null=True, blank=True)
+    creado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    creado = models.DateTimeField(auto_now_add=True)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    finalizado = models.DateTimeField(null=True, blank=True)
+    # Proceso responsable ('host:pid') y última señal de vida, para detectar
+    # trabajos abandonados (ver JobRunner.abandonado)
+    proceso = models.CharField(max_length=100, blank=True, default='')
+    latido = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tipo', 'estado'], name='pred_trabajo_tipo_estado_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.estado})"
+
+    def como_dict(self) -> dict:
+        return {
+            'id': self.pk,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'etapa': self.etapa,
+            'resultado': self.resultado,
+            'punto_control': self.punto_control,
+            'error': self.error or None,
+            'creado': self.creado.isoformat() if self.creado else None,
+            'iniciado': self.iniciado.isoformat() if self.iniciado else None,
+            'finalizado': self.finalizado.isoformat() if self.finalizado else None,
+        }
+
+
+class Tarea(models.Model):
+    """Ejecución encolada de una función `@shared_task` (ver `task_queue.py`).
+
+    La cola es la propia tabla: los workers de `procesar_tareas` reclaman las
+    filas pendientes cuyo `ejecutar_desde` ya pasó.
+    """
+
+    PENDIENTE = 'pendiente'
+    EN_CURSO = 'en_curso'
+    COMPLETADA = 'completada'
+    FALLIDA = 'fallida'
+    ESTADO_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (COMPLETADA, 'Completada'),
+        (FALLIDA, 'Fallida'),
+    ]
+
+    nombre = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default=PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    max_reintentos = models.PositiveIntegerField(default=0)
+    # Nombre de la entrada de PREDICCIONES_TAREAS_PERIODICAS que la encoló, si aplica
+    periodica = models.CharField(max_length=100, blank=True, default='')
+    resultado = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    creado = models.DateTimeField(auto_now_add=True)
+    ejecutar_desde = models.DateTimeField()
+    iniciado = models.DateTimeField(null=True, blank=True)
+    finalizado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'ejecutar_desde'], name='pred_tarea_cola_idx'),
+            models.Index(fields=['periodica', 'creado'], name='pred_tarea_periodica_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} #{self.pk} ({self.estado})"
+
+    def como_dict(self) -> dict:
+        return {
+            'id': self.pk,
+            'nombre': self.nombre,
+            'estado': self.estado,
+            'intentos': self.intentos,
+            'resultado': self.resultado,
+            'error': self.error or None,
+            'creado': self.creado.isoformat() if self.creado else None,
+            'ejecutar_desde': self.ejecutar_desde.isoformat() if self.ejecutar_desde else None,
+            'iniciado': self.iniciado.isoformat() if self.iniciado else None,
+            'finalizado': self.finalizado.isoformat() if self.finalizado else None,
+        }
+
+
+class HistorialPrediccion(models.Model):
+    """Una predicción calculada para un cliente. Solo se agregan filas.
+
+    Se escribe por lotes desde todas las rutas de puntuación (ver
+    `historial.py`); las filas más viejas que la retención se purgan y quedan
+    resumidas en `ResumenMensualPrediccion`.
+    """
+
+    ORIGEN_INDIVIDUAL = 'individual'
+    ORIGEN_LOTE = 'lote'
+    ORIGEN_RECALCULO = 'recalculo'
+    ORIGEN_CHOICES = [
+        (ORIGEN_INDIVIDUAL, 'Individual'),
+        (ORIGEN_LOTE, 'Lote'),
+        (ORIGEN_RECALCULO, 'Recálculo'),
+    ]
+
+    # Sin índice propio: lo cubre (cliente, fecha_prediccion)
+    cliente = models.ForeignKey(
+        'clientes.Cliente', on_delete=models.CASCADE, related_name='predicciones', db_index=False,
+    )
+    fecha_prediccion = models.DateTimeField(default=timezone.now)
+    probabilidad = models.FloatField()
+    nivel_riesgo = models.CharField(max_length=10)
+    version_modelo = models.CharField(max_length=64, blank=True, default='')
+    origen = models.CharField(max_length=12, choices=ORIGEN_CHOICES)
+
+    class Meta:
+        indexes = [
+            # Historial de un cliente y "últimas N" globales
+            models.Index(fields=['cliente', 'fecha_prediccion'], name='pred_hist_cli_fecha_idx'),
+            models.Index(fields=['fecha_prediccion'], name='pred_hist_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.cliente_id} {self.probabilidad:.2f} ({self.fecha_prediccion:%Y-%m-%d %H:%M})"
+
+    def como_dict(self) -> dict:
+        return {
+            'id': self.pk,
+            'cliente_id': self.cliente_id,
+            'fecha_prediccion': self.fecha_prediccion.isoformat(),
+            'probabilidad_abandono': round(self.probabilidad * 100, 2),
+            'nivel_riesgo': self.nivel_riesgo,
+            'version_modelo': self.version_modelo,
+            'origen': self.origen,
+        }
+
+
+class ResumenMensualPrediccion(models.Model):
+    """Conteo y suma de probabilidades por mes y nivel de riesgo.
+
+    Se acumula al escribir el historial, así que sobrevive a la purga.
+    """
+
+    mes = models.DateField(help_text='Primer día del mes')
+    nivel_riesgo = models.CharField(max_length=10)
+    cantidad = models.BigIntegerField(default=0)
+    suma_probabilidad = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['mes', 'nivel_riesgo'], name='pred_resumen_mes_nivel_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.mes:%Y-%m} {self.nivel_riesgo}: {self.cantidad}"
+
+    @property
+    def probabilidad_media(self) -> float | None:
+        return self.suma_probabilidad / self.cantidad if self.cantidad else None
+
+    def como_dict(self) -> dict:
+        media = self.probabilidad_media
+        return {
+            'mes': self.mes.strftime('%Y-%m'),
+            'nivel_riesgo': self.nivel_riesgo,
+            'cantidad': self.cantidad,
+            'probabilidad_media': round(media * 100, 2) if media is not None else None,
+        }
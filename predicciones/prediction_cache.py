@@ -0,0 +1,143 @@
+"""Caché de probabilidades por (versión del modelo, huella del vector de features).
+
+La clave se arma con la versión vigente y un hash de la fila ya codificada
+por el encoder de esa versión: dos clientes con las mismas features comparten
+la entrada, y cualquier cambio en una columna usada por el modelo produce una
+clave distinta, así que no hace falta invalidar por cliente.
+
+Los valores viven en un backend de caché de Django (`PREDICCIONES_CACHE_ALIAS`,
+por defecto locmem, sin servicios externos). El proceso lleva además un índice
+LRU de las claves que escribió, acotado a `PREDICCIONES_CACHE_MAX_ENTRADAS`:
+al superarlo se borran del backend las menos usadas. Al detectar una versión
+nueva del modelo se borran todas las entradas de la anterior.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+_PREFIJO = 'pred'
+
+
+def huella(fila) -> str:
+    """Hash estable de una fila codificada (arreglo de float64)."""
+    return hashlib.blake2b(fila.tobytes(), digest_size=16).hexdigest()
+
+
+class PrediccionCache:
+    def __init__(self, alias: str = 'default', max_entradas: int = 10_000, timeout: int | None = None):
+        self.alias = alias
+        self.max_entradas = max_entradas
+        self.timeout = timeout
+        self._indice: OrderedDict[str, None] = OrderedDict()
+        self._version: str | None = None
+        self._lock = threading.Lock()
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _clave(self, version: str, huella_fila: str) -> str:
+        return f'{_PREFIJO}:{version}:{huella_fila}'
+
+    def _cambiar_version(self, version: str) -> None:
+        # Llamar con el lock tomado
+        if self._version == version:
+            return
+        if self._indice:
+            self.backend.delete_many(list(self._indice))
+            self.invalidaciones += len(self._indice)
+            self._indice.clear()
+        self._version = version
+
+    def obtener_muchos(self, version: str, huellas: list[str]) -> dict[str, float]:
+        """Probabilidades en caché para `huellas` (solo las presentes)."""
+        claves = {self._clave(version, h): h for h in set(huellas)}
+        with self._lock:
+            self._cambiar_version(version)
+        encontrados = self.backend.get_many(list(claves))
+        with self._lock:
+            for clave in encontrados:
+                if clave in self._indice:
+                    self._indice.move_to_end(clave)
+            # Conteo por fila pedida, no por clave única
+            resultado = {claves[clave]: valor for clave, valor in encontrados.items()}
+            aciertos = sum(1 for h in huellas if h in resultado)
+            self.aciertos += aciertos
+            self.fallos += len(huellas) - aciertos
+        return resultado
+
+    def guardar_muchos(self, version: str, valores: dict[str, float]) -> None:
+        if not valores:
+            return
+        datos = {self._clave(version, h): v for h, v in valores.items()}
+        with self._lock:
+            if self._version is None:
+                self._version = version
+            elif self._version != version:
+                # Resultado de una versión ya reemplazada: no se guarda
+                return
+            for clave in datos:
+                self._indice[clave] = None
+                self._indice.move_to_end(clave)
+            sobrantes = []
+            while len(self._indice) > self.max_entradas:
+                sobrantes.append(self._indice.popitem(last=False)[0])
+            self.desalojos += len(sobrantes)
+        # Las desalojadas en esta misma llamada no se escriben
+        for clave in sobrantes:
+            datos.pop(clave, None)
+        self.backend.set_many(datos, timeout=self.timeout)
+        if sobrantes:
+            self.backend.delete_many(sobrantes)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            if self._indice:
+                self.backend.delete_many(list(self._indice))
+            self._indice.clear()
+            self._version = None
+
+    def estadisticas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            'alias': self.alias,
+            'version': self._version,
+            'entradas': len(self._indice),
+            'max_entradas': self.max_entradas,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else None,
+            'desalojos': self.desalojos,
+            'invalidaciones': self.invalidaciones,
+        }
+
+
+_cache: PrediccionCache | None = None
+_cache_lock = threading.Lock()
+
+
+def cache_predicciones() -> PrediccionCache | None:
+    """Instancia única por proceso; None si `PREDICCIONES_CACHE_MAX_ENTRADAS` es 0."""
+    global _cache
+    max_entradas = getattr(settings, 'PREDICCIONES_CACHE_MAX_ENTRADAS', 10_000)
+    if max_entradas <= 0:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PrediccionCache(
+                    alias=getattr(settings, 'PREDICCIONES_CACHE_ALIAS', 'default'),
+                    max_entradas=max_entradas,
+                    timeout=getattr(settings, 'PREDICCIONES_CACHE_TTL', None),
+                )
+    return _cache
@@ -0,0 +1,191 @@
+"""Registro de versiones de modelos con puntero "actual" atómico.
+
+Estructura en disco::
+
+    <raiz>/<nombre>/CURRENT                        # texto: versión vigente
+    <raiz>/<nombre>/versiones/<version>/metadata.json
+    <raiz>/<nombre>/versiones/<version>/<artefacto>.joblib
+
+Cada versión es inmutable: se escribe completa en un directorio temporal y se
+publica con un `rename`. `CURRENT` se reemplaza con `os.replace`, así que un
+lector ve la versión anterior o la nueva, nunca un archivo a medio escribir.
+
+No depende de Django: `predicciones` (views y tasks) y `churn_dashboard`
+usan el mismo registro.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+# Formato de cada artefacto: 'joblib' (pickle) o 'bosque' (BosqueCompilado, mapeable)
+FORMATO_JOBLIB = 'joblib'
+FORMATO_BOSQUE = 'bosque'
+
+
+def _formato(objeto) -> str:
+    from .forest import BosqueCompilado
+
+    return FORMATO_BOSQUE if isinstance(objeto, BosqueCompilado) else FORMATO_JOBLIB
+
+
+class ModeloCargado:
+    """Una versión del registro. Los artefactos se cargan al primer acceso.
+
+    Así, por ejemplo, un worker que solo puntúa filas sueltas usa el bosque
+    mapeado y nunca carga el modelo de sklearn en memoria.
+    """
+
+    def __init__(self, registro: 'RegistroModelos', nombre: str, version: str, metadata: dict,
+                 mmap_mode: str | None = 'r'):
+        self.registro = registro
+        self.nombre = nombre
+        self.version = version
+        self.metadata = metadata
+        self.mmap_mode = mmap_mode
+        self._cargados: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def tiene(self, artefacto: str) -> bool:
+        return artefacto in self.metadata.get('artefactos', {})
+
+    def ruta(self, artefacto: str) -> Path:
+        return self.registro.ruta_version(self.nombre, self.version) / f'{artefacto}.joblib'
+
+    def artefacto(self, artefacto: str) -> Any:
+        if artefacto in self._cargados:
+            return self._cargados[artefacto]
+        if not self.tiene(artefacto):
+            raise FileNotFoundError(f'La versión {self.version} no tiene el artefacto "{artefacto}"')
+        with self._lock:
+            if artefacto not in self._cargados:
+                if self.metadata['artefactos'][artefacto] == FORMATO_BOSQUE:
+                    from .forest import BosqueCompilado
+
+                    objeto = BosqueCompilado.cargar(self.ruta(artefacto), mmap_mode=self.mmap_mode)
+                else:
+                    import joblib
+
+                    objeto = joblib.load(self.ruta(artefacto))
+                self._cargados[artefacto] = objeto
+        return self._cargados[artefacto]
+
+    @property
+    def modelo(self):
+        return self.artefacto('modelo')
+
+    @property
+    def encoder(self):
+        return self.artefacto('encoder')
+
+    @property
+    def bosque(self):
+        return self.artefacto('bosque')
+
+
+class RegistroModelos:
+    def __init__(self, raiz: Path | str):
+        self.raiz = Path(raiz)
+
+    def ruta_actual(self, nombre: str) -> Path:
+        return self.raiz / nombre / 'CURRENT'
+
+    def ruta_version(self, nombre: str, version: str) -> Path:
+        return self.raiz / nombre / 'versiones' / version
+
+    def version_actual(self, nombre: str) -> str | None:
+        try:
+            return self.ruta_actual(nombre).read_text(encoding='utf-8').strip() or None
+        except FileNotFoundError:
+            return None
+
+    def versiones(self, nombre: str) -> list[str]:
+        directorio = self.raiz / nombre / 'versiones'
+        if not directorio.exists():
+            return []
+        return sorted(p.name for p in directorio.iterdir() if p.is_dir() and not p.name.startswith('.'))
+
+    def metadata(self, nombre: str, version: str | None = None) -> dict:
+        version = version or self.version_actual(nombre)
+        if version is None:
+            raise FileNotFoundError(f'No hay una versión vigente de "{nombre}"')
+        with open(self.ruta_version(nombre, version) / 'metadata.json', encoding='utf-8') as f:
+            return json.load(f)
+
+    def publicar(self, nombre: str, artefactos: dict[str, Any], metadata: dict | None = None,
+                 activar: bool = True) -> str:
+        """Escribe una versión nueva con sus artefactos y metadatos; la activa por defecto.
+
+        `metadata` suele incluir `features`, `metricas` y `filas_entrenamiento`;
+        `version`, `creado` y `artefactos` se completan aquí.
+        """
+        import joblib
+
+        ahora = datetime.now(timezone.utc)
+        version = f"{ahora.strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:6]}"
+        versiones = self.raiz / nombre / 'versiones'
+        versiones.mkdir(parents=True, exist_ok=True)
+        temporal = versiones / f'.tmp-{version}'
+        temporal.mkdir()
+        try:
+            formatos = {}
+            for clave, objeto in artefactos.items():
+                formatos[clave] = _formato(objeto)
+                destino = temporal / f'{clave}.joblib'
+                if formatos[clave] == FORMATO_BOSQUE:
+                    objeto.guardar(destino)
+                else:
+                    joblib.dump(objeto, destino)
+
+            datos = dict(metadata or {})
+            datos.update({
+                'nombre': nombre,
+                'version': version,
+                'creado': ahora.isoformat(),
+                'artefactos': formatos,
+            })
+            with open(temporal / 'metadata.json', 'w', encoding='utf-8') as f:
+                json.dump(datos, f, ensure_ascii=False, indent=2, default=str)
+
+            os.rename(temporal, self.ruta_version(nombre, version))
+        except BaseException:
+            shutil.rmtree(temporal, ignore_errors=True)
+            raise
+
+        if activar:
+            self.activar(nombre, version)
+        return version
+
+    def activar(self, nombre: str, version: str) -> None:
+        """Apunta `CURRENT` a `version` con un reemplazo atómico (también sirve para rollback)."""
+        if not (self.ruta_version(nombre, version) / 'metadata.json').exists():
+            raise FileNotFoundError(f'No existe la versión {version} de "{nombre}"')
+        actual = self.ruta_actual(nombre)
+        temporal = actual.with_name(f'.CURRENT.{os.getpid()}.{uuid.uuid4().hex[:6]}.tmp')
+        temporal.write_text(version, encoding='utf-8')
+        os.replace(temporal, actual)
+
+    def cargar(self, nombre: str, version: str | None = None, mmap_mode: str | None = 'r') -> ModeloCargado:
+        version = version or self.version_actual(nombre)
+        if version is None:
+            raise FileNotFoundError(f'No hay una versión vigente de "{nombre}"')
+        return ModeloCargado(self, nombre, version, self.metadata(nombre, version), mmap_mode=mmap_mode)
+
+    def purgar(self, nombre: str, conservar: int = 5) -> list[str]:
+        """Elimina versiones antiguas, conservando las `conservar` más recientes y la vigente.
+
+        Borrar archivos mapeados por otros procesos es seguro en POSIX: el
+        contenido sigue disponible hasta que lo liberan.
+        """
+        vigente = self.version_actual(nombre)
+        versiones = self.versiones(nombre)
+        borrar = [v for v in versiones[:-conservar] if v != vigente] if conservar > 0 else []
+        for version in borrar:
+            shutil.rmtree(self.ruta_version(nombre, version), ignore_errors=True)
+        return borrar
@@ -0,0 +1,234 @@
+"""Puntuación vectorizada de clientes.
+
+Todas las rutas de predicción (una fila o un lote) pasan por aquí: el
+`ClienteEncoder` guardado con el modelo construye la matriz de features y el
+modelo se invoca una sola vez por lote.
+"""
+from __future__ import annotations
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from clientes.models import Cliente
+
+from . import historial
+from .model_cache import modelo_vigente
+from .models import HistorialPrediccion
+from .prediction_cache import cache_predicciones, huella
+
+# Columnas de Cliente que se leen para puntuar
+CAMPOS_FEATURES = Cliente.CAMPOS_MODELO
+
+
+def predictor(vigente, n_filas: int):
+    """Modelo de la versión `vigente` a usar para un lote de `n_filas`.
+
+    Hasta `PREDICCIONES_BOSQUE_MAX_FILAS` filas se usa el bosque compilado (sin
+    overhead fijo por llamada); en lotes mayores el recorrido de sklearn es
+    más rápido. Sin bosque exportado se usa siempre el modelo de sklearn.
+    """
+    if n_filas <= getattr(settings, 'PREDICCIONES_BOSQUE_MAX_FILAS', 128) and vigente.tiene('bosque'):
+        return vigente.bosque
+    return vigente.modelo
+
+
+def puntuar_filas(filas, vigente=None) -> list[float]:
+    """Probabilidad de abandono (0..1) para cada fila (dict o Cliente), en orden.
+
+    Usa la versión `vigente` (por defecto la actual): quien registre la
+    versión junto a las probabilidades debe obtenerla antes y pasarla, porque
+    el modelo puede cambiar entre dos llamadas a `modelo_vigente().obtener()`.
+
+    Consulta primero la caché de predicciones (ver `prediction_cache.py`) y
+    solo pasa por el modelo las filas que faltan. Lotes más grandes que la
+    caché se puntúan directo, sin leerla ni escribirla.
+    """
+    filas = filas if isinstance(filas, list) else list(filas)
+    if not filas:
+        return []
+    vigente = vigente or modelo_vigente().obtener()
+    X = vigente.encoder.transform(filas)
+
+    cache = cache_predicciones()
+    if cache is None or len(filas) > cache.max_entradas:
+        return predictor(vigente, len(filas)).predict_proba(X)[:, 1].tolist()
+
+    huellas = [huella(fila) for fila in X]
+    conocidas = cache.obtener_muchos(vigente.version, huellas)
+    faltantes = [i for i, h in enumerate(huellas) if h not in conocidas]
+    if faltantes:
+        nuevas = predictor(vigente, len(faltantes)).predict_proba(X[faltantes])[:, 1].tolist()
+        calculadas = {huellas[i]: p for i, p in zip(faltantes, nuevas)}
+        cache.guardar_muchos(vigente.version, calculadas)
+        conocidas.update(calculadas)
+    return [conocidas[h] for h in huellas]
+
+
+def puntuar_con_version(filas) -> list[tuple[float, str]]:
+    """(probabilidad, versión del modelo que la calculó) para cada fila.
+
+    Para `MicroBatcher`: cada request recibe la versión de su propio lote.
+    """
+    vigente = modelo_vigente().obtener()
+    return [(p, vigente.version) for p in puntuar_filas(filas, vigente)]
+
+
+def puntuar_queryset(queryset, origen: str | None = None) -> list[dict]:
+    """Puntúa todos los clientes del queryset con una consulta y un predict_proba.
+
+    Con `origen` las probabilidades se registran en el historial de predicciones.
+    """
+    filas = list(queryset.order_by('id').values('id', 'nombre', *CAMPOS_FEATURES))
+    vigente = modelo_vigente().obtener()
+    probabilidades = puntuar_filas(filas, vigente)
+    if origen and filas:
+        historial.registrar(
+            [(fila['id'], p) for fila, p in zip(filas, probabilidades)],
+            vigente.version,
+            origen,
+        )
+    return [
+        {
+            'id': fila['id'],
+            'cliente': fila['nombre'],
+            'probabilidad_abandono': round(p * 100, 2),
+            'nivel_riesgo': Cliente.nivel_desde_probabilidad(p),
+        }
+        for fila, p in zip(filas, probabilidades)
+    ]
+
+
+def _bloques_por_pk(queryset, tamano: int):
+    """Recorre `queryset.values()` en bloques ordenados por pk (keyset, sin OFFSET)."""
+    ultimo = None
+    while True:
+        qs = queryset if ultimo is None else queryset.filter(pk__gt=ultimo)
+        bloque = list(qs.order_by('pk')[:tamano].iterator(chunk_size=tamano))
+        if not bloque:
+            return
+        yield bloque
+        ultimo = bloque[-1]['id']
+
+
+def actualizar_por_pk(modelo, campos, filas) -> None:
+    """UPDATE parametrizado con `executemany`: `filas` son tuplas (valores..., pk).
+
+    Equivale a `bulk_update(fields=campos)` pero sin construir un CASE/WHEN por
+    fila en Python, que domina el costo en bloques grandes.
+    """
+    meta = modelo._meta
+    connection = connections[router.db_for_write(modelo)]
+    qn = connection.ops.quote_name
+    columnas = [meta.get_field(c) for c in campos]
+    asignaciones = ', '.join(f'{qn(f.column)} = %s' for f in columnas)
+    sql = f'UPDATE {qn(meta.db_table)} SET {asignaciones} WHERE {qn(meta.pk.column)} = %s'
+    parametros = [
+        [f.get_db_prep_save(v, connection) for f, v in zip(columnas, fila[:-1])] + [fila[-1]]
+        for fila in filas
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, parametros)
+
+
+def pendientes_de_puntuar(queryset, version: str):
+    """Clientes sin puntuar, con datos modificados después de puntuarlos o puntuados por otra versión.
+
+    Qué cuenta como dato modificado: ver `Cliente.datos_modificados_en`.
+    """
+    return queryset.filter(
+        Q(puntuado_en__isnull=True)
+        | Q(datos_modificados_en__gt=F('puntuado_en'))
+        | ~Q(version_modelo=version)
+    )
+
+
+def recalcular_todos(
+    queryset=None,
+    tamano_bloque: int = 2000,
+    workers: int = 1,
+    progreso: Callable[[str], None] | None = None,
+    incremental: bool = False,
+    registrar_historial: bool = True,
+) -> dict:
+    """Recalcula probabilidad y nivel de riesgo de todos los clientes.
+
+    Cada bloque se puntúa con un solo predict_proba (en un pool de `workers`
+    hilos) y se escribe actualizando solo las columnas de la puntuación, en
+    una transacción por bloque. Las escrituras ocurren siempre en el hilo que
+    llama, en orden de pk.
+
+    Con `incremental=True` solo se recorren los `pendientes_de_puntuar`; el
+    resto se cuenta como omitido. Con `registrar_historial` cada bloque se
+    agrega al historial de predicciones en la misma transacción.
+    """
+    # Una sola versión del modelo para toda la corrida
+    vigente = modelo_vigente().obtener()
+    modelo, encoder = vigente.modelo, vigente.encoder
+    # Marca de la corrida: un cliente editado mientras corre queda pendiente
+    marca = timezone.now()
+    queryset = queryset if queryset is not None else Cliente.objects.all()
+    omitidas = 0
+    if incremental:
+        total = queryset.count()
+        queryset = pendientes_de_puntuar(queryset, vigente.version)
+    queryset = queryset.values('id', *CAMPOS_FEATURES)
+
+    def puntuar(bloque):
+        return bloque, modelo.predict_proba(encoder.transform(bloque))[:, 1]
+
+    filas = 0
+
+    def escribir(bloque, probabilidades):
+        nonlocal filas
+        probabilidades = probabilidades.tolist()
+        valores = [
+            (p, Cliente.nivel_desde_probabilidad(p), marca, vigente.version, fila['id'])
+            for fila, p in zip(bloque, probabilidades)
+        ]
+        with transaction.atomic(using=router.db_for_write(Cliente)):
+            actualizar_por_pk(
+                Cliente,
+                ['probabilidad_abandono', 'nivel_riesgo', 'puntuado_en', 'version_modelo'],
+                valores,
+            )
+            if registrar_historial:
+                historial.escribir(historial.nuevas(
+                    [(fila['id'], p) for fila, p in zip(bloque, probabilidades)],
+                    vigente.version, HistorialPrediccion.ORIGEN_RECALCULO, fecha=marca,
+                ))
+        filas += len(bloque)
+        if progreso:
+            progreso(f'{filas} filas recalculadas')
+
+    inicio = time.perf_counter()
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pendientes = deque()
+        for bloque in _bloques_por_pk(queryset, tamano_bloque):
+            pendientes.append(pool.submit(puntuar, bloque))
+            # Limita los bloques en memoria a ~2 por worker
+            if len(pendientes) >= workers * 2:
+                escribir(*pendientes.popleft().result())
+        while pendientes:
+            escribir(*pendientes.popleft().result())
+    segundos = time.perf_counter() - inicio
+    if incremental:
+        omitidas = total - filas
+
+    return {
+        'filas': filas,
+        'omitidas': omitidas,
+        'incremental': incremental,
+        'segundos': round(segundos, 3),
+        'filas_por_segundo': round(filas / segundos, 1) if segundos > 0 else None,
+        'tamano_bloque': tamano_bloque,
+        'workers': workers,
+        'version_modelo': vigente.version,
+    }
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Enviada al escribir (cantidad > 0) o purgar (cantidad < 0) filas de HistorialPrediccion.
+# Argumentos: cantidad (int)
+predicciones_registradas = Signal()
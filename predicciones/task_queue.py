@@ -0,0 +1,344 @@
+"""Backend de tareas compatible con `@shared_task`, sin broker.
+
+`shared_task` acepta la misma forma que el de Celery (`@shared_task` o
+`@shared_task(max_retries=3, default_retry_delay=60)`) y la función decorada
+ofrece `delay()` y `apply_async(args, kwargs, countdown, eta)`. Lo que pasa
+al encolar depende de `PREDICCIONES_TASK_BACKEND`:
+
+- `'local'` (por defecto): se inserta una fila `Tarea` y la ejecuta
+  `python manage.py procesar_tareas`, con un pool acotado de hilos o procesos.
+- `'inmediato'`: se ejecuta en el acto en el proceso que encola (tests, scripts).
+- `'celery'`: se delega en `celery.shared_task` (requiere Celery y broker).
+
+Una tarea que lanza una excepción se reintenta hasta `max_retries` veces,
+con espera exponencial a partir de `default_retry_delay` segundos. Las tareas
+periódicas (`PREDICCIONES_TAREAS_PERIODICAS`) las encola el propio
+`procesar_tareas`; como la última ejecución se consulta en la tabla, el
+calendario sobrevive a reinicios. Debe haber un solo proceso con programador.
+"""
+from __future__ import annotations
+
+import importlib
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Tarea
+
+logger = logging.getLogger(__name__)
+
+BACKEND_LOCAL = 'local'
+BACKEND_INMEDIATO = 'inmediato'
+BACKEND_CELERY = 'celery'
+
+
+def _backend() -> str:
+    return getattr(settings, 'PREDICCIONES_TASK_BACKEND', BACKEND_LOCAL)
+
+
+class TareaLocal:
+    """Función registrada como tarea; llamarla directamente la ejecuta en el acto."""
+
+    def __init__(self, funcion, nombre: str | None = None, max_retries: int = 0,
+                 default_retry_delay: float = 60):
+        self.funcion = funcion
+        self.name = nombre or f'{funcion.__module__}.{funcion.__name__}'
+        self.max_retries = max_retries
+        self.default_retry_delay = default_retry_delay
+        self.__name__ = funcion.__name__
+        self.__doc__ = funcion.__doc__
+        self.__module__ = funcion.__module__
+
+    def __call__(self, *args, **kwargs):
+        return self.funcion(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.apply_async(args, kwargs)
+
+    def apply_async(self, args=(), kwargs=None, countdown: float | None = None,
+                    eta: datetime | None = None, periodica: str = ''):
+        """Encola la tarea. Devuelve la fila `Tarea` (o el resultado, en modo inmediato)."""
+        if _backend() == BACKEND_INMEDIATO:
+            return self.funcion(*args, **(kwargs or {}))
+        if eta is None:
+            eta = timezone.now() + timedelta(seconds=countdown or 0)
+        return Tarea.objects.create(
+            nombre=self.name,
+            args=list(args),
+            kwargs=kwargs or {},
+            max_reintentos=self.max_retries,
+            periodica=periodica,
+            ejecutar_desde=eta,
+        )
+
+
+def shared_task(*decorador_args, **opciones):
+    """Equivalente a `celery.shared_task` para el backend configurado."""
+    if _backend() == BACKEND_CELERY:
+        from celery import shared_task as celery_shared_task
+
+        return celery_shared_task(*decorador_args, **opciones)
+
+    def registrar(funcion):
+        return TareaLocal(
+            funcion,
+            nombre=opciones.get('name'),
+            max_retries=opciones.get('max_retries', 0),
+            default_retry_delay=opciones.get('default_retry_delay', 60),
+        )
+
+    if len(decorador_args) == 1 and callable(decorador_args[0]) and not opciones:
+        return registrar(decorador_args[0])
+    return registrar
+
+
+def resolver(nombre: str) -> TareaLocal:
+    modulo, _, atributo = nombre.rpartition('.')
+    tarea = getattr(importlib.import_module(modulo), atributo)
+    if not isinstance(tarea, TareaLocal):
+        raise TypeError(f'{nombre} no es una tarea registrada con @shared_task')
+    return tarea
+
+
+def encolar_una_vez(tarea, *args, **kwargs):
+    """Encola `tarea` salvo que ya haya una pendiente o en curso con los mismos argumentos.
+
+    Devuelve la `Tarea` nueva o la existente (en modo inmediato, el resultado).
+    Solo el backend 'local' puede consultar la cola; con Celery se encola siempre.
+    """
+    if _backend() != BACKEND_LOCAL:
+        return tarea.delay(*args, **kwargs)
+    with transaction.atomic():
+        existente = (
+            Tarea.objects.select_for_update()
+            .filter(nombre=tarea.name, estado__in=(Tarea.PENDIENTE, Tarea.EN_CURSO), args=list(args), kwargs=kwargs)
+            .first()
+        )
+        return existente or tarea.apply_async(args, kwargs)
+
+
+def ejecutar_tarea(tarea_id: int) -> None:
+    """Ejecuta una `Tarea` ya reclamada (en un hilo o en un proceso hijo)."""
+    close_old_connections()
+
+    tarea = Tarea.objects.get(pk=tarea_id)
+    try:
+        resultado = resolver(tarea.nombre)(*tarea.args, **tarea.kwargs)
+    except Exception as exc:
+        error = f'{exc.__class__.__name__}: {exc}'
+        if tarea.intentos <= tarea.max_reintentos:
+            demora = resolver_demora(tarea)
+            Tarea.objects.filter(pk=tarea_id).update(
+                estado=Tarea.PENDIENTE, error=error,
+                ejecutar_desde=timezone.now() + timedelta(seconds=demora),
+            )
+            logger.warning('Tarea %s #%s falló (intento %s), reintento en %ss',
+                           tarea.nombre, tarea_id, tarea.intentos, demora)
+        else:
+            Tarea.objects.filter(pk=tarea_id).update(
+                estado=Tarea.FALLIDA, error=error, finalizado=timezone.now(),
+            )
+            logger.exception('Tarea %s #%s falló definitivamente', tarea.nombre, tarea_id)
+    else:
+        Tarea.objects.filter(pk=tarea_id).update(
+            estado=Tarea.COMPLETADA, resultado=resultado, error='', finalizado=timezone.now(),
+        )
+    finally:
+        close_old_connections()
+
+
+def resolver_demora(tarea: Tarea) -> float:
+    """Segundos hasta el próximo intento: `default_retry_delay * 2**(intentos - 1)`."""
+    try:
+        base = resolver(tarea.nombre).default_retry_delay
+    except Exception:
+        base = 60
+    return base * 2 ** max(0, tarea.intentos - 1)
+
+
+def reclamar(limite: int) -> list[int]:
+    """Marca como en curso hasta `limite` tareas listas y devuelve sus ids.
+
+    Cada fila se reclama con un UPDATE condicionado a `estado=pendiente`, así
+    que varios workers (o procesos) no ejecutan la misma tarea.
+    """
+    if limite <= 0:
+        return []
+    ahora = timezone.now()
+    candidatas = list(
+        Tarea.objects.filter(estado=Tarea.PENDIENTE, ejecutar_desde__lte=ahora)
+        .order_by('ejecutar_desde', 'id')
+        .values_list('id', flat=True)[:limite * 2]
+    )
+    reclamadas = []
+    for tarea_id in candidatas:
+        actualizadas = Tarea.objects.filter(pk=tarea_id, estado=Tarea.PENDIENTE).update(
+            estado=Tarea.EN_CURSO, iniciado=ahora, intentos=F('intentos') + 1,
+        )
+        if actualizadas:
+            reclamadas.append(tarea_id)
+            if len(reclamadas) >= limite:
+                break
+    return reclamadas
+
+
+def recuperar_huerfanas(timeout: timedelta) -> int:
+    """Devuelve a la cola las tareas en curso hace más de `timeout` (worker caído)."""
+    return Tarea.objects.filter(
+        estado=Tarea.EN_CURSO, iniciado__lt=timezone.now() - timeout,
+    ).update(estado=Tarea.PENDIENTE, ejecutar_desde=timezone.now())
+
+
+def _hora_de_hoy(hora: str, ahora: datetime) -> datetime:
+    """Instante de hoy (hora local) correspondiente a 'HH:MM'."""
+    horas, minutos = (int(p) for p in hora.split(':'))
+    local = timezone.localtime(ahora)
+    return local.replace(hour=horas, minute=minutos, second=0, microsecond=0)
+
+
+def programar_periodicas(ahora: datetime | None = None) -> list[Tarea]:
+    """Encola las entradas de `PREDICCIONES_TAREAS_PERIODICAS` que ya tocan.
+
+    Cada entrada es `{'tarea': 'modulo.funcion', 'cada': segundos}` o
+    `{'tarea': ..., 'hora': 'HH:MM'}` (una vez al día, hora local), con
+    `args`/`kwargs` opcionales.
+    """
+    ahora = ahora or timezone.now()
+    encoladas = []
+    for nombre, entrada in getattr(settings, 'PREDICCIONES_TAREAS_PERIODICAS', {}).items():
+        ultima = (
+            Tarea.objects.filter(periodica=nombre)
+            .order_by('-creado')
+            .values_list('creado', flat=True)
+            .first()
+        )
+        if 'cada' in entrada:
+            toca = ultima is None or ahora - ultima >= timedelta(seconds=entrada['cada'])
+        else:
+            programada = _hora_de_hoy(entrada['hora'], ahora)
+            toca = ahora >= programada and (ultima is None or ultima < programada)
+        if toca:
+            encoladas.append(resolver(entrada['tarea']).apply_async(
+                entrada.get('args', ()), entrada.get('kwargs'), periodica=nombre,
+            ))
+    return encoladas
+
+
+class ProcesadorTareas:
+    """Bucle de worker: reclama tareas mientras haya lugar en el pool y las ejecuta.
+
+    Nunca hay más de `workers` tareas reclamadas a la vez; el resto espera en
+    la tabla. Con `procesos=True` cada tarea corre en un proceso `spawn`
+    (aísla tareas intensivas en CPU del GIL).
+    """
+
+    def __init__(self, workers: int = 2, procesos: bool = False, intervalo: float = 1.0,
+                 programador: bool = True, timeout: timedelta = timedelta(hours=1)):
+        self.workers = max(1, workers)
+        self.procesos = procesos
+        self.intervalo = intervalo
+        self.programador = programador
+        self.timeout = timeout
+        self._en_vuelo: set = set()
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+
+    def _pool(self):
+        if self.procesos:
+            # django.setup() como initializer: corre antes de deserializar
+            # `ejecutar_tarea` (importar este módulo requiere las apps cargadas)
+            return ProcessPoolExecutor(max_workers=self.workers,
+                                       mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=django.setup)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tarea')
+
+    def detener(self) -> None:
+        self._detener.set()
+
+    def ejecutar(self, una_vez: bool = False) -> int:
+        """Procesa tareas hasta `detener()`; con `una_vez`, hasta vaciar la cola lista.
+
+        Devuelve cuántas tareas se despacharon.
+        """
+        recuperadas = recuperar_huerfanas(self.timeout)
+        if recuperadas:
+            logger.warning('%s tareas huérfanas devueltas a la cola', recuperadas)
+
+        despachadas = 0
+        with self._pool() as pool:
+            while not self._detener.is_set():
+                if self.programador:
+                    programar_periodicas()
+                with self._lock:
+                    libres = self.workers - len(self._en_vuelo)
+                reclamadas = reclamar(libres)
+                for tarea_id in reclamadas:
+                    futuro = pool.submit(ejecutar_tarea, tarea_id)
+                    with self._lock:
+                        self._en_vuelo.add(futuro)
+                    futuro.add_done_callback(self._terminada)
+                despachadas += len(reclamadas)
+
+                with self._lock:
+                    ocupados = len(self._en_vuelo)
+                if una_vez and not reclamadas and not ocupados:
+                    break
+                if not reclamadas:
+                    self._detener.wait(self.intervalo if not una_vez else 0.01)
+        return despachadas
+
+    def _terminada(self, futuro) -> None:
+        with self._lock:
+            self._en_vuelo.discard(futuro)
+        if futuro.exception() is not None:
+            # Error fuera de la tarea (p.ej. el proceso hijo murió); la fila
+            # queda en curso y la recupera `recuperar_huerfanas`.
+            logger.error('Error ejecutando tarea: %s', futuro.exception())
+
+
+def _percentil(valores: list[float], p: float) -> float | None:
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return round(ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))], 1)
+
+
+def metricas(ventana: timedelta = timedelta(hours=24), limite: int = 5000) -> dict:
+    """Profundidad de la cola, latencias (espera y ejecución, ms) y fallos recientes."""
+    ahora = timezone.now()
+    por_estado = dict(Tarea.objects.values_list('estado').annotate(n=Count('id')).order_by())
+    listas = Tarea.objects.filter(estado=Tarea.PENDIENTE, ejecutar_desde__lte=ahora)
+    mas_antigua = listas.order_by('ejecutar_desde').values_list('ejecutar_desde', flat=True).first()
+
+    recientes = list(
+        Tarea.objects.filter(finalizado__gte=ahora - ventana)
+        .order_by('-finalizado')
+        .values_list('nombre', 'estado', 'ejecutar_desde', 'iniciado', 'finalizado')[:limite]
+    )
+    espera = [(i - e).total_seconds() * 1000 for _, _, e, i, _ in recientes if i]
+    duracion = [(f - i).total_seconds() * 1000 for _, _, _, i, f in recientes if i]
+    fallos: dict[str, int] = {}
+    for nombre, estado, *_ in recientes:
+        if estado == Tarea.FALLIDA:
+            fallos[nombre] = fallos.get(nombre, 0) + 1
+
+    return {
+        'backend': _backend(),
+        'por_estado': {estado: por_estado.get(estado, 0) for estado, _ in Tarea.ESTADO_CHOICES},
+        'listas': listas.count(),
+        'espera_max_s': round((ahora - mas_antigua).total_seconds(), 1) if mas_antigua else 0,
+        'ventana_horas': ventana.total_seconds() / 3600,
+        'finalizadas': len(recientes),
+        'espera_ms': {'p50': _percentil(espera, 50), 'p95': _percentil(espera, 95)},
+        'duracion_ms': {'p50': _percentil(duracion, 50), 'p95': _percentil(duracion, 95)},
+        'fallidas': sum(fallos.values()),
+        'fallidas_por_tarea': fallos,
+    }
@@ -1,36 +1,87 @@
-from celery import shared_task
-import joblib
+import time
+from datetime import timedelta
+
 from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
 from usuarios.models import Alert
 from clientes.models import Cliente
-import pandas as pd
+from predicciones import historial
+from predicciones.model_cache import NOMBRE_MODELO, modelo_vigente, registro
+from predicciones.scoring import CAMPOS_FEATURES, _bloques_por_pk, predictor, recalcular_todos
+from predicciones.task_queue import shared_task
+
 
 @shared_task
-def detect_high_risk_alerts(model_path=None, threshold=0.8, batch_limit=1000):
-    model_path = model_path or getattr(settings, "CHURN_MODEL_PATH", "models/churn_v1.joblib")
+def detect_high_risk_alerts(version=None, threshold=0.8, tamano_bloque=2000, ventana_horas=None):
+    """Recorre todos los clientes por bloques de pk y crea alertas para los de alto riesgo.
+
+    Cada bloque se codifica con el encoder de la versión, se puntúa con una
+    sola llamada y sus alertas se insertan con `bulk_create`. Un cliente con
+    una alerta creada en las últimas `ventana_horas` no recibe otra; la
+    comprobación es una consulta por bloque sobre el índice (cliente, created_at).
+    """
+    # Versión vigente del registro (o una versión fija, p.ej. para comparar)
     try:
-        model = joblib.load(model_path)
+        vigente = registro().cargar(NOMBRE_MODELO, version) if version else modelo_vigente().obtener()
+        encoder = vigente.encoder
     except Exception as e:
         return {"error": str(e)}
 
-    # Cargar features de clientes (ajusta según tu modelo/fields)
-    qs = Cliente.objects.all()[:batch_limit]
-    if not qs:
-        return {"ok": True, "created": 0}
-    df = pd.DataFrame([{
-        "id": c.id,
-        # añade aquí las columnas que usa tu modelo; este es un placeholder
-        "feature1": getattr(c, "feature1", 0),
-        "feature2": getattr(c, "feature2", 0),
-    } for c in qs]).set_index("id")
-
-    X = df.values
-    probs = model.predict_proba(X)[:,1] if hasattr(model, "predict_proba") else model.predict(X)
-    created = 0
-    for cid, p in zip(df.index.tolist(), probs.tolist()):
-        if p >= threshold:
-            # evita duplicados recientes: crea siempre o aplicar lógica para no duplicar
-            cliente = Cliente.objects.get(pk=cid)
-            Alert.objects.create(cliente=cliente, probability=float(p))
-            created += 1
-    return {"ok": True, "created": created}
+    if ventana_horas is None:
+        ventana_horas = getattr(settings, 'PREDICCIONES_ALERTAS_VENTANA_HORAS', 24)
+    corte = timezone.now() - timedelta(hours=ventana_horas)
+    db = router.db_for_write(Alert)
+
+    scanned = created = skipped = 0
+    inicio = time.perf_counter()
+    for bloque in _bloques_por_pk(Cliente.objects.values('id', *CAMPOS_FEATURES), tamano_bloque):
+        scanned += len(bloque)
+        probs = predictor(vigente, len(bloque)).predict_proba(encoder.transform(bloque))[:, 1]
+        candidatos = {
+            fila['id']: p for fila, p in zip(bloque, probs.tolist()) if p >= threshold
+        }
+        if not candidatos:
+            continue
+
+        with transaction.atomic(using=db):
+            recientes = set(
+                Alert.objects.using(db)
+                .filter(cliente_id__in=list(candidatos), created_at__gte=corte)
+                .values_list('cliente_id', flat=True)
+                .distinct()
+            )
+            nuevas = [
+                Alert(cliente_id=cid, probability=float(p))
+                for cid, p in candidatos.items() if cid not in recientes
+            ]
+            Alert.objects.using(db).bulk_create(nuevas, batch_size=500)
+        created += len(nuevas)
+        skipped += len(recientes)
+    segundos = time.perf_counter() - inicio
+
+    return {
+        "ok": True,
+        "created": created,
+        "skipped_duplicates": skipped,
+        "scanned": scanned,
+        "seconds": round(segundos, 3),
+        "rows_per_second": round(scanned / segundos, 1) if segundos > 0 else None,
+        "model_version": vigente.version,
+    }
+
+
+@shared_task
+def rescore_incremental(tamano_bloque=2000, workers=1):
+    """Recalcula solo los clientes pendientes (nuevos, modificados o de otra versión del modelo)."""
+    try:
+        return recalcular_todos(tamano_bloque=tamano_bloque, workers=workers, incremental=True)
+    except FileNotFoundError as e:
+        return {"error": str(e)}
+
+
+@shared_task
+def purgar_historial(dias=None, tamano_bloque=10_000):
+    """Borra el historial de predicciones más viejo que la retención configurada."""
+    return historial.purgar(dias=dias, tamano_bloque=tamano_bloque)
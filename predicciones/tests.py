@@ -1,3 +1,767 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import pickle
+import socket
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from clientes.models import Cliente
+from dashboard import kpis
+
+from . import historial, jobs, model_cache, prediction_cache, scoring, task_queue, training
+from .encoder import ClienteEncoder
+from .forest import BosqueCompilado
+from .jobs import JobRunner, TrabajoEnCurso
+from .microbatch import MicroBatcher
+from .model_cache import ModeloCompartido
+from .models import HistorialPrediccion, ResumenMensualPrediccion, Tarea, Trabajo
+from .prediction_cache import PrediccionCache
+from .registry import RegistroModelos
+from .task_queue import shared_task
+from .tasks import detect_high_risk_alerts
+
+
+class ModeloDePruebaMixin:
+    """Registro temporal con un modelo entrenado sobre clientes de prueba.
+
+    Reinicia los singletons del proceso (modelo vigente, caché de predicciones
+    y buffer del historial) para que cada test use su propio registro; el
+    historial se escribe en el momento.
+    """
+
+    N_CLIENTES = 24
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(
+            PREDICCIONES_MODEL_REGISTRY=Path(directorio.name),
+            PREDICCIONES_MODEL_CHECK_INTERVAL=0,
+            PREDICCIONES_HISTORIAL_LOTE=1,
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.reiniciar_singletons()
+        self.addCleanup(self.reiniciar_singletons)
+
+        Cliente.objects.bulk_create(
+            Cliente(
+                nombre=f'N{i}', apellido='A', email=f'm{i}@ejemplo.com', telefono=f'09{i:08d}',
+                nivel_riesgo=('Bajo', 'Medio', 'Alto')[i % 3],
+                estado='inactivo' if i % 3 == 2 or i % 4 == 0 else 'activo',
+            )
+            for i in range(self.N_CLIENTES)
+        )
+        self.version = training.entrenar()['version']
+
+    @staticmethod
+    def reiniciar_singletons():
+        model_cache._vigente = None
+        prediction_cache._cache = None
+        historial._buffer = None
+        caches['predicciones'].clear()
+
+
+class ModeloCompartidoTests(SimpleTestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = Path(directorio.name) / 'modelo.txt'
+        self.ruta.write_text('v1')
+
+    def test_recarga_cuando_cambia_la_firma(self):
+        compartido = ModeloCompartido(self.ruta, loader=lambda ruta: ruta.read_text(), intervalo_revision=0)
+        self.assertEqual(compartido.obtener(), 'v1')
+        self.assertEqual(compartido.obtener(), 'v1')
+        self.assertEqual((compartido.cargas, compartido.aciertos), (1, 1))
+
+        self.ruta.write_text('versión 2')
+        self.assertEqual(compartido.obtener(), 'versión 2')
+        estadisticas = compartido.estadisticas()
+        self.assertEqual((estadisticas['cargas'], estadisticas['aciertos']), (2, 1))
+        self.assertIsNotNone(estadisticas['ultima_carga_ms'])
+
+    def test_no_revisa_el_disco_dentro_del_intervalo(self):
+        compartido = ModeloCompartido(self.ruta, loader=lambda ruta: ruta.read_text(), intervalo_revision=60)
+        compartido.obtener()
+        self.ruta.unlink()
+        self.assertEqual(compartido.obtener(), 'v1')
+        self.assertEqual(compartido.cargas, 1)
+
+        compartido.invalidar()
+        with self.assertRaises(FileNotFoundError):
+            compartido.obtener()
+
+
+class ClienteEncoderTests(SimpleTestCase):
+    filas = [
+        {'telefono': '0991234567', 'nivel_riesgo': 'Medio'},
+        {'telefono': '0987654321', 'nivel_riesgo': 'Alto'},
+        {'telefono': '22', 'nivel_riesgo': 'Bajo'},
+        {'telefono': '0991234567', 'nivel_riesgo': 'Medio'},
+    ]
+
+    def test_columnas_iguales_a_get_dummies(self):
+        import pandas as pd
+
+        encoder = ClienteEncoder().fit(self.filas)
+        # El camino anterior: get_dummies con drop_first sobre el DataFrame
+        df = pd.get_dummies(pd.DataFrame(self.filas), columns=['nivel_riesgo'], drop_first=True)
+        df['telefono'] = df['telefono'].astype(float)
+        self.assertEqual(encoder.columnas_, list(df.columns))
+        np.testing.assert_array_equal(encoder.transform(self.filas), df.to_numpy(dtype=float))
+
+    def test_categoria_desconocida_es_la_base(self):
+        encoder = ClienteEncoder().fit(self.filas)
+        X = encoder.transform([
+            {'telefono': '099-123', 'nivel_riesgo': 'Extremo'},
+            {'telefono': None, 'nivel_riesgo': None},
+            {'telefono': '1', 'nivel_riesgo': 'Alto'},
+        ])
+        # Columnas: telefono, nivel_riesgo_Bajo, nivel_riesgo_Medio ('Alto' es la base)
+        self.assertEqual(encoder.columnas_, ['telefono', 'nivel_riesgo_Bajo', 'nivel_riesgo_Medio'])
+        np.testing.assert_array_equal(X, [[99123, 0, 0], [0, 0, 0], [1, 0, 0]])
+
+    def test_instancias_y_persistencia(self):
+        encoder = ClienteEncoder().fit(self.filas)
+        clientes = [Cliente(**fila) for fila in self.filas]
+        np.testing.assert_array_equal(encoder.transform(clientes), encoder.transform(self.filas))
+
+        copia = pickle.loads(pickle.dumps(encoder))
+        np.testing.assert_array_equal(copia.transform(self.filas), encoder.transform(self.filas))
+        self.assertEqual(copia.transform([]).shape, (0, len(encoder.columnas_)))
+
+
+def trabajo_de_prueba(progreso, valor):
+    progreso('sumando')
+    if valor < 0:
+        raise ValueError('valor negativo')
+    return {'doble': valor * 2}
+
+
+@override_settings(PREDICCIONES_JOB_WORKERS=0)
+class JobRunnerTests(TestCase):
+    def enviar(self, runner, valor):
+        with self.captureOnCommitCallbacks(execute=True):
+            trabajo = runner.enviar(Trabajo.TIPO_RECALCULO, 'predicciones.tests.trabajo_de_prueba', valor=valor)
+        trabajo.refresh_from_db()
+        return trabajo
+
+    def test_sin_workers_corre_en_el_acto(self):
+        trabajo = self.enviar(JobRunner(), 21)
+        self.assertEqual((trabajo.estado, trabajo.etapa, trabajo.resultado), (Trabajo.COMPLETADO, 'sumando', {'doble': 42}))
+
+        fallido = self.enviar(JobRunner(), -1)
+        self.assertEqual((fallido.estado, fallido.error), (Trabajo.FALLIDO, 'valor negativo'))
+
+    def test_un_trabajo_activo_por_tipo(self):
+        runner = JobRunner()
+        activo = Trabajo.objects.create(tipo=Trabajo.TIPO_RECALCULO, estado=Trabajo.EN_CURSO)
+        with self.assertRaises(TrabajoEnCurso) as error:
+            runner.enviar(Trabajo.TIPO_RECALCULO, 'predicciones.tests.trabajo_de_prueba', valor=1)
+        self.assertEqual(error.exception.trabajo, activo)
+
+        # Pasado el timeout se da por abandonado y se acepta el nuevo
+        Trabajo.objects.filter(pk=activo.pk).update(creado=timezone.now() - timedelta(hours=2))
+        self.assertEqual(self.enviar(runner, 1).estado, Trabajo.COMPLETADO)
+        activo.refresh_from_db()
+        self.assertEqual(activo.estado, Trabajo.FALLIDO)
+
+    def test_proceso_muerto_se_reanuda_sin_esperar_el_timeout(self):
+        runner = JobRunner()
+        proceso = subprocess.Popen([sys.executable, '-c', ''])
+        proceso.wait()
+        caido = Trabajo.objects.create(
+            tipo=Trabajo.TIPO_RECALCULO, estado=Trabajo.EN_CURSO, funcion='predicciones.tests.trabajo_de_prueba',
+            parametros={'args': [], 'kwargs': {'valor': 4}}, proceso=f'{socket.gethostname()}:{proceso.pid}',
+            latido=timezone.now(),
+        )
+        self.assertTrue(runner.abandonado(caido))
+        with self.captureOnCommitCallbacks(execute=True):
+            runner.reanudar(caido)
+        caido.refresh_from_db()
+        self.assertEqual((caido.estado, caido.resultado), (Trabajo.COMPLETADO, {'doble': 8}))
+
+        # Vivo (este proceso): sigue en curso aunque sea viejo
+        vivo = Trabajo.objects.create(
+            tipo=Trabajo.TIPO_RECALCULO, estado=Trabajo.EN_CURSO, proceso=f'{socket.gethostname()}:{os.getpid()}',
+        )
+        Trabajo.objects.filter(pk=vivo.pk).update(creado=timezone.now() - timedelta(hours=5))
+        vivo.refresh_from_db()
+        self.assertFalse(runner.abandonado(vivo))
+        self.assertEqual(runner.marcar_abandonados(Trabajo.TIPO_RECALCULO), 0)
+
+    def test_proceso_de_otra_maquina_cuenta_desde_el_latido(self):
+        runner = JobRunner(timeout=timedelta(minutes=10))
+        remoto = Trabajo.objects.create(
+            tipo=Trabajo.TIPO_RECALCULO, estado=Trabajo.EN_CURSO, proceso='otra-maquina:123',
+            latido=timezone.now() - timedelta(minutes=5),
+        )
+        Trabajo.objects.filter(pk=remoto.pk).update(creado=timezone.now() - timedelta(hours=5))
+        remoto.refresh_from_db()
+        self.assertFalse(runner.abandonado(remoto))
+
+        remoto.latido = timezone.now() - timedelta(minutes=11)
+        remoto.save(update_fields=['latido'])
+        self.assertEqual(runner.marcar_abandonados(Trabajo.TIPO_RECALCULO), 1)
+        remoto.refresh_from_db()
+        self.assertEqual(remoto.estado, Trabajo.FALLIDO)
+
+    @override_settings(PREDICCIONES_JOB_WORKERS=1)
+    def test_pool_spawn_carga_django_antes_de_recibir_trabajos(self):
+        executor = JobRunner().executor
+        self.addCleanup(executor.shutdown)
+        # Deserializar la llamada importa predicciones.jobs (y sus modelos) en el hijo
+        futuro = executor.submit(jobs.proceso_vivo, jobs._proceso_actual())
+        self.assertIs(futuro.result(timeout=120), True)
+
+    def test_pool_roto_falla_el_trabajo_y_se_reemplaza(self):
+        class PoolRoto(Executor):
+            def submit(self, fn, /, *args, **kwargs):
+                futuro = Future()
+                futuro.set_exception(BrokenProcessPool('proceso hijo terminado'))
+                return futuro
+
+        runner = JobRunner(executor=PoolRoto())
+        trabajo = self.enviar(runner, 1)
+        self.assertEqual((trabajo.estado, trabajo.error), (Trabajo.FALLIDO, 'proceso hijo terminado'))
+        # El siguiente envío no queda bloqueado y usa un executor nuevo
+        self.assertEqual(self.enviar(runner, 2).resultado, {'doble': 4})
+
+    def test_vista_responde_409_con_entrenamiento_en_curso(self):
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@ejemplo.com', 'x'))
+        activo = Trabajo.objects.create(tipo=Trabajo.TIPO_ENTRENAMIENTO)
+        respuesta = self.client.post(reverse('predicciones:entrenar_modelo'))
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.json()['trabajo']['id'], activo.pk)
+        self.assertEqual(Trabajo.objects.count(), 1)
+
+
+class BosqueCompiladoTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from sklearn.ensemble import RandomForestClassifier
+
+        generador = np.random.default_rng(7)
+        cls.X = generador.normal(size=(600, 5))
+        y = (cls.X[:, 0] + cls.X[:, 1] ** 2 + generador.normal(scale=0.5, size=600)) > 1
+        cls.modelo = RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0).fit(cls.X, y)
+
+    def test_predict_proba_igual_a_sklearn(self):
+        bosque = BosqueCompilado.desde_sklearn(self.modelo)
+        bosque.tamano_bloque = 64  # varios bloques
+        np.testing.assert_array_equal(bosque.predict_proba(self.X), self.modelo.predict_proba(self.X))
+        np.testing.assert_array_equal(bosque.predict_proba(self.X[0]), self.modelo.predict_proba(self.X[:1]))
+        np.testing.assert_array_equal(bosque.classes_, self.modelo.classes_)
+
+    def test_un_solo_arbol(self):
+        arbol = self.modelo.estimators_[0]
+        bosque = BosqueCompilado.desde_sklearn(arbol)
+        np.testing.assert_array_equal(bosque.predict_proba(self.X), arbol.predict_proba(self.X))
+
+    def test_guardar_y_mapear(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ruta = Path(directorio.name) / 'bosque.joblib'
+        BosqueCompilado.desde_sklearn(self.modelo).guardar(ruta)
+
+        mapeado = BosqueCompilado.cargar(ruta, mmap_mode='r')
+        self.assertIsInstance(mapeado.threshold, np.memmap)
+        np.testing.assert_array_equal(mapeado.predict_proba(self.X), self.modelo.predict_proba(self.X))
+
+    def test_conserva_importancias(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ruta = Path(directorio.name) / 'bosque.joblib'
+        BosqueCompilado.desde_sklearn(self.modelo).guardar(ruta)
+        np.testing.assert_array_equal(BosqueCompilado.cargar(ruta).feature_importances_, self.modelo.feature_importances_)
+
+        # Un bosque guardado sin importancias se comporta como un modelo que no las tiene
+        datos = BosqueCompilado.desde_sklearn(self.modelo).como_arrays()
+        del datos['importancias']
+        self.assertFalse(hasattr(BosqueCompilado.desde_arrays(datos), 'feature_importances_'))
+
+    def test_perfil_de_streamlit_lista_factores_con_el_bosque(self):
+        import pandas as pd
+
+        from churn_dashboard import model as churn_model
+
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        entorno = mock.patch.dict(os.environ, {'PREDICCIONES_MODEL_REGISTRY': directorio.name})
+        entorno.start()
+        self.addCleanup(entorno.stop)
+        self.addCleanup(setattr, churn_model, '_vigente', None)
+        churn_model._vigente = None
+
+        features = [f'f{i}' for i in range(5)]
+        churn_model.guardar_modelo(self.modelo, metadata={'features': features})
+        predictor = churn_model.cargar_predictor()
+        self.assertIsInstance(predictor, BosqueCompilado)
+
+        # Lo mismo que muestra "Factores de influencia" en components/cliente_profile.py
+        fila = pd.DataFrame(self.X[:1], columns=features)
+        factores = churn_model.top_features_contrib(predictor, fila, features, top_n=3)
+        esperados = sorted(zip(features, self.modelo.feature_importances_), key=lambda p: -p[1])[:3]
+        self.assertEqual([k for k, _ in factores], [k for k, _ in esperados])
+
+    def test_valida_columnas_y_modelo(self):
+        bosque = BosqueCompilado.desde_sklearn(self.modelo)
+        with self.assertRaises(ValueError):
+            bosque.predict_proba(self.X[:, :4])
+        with self.assertRaises(TypeError):
+            BosqueCompilado.desde_sklearn(object())
+
+
+class RegistroModelosTests(SimpleTestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.registro = RegistroModelos(directorio.name)
+
+    def test_publicar_activar_y_volver_atras(self):
+        self.assertIsNone(self.registro.version_actual('m'))
+        with self.assertRaises(FileNotFoundError):
+            self.registro.cargar('m')
+
+        v1 = self.registro.publicar('m', {'modelo': {'pesos': [1]}}, {'features': ['a']})
+        v2 = self.registro.publicar('m', {'modelo': {'pesos': [2]}}, {'features': ['a']})
+        self.assertEqual(self.registro.versiones('m'), [v1, v2])
+        vigente = self.registro.cargar('m')
+        self.assertEqual((vigente.version, vigente.modelo), (v2, {'pesos': [2]}))
+        self.assertEqual(vigente.metadata['artefactos'], {'modelo': 'joblib'})
+        self.assertEqual(vigente.metadata['features'], ['a'])
+
+        self.registro.activar('m', v1)
+        self.assertEqual(self.registro.cargar('m').modelo, {'pesos': [1]})
+        with self.assertRaises(FileNotFoundError):
+            self.registro.activar('m', 'no-existe')
+        self.assertEqual(self.registro.version_actual('m'), v1)
+
+    def test_publicar_sin_activar(self):
+        v1 = self.registro.publicar('m', {'modelo': 1})
+        self.registro.publicar('m', {'modelo': 2}, activar=False)
+        self.assertEqual(self.registro.version_actual('m'), v1)
+
+    def test_purgar_conserva_las_recientes_y_la_vigente(self):
+        versiones = [self.registro.publicar('m', {'modelo': i}) for i in range(4)]
+        self.registro.activar('m', versiones[0])
+        self.assertEqual(self.registro.purgar('m', conservar=2), [versiones[1]])
+        self.assertEqual(self.registro.versiones('m'), [versiones[0], *versiones[2:]])
+
+    def test_modelo_vigente_sigue_a_current(self):
+        v1 = self.registro.publicar('m', {'modelo': 1})
+        compartido = ModeloCompartido(
+            self.registro.ruta_actual('m'), loader=lambda ruta: self.registro.cargar('m'), intervalo_revision=0,
+        )
+        self.assertEqual(compartido.obtener().version, v1)
+        v2 = self.registro.publicar('m', {'modelo': 2})
+        self.assertEqual(compartido.obtener().version, v2)
+        self.registro.activar('m', v1)
+        self.assertEqual(compartido.obtener().modelo, 1)
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def correr(self, batcher, filas):
+        async def enviar_todas():
+            return await asyncio.gather(*(batcher.enviar(fila) for fila in filas), return_exceptions=True)
+
+        return asyncio.run(enviar_todas())
+
+    def test_agrupa_envios_concurrentes(self):
+        lotes = []
+
+        def duplicar(filas):
+            lotes.append(list(filas))
+            return [fila * 2 for fila in filas]
+
+        batcher = MicroBatcher(duplicar, max_lote=64, max_espera=0.01)
+        self.assertEqual(self.correr(batcher, range(10)), [fila * 2 for fila in range(10)])
+        self.assertEqual(lotes, [list(range(10))])
+        self.assertEqual(batcher.estadisticas()['filas_por_lote'], 10)
+
+    def test_respeta_max_lote(self):
+        lotes = []
+
+        def identidad(filas):
+            lotes.append(len(filas))
+            return filas
+
+        batcher = MicroBatcher(identidad, max_lote=4, max_espera=0.01)
+        self.assertEqual(self.correr(batcher, range(10)), list(range(10)))
+        # Dos lotes salen al llenarse; el resto, al vencer la espera
+        self.assertEqual(lotes, [4, 4, 2])
+
+    def test_error_llega_a_cada_llamador(self):
+        def fallar(filas):
+            raise ValueError('modelo no disponible')
+
+        resultados = self.correr(MicroBatcher(fallar, max_espera=0.001), ['a', 'b'])
+        self.assertEqual([type(r) for r in resultados], [ValueError, ValueError])
+
+
+class PrediccionCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches['predicciones'].clear()
+        self.cache = PrediccionCache(alias='predicciones', max_entradas=2)
+
+    def test_desaloja_la_menos_usada(self):
+        self.cache.guardar_muchos('v1', {'a': 0.1, 'b': 0.2})
+        self.assertEqual(self.cache.obtener_muchos('v1', ['a']), {'a': 0.1})
+        self.cache.guardar_muchos('v1', {'c': 0.3})
+        self.assertEqual(self.cache.obtener_muchos('v1', ['a', 'b', 'c']), {'a': 0.1, 'c': 0.3})
+        estadisticas = self.cache.estadisticas()
+        self.assertEqual((estadisticas['entradas'], estadisticas['desalojos']), (2, 1))
+        self.assertEqual((estadisticas['aciertos'], estadisticas['fallos']), (3, 1))
+
+    def test_version_nueva_no_ve_entradas_viejas(self):
+        self.cache.guardar_muchos('v1', {'a': 0.1})
+        self.assertEqual(self.cache.obtener_muchos('v2', ['a']), {})
+        self.assertEqual(self.cache.estadisticas()['invalidaciones'], 1)
+        self.assertIsNone(caches['predicciones'].get('pred:v1:a'))
+
+        # Un resultado tardío de la versión reemplazada no se guarda
+        self.cache.guardar_muchos('v1', {'b': 0.2})
+        self.assertEqual(self.cache.obtener_muchos('v1', ['b']), {})
+
+
+@shared_task
+def tarea_de_prueba(valor):
+    return {'valor': valor}
+
+
+@shared_task(max_retries=1, default_retry_delay=10)
+def tarea_que_falla():
+    raise RuntimeError('sin conexión')
+
+
+@override_settings(PREDICCIONES_TASK_BACKEND=task_queue.BACKEND_LOCAL)
+class ColaDeTareasTests(TestCase):
+    def test_reclamar_una_sola_vez(self):
+        tareas = [tarea_de_prueba.delay(i) for i in range(3)]
+        tarea_de_prueba.apply_async((9,), countdown=3600)
+
+        reclamadas = task_queue.reclamar(2)
+        self.assertEqual(reclamadas, [tareas[0].pk, tareas[1].pk])
+        self.assertEqual(task_queue.reclamar(5), [tareas[2].pk])
+        self.assertEqual(task_queue.reclamar(5), [])
+        self.assertEqual(
+            list(Tarea.objects.filter(pk__in=reclamadas).values_list('estado', 'intentos')),
+            [(Tarea.EN_CURSO, 1)] * 2,
+        )
+
+        task_queue.ejecutar_tarea(tareas[0].pk)
+        tareas[0].refresh_from_db()
+        self.assertEqual((tareas[0].estado, tareas[0].resultado), (Tarea.COMPLETADA, {'valor': 0}))
+
+    def test_pool_de_procesos_carga_django(self):
+        pool = task_queue.ProcesadorTareas(workers=1, procesos=True)._pool()
+        self.addCleanup(pool.shutdown)
+        # El hijo importa task_queue (y Tarea) y resuelve una tarea registrada
+        tarea = Tarea(nombre='predicciones.tests.tarea_que_falla', intentos=2)
+        self.assertEqual(pool.submit(task_queue.resolver_demora, tarea).result(timeout=120), 20)
+
+    def test_reintento_con_espera_exponencial(self):
+        tarea = tarea_que_falla.delay()
+        self.assertEqual(task_queue.reclamar(1), [tarea.pk])
+        with self.assertLogs('predicciones.task_queue', 'WARNING'):
+            task_queue.ejecutar_tarea(tarea.pk)
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.error), (Tarea.PENDIENTE, 'RuntimeError: sin conexión'))
+        espera = (tarea.ejecutar_desde - timezone.now()).total_seconds()
+        self.assertTrue(8 < espera <= 10, espera)
+        self.assertEqual(task_queue.reclamar(1), [])
+
+        Tarea.objects.filter(pk=tarea.pk).update(ejecutar_desde=timezone.now())
+        self.assertEqual(task_queue.reclamar(1), [tarea.pk])
+        tarea.refresh_from_db()
+        self.assertEqual(task_queue.resolver_demora(tarea), 20)
+        with self.assertLogs('predicciones.task_queue', 'ERROR'):
+            task_queue.ejecutar_tarea(tarea.pk)
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos), (Tarea.FALLIDA, 2))
+
+    @override_settings(PREDICCIONES_TAREAS_PERIODICAS={
+        'cada-minuto': {'tarea': 'predicciones.tests.tarea_de_prueba', 'cada': 60, 'args': [1]},
+        'diaria': {'tarea': 'predicciones.tests.tarea_de_prueba', 'hora': '00:00', 'kwargs': {'valor': 2}},
+    })
+    def test_programar_periodicas(self):
+        encoladas = task_queue.programar_periodicas()
+        self.assertEqual(sorted(t.periodica for t in encoladas), ['cada-minuto', 'diaria'])
+        self.assertEqual(task_queue.programar_periodicas(), [])
+
+        mas_tarde = task_queue.programar_periodicas(ahora=timezone.now() + timedelta(seconds=61))
+        self.assertEqual([(t.periodica, t.args) for t in mas_tarde], [('cada-minuto', [1])])
+
+
+class PredecirLoteTests(ModeloDePruebaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@ejemplo.com', 'x'))
+        self.ids = list(Cliente.objects.order_by('id').values_list('id', flat=True)[:5])
+
+    def enviar(self, cuerpo):
+        cuerpo = cuerpo if isinstance(cuerpo, str) else json.dumps(cuerpo)
+        return self.client.post(reverse('predicciones:predecir_lote'), cuerpo, content_type='application/json')
+
+    def test_valida_el_cuerpo(self):
+        for cuerpo in ['{', '[1, 2]', {'ids': '1,2'}, {'ids': [1, '2']}, {}, {'estado': ''}]:
+            with self.subTest(cuerpo=cuerpo):
+                respuesta = self.enviar(cuerpo)
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertIn('error', respuesta.json())
+
+    def test_una_consulta_y_un_predict_proba(self):
+        predictor = scoring.predictor
+        lotes = []
+
+        def contar(vigente, n_filas):
+            lotes.append(n_filas)
+            return predictor(vigente, n_filas)
+
+        with mock.patch('predicciones.scoring.predictor', contar), CaptureQueriesContext(connection) as consultas:
+            respuesta = self.enviar({'ids': self.ids + [999_999]})
+        self.assertEqual(respuesta.status_code, 200)
+        lecturas = [
+            q['sql'] for q in consultas.captured_queries
+            if q['sql'].startswith('SELECT') and '"clientes_cliente"' in q['sql'] and 'COUNT(' not in q['sql']
+        ]
+        self.assertEqual(len(lecturas), 1)
+        self.assertEqual(lotes, [5])
+
+        datos = respuesta.json()
+        self.assertEqual([r['id'] for r in datos['resultados']], self.ids)
+        esperadas = scoring.puntuar_filas(list(Cliente.objects.filter(id__in=self.ids).order_by('id')))
+        self.assertEqual([r['probabilidad_abandono'] for r in datos['resultados']], [round(p * 100, 2) for p in esperadas])
+        self.assertEqual(HistorialPrediccion.objects.filter(origen=HistorialPrediccion.ORIGEN_LOTE).count(), 5)
+
+    def test_filtro_por_estado(self):
+        datos = self.enviar({'estado': 'inactivo'}).json()
+        self.assertEqual(datos['total'], Cliente.objects.filter(estado='inactivo').count())
+
+    @override_settings(PREDICCIONES_BATCH_MAX=4)
+    def test_limite_de_filas(self):
+        respuesta = self.enviar({'ids': self.ids})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('máximo de 4', respuesta.json()['error'])
+        self.assertEqual(self.enviar({'ids': self.ids[:4]}).status_code, 200)
+
+
+class BenchMicrobatchTests(ModeloDePruebaMixin, TestCase):
+    def test_cada_peticion_pasa_por_el_modelo(self):
+        predictor = scoring.predictor
+        filas = []
+
+        def contar(vigente, n_filas):
+            filas.append(n_filas)
+            return predictor(vigente, n_filas)
+
+        salida = io.StringIO()
+        with mock.patch('predicciones.scoring.predictor', contar):
+            call_command('bench_microbatch', clientes=2, peticiones=10, stdout=salida)
+        # Calentamiento + 10 por modo: sin la caché ninguna fila se responde sin puntuar
+        self.assertEqual(sum(filas), 1 + 10 + 10)
+        self.assertIsNone(prediction_cache._cache)
+        self.assertIn('microbatch', salida.getvalue())
+
+
+class RecalcularTodosTests(ModeloDePruebaMixin, TestCase):
+    def test_escribe_por_bloques(self):
+        vigente = model_cache.modelo_vigente().obtener()
+        # nivel_riesgo es entrada del modelo: lo esperado sale de los datos antes de recalcular
+        esperadas = vigente.modelo.predict_proba(vigente.encoder.transform(list(Cliente.objects.order_by('id'))))[:, 1]
+        with CaptureQueriesContext(connection) as consultas:
+            resumen = scoring.recalcular_todos(tamano_bloque=10, registrar_historial=False)
+        self.assertEqual(resumen['filas'], self.N_CLIENTES)
+        self.assertEqual(resumen['version_modelo'], self.version)
+
+        # Un UPDATE con executemany por bloque de 10, no uno por cliente
+        actualizaciones = [q['sql'] for q in consultas.captured_queries if 'UPDATE "clientes_cliente"' in q['sql']]
+        self.assertEqual([sql.split(' times:')[0] for sql in actualizaciones], ['10', '10', '4'])
+
+        clientes = list(Cliente.objects.order_by('id'))
+        np.testing.assert_allclose([c.probabilidad_abandono for c in clientes], esperadas)
+        self.assertEqual(
+            [c.nivel_riesgo for c in clientes], [Cliente.nivel_desde_probabilidad(p) for p in esperadas],
+        )
+        self.assertTrue(all(c.version_modelo == self.version and c.puntuado_en for c in clientes))
+
+    def test_registra_historial_por_bloque(self):
+        scoring.recalcular_todos(tamano_bloque=10, workers=2)
+        self.assertEqual(
+            HistorialPrediccion.objects.filter(origen=HistorialPrediccion.ORIGEN_RECALCULO).count(), self.N_CLIENTES,
+        )
+
+
+class AlertasAltoRiesgoTests(ModeloDePruebaMixin, TestCase):
+    def test_no_duplica_alertas_dentro_de_la_ventana(self):
+        from usuarios.models import Alert
+
+        primera = detect_high_risk_alerts(threshold=0.5, tamano_bloque=5)
+        self.assertEqual((primera['scanned'], primera['created']), (self.N_CLIENTES, Alert.objects.count()))
+        self.assertGreater(primera['created'], 0)
+
+        segunda = detect_high_risk_alerts(threshold=0.5, tamano_bloque=5)
+        self.assertEqual((segunda['created'], segunda['skipped_duplicates']), (0, primera['created']))
+
+        # Fuera de la ventana se vuelve a alertar
+        Alert.objects.update(created_at=timezone.now() - timedelta(hours=25))
+        tercera = detect_high_risk_alerts(threshold=0.5, tamano_bloque=5, ventana_horas=24)
+        self.assertEqual(tercera['created'], primera['created'])
+        self.assertEqual(Alert.objects.count(), 2 * primera['created'])
+
+
+class RecalculoIncrementalTests(ModeloDePruebaMixin, TestCase):
+    def recalcular(self):
+        salida = io.StringIO()
+        call_command('recalcular_riesgo', incremental=True, tamano_bloque=10, stdout=salida)
+        return salida.getvalue()
+
+    def test_solo_recalcula_pendientes(self):
+        self.assertIn(f'{self.N_CLIENTES} clientes recalculados', self.recalcular())
+        salida = self.recalcular()
+        self.assertIn('0 clientes recalculados', salida)
+        self.assertIn(f'{self.N_CLIENTES} sin cambios omitidos', salida)
+
+        editado = Cliente.objects.order_by('id').first()
+        editado.telefono = '0999999999'
+        editado.save()
+        Cliente.objects.filter(pk=editado.pk + 1).update(estado='inactivo')
+        Cliente.objects.filter(pk=editado.pk + 2).update(nombre='Solo contacto')
+        self.assertIn('2 clientes recalculados', self.recalcular())
+
+        # Una versión nueva del modelo deja pendientes a todos
+        training.entrenar()
+        self.assertIn(f'{self.N_CLIENTES} clientes recalculados', self.recalcular())
+
+    def test_pendientes_de_puntuar(self):
+        pendientes = scoring.pendientes_de_puntuar(Cliente.objects.all(), self.version)
+        self.assertEqual(pendientes.count(), self.N_CLIENTES)
+        scoring.recalcular_todos(registrar_historial=False)
+        self.assertEqual(pendientes.count(), 0)
+        self.assertEqual(scoring.pendientes_de_puntuar(Cliente.objects.all(), 'otra').count(), self.N_CLIENTES)
+
+
+class VersionRegistradaTests(ModeloDePruebaMixin, TestCase):
+    """La versión que se registra es la que calculó la probabilidad, aunque el modelo cambie en medio."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@ejemplo.com', 'x'))
+        nueva = training.entrenar()['version']
+        reg = model_cache.registro()
+        self.anterior = reg.cargar(model_cache.NOMBRE_MODELO, self.version)
+        self.nueva = reg.cargar(model_cache.NOMBRE_MODELO, nueva)
+        self.cliente = Cliente.objects.order_by('id').first()
+
+    def cambio_de_modelo(self):
+        # La primera consulta ve la versión anterior y las siguientes la nueva
+        return mock.patch.object(
+            model_cache.ModeloCompartido, 'obtener',
+            side_effect=[self.anterior] + [self.nueva] * 10,
+        )
+
+    def test_vistas_de_una_fila(self):
+        for nombre in ('predecir_abandono', 'predecir_abandono_async', 'calcular_riesgo'):
+            with self.subTest(vista=nombre), self.cambio_de_modelo() as obtener:
+                respuesta = self.client.get(reverse(f'predicciones:{nombre}', args=[self.cliente.pk]))
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual(obtener.call_count, 1)
+                registrada = HistorialPrediccion.objects.latest('id')
+                self.assertEqual(registrada.version_modelo, self.version)
+        self.cliente.refresh_from_db()
+        self.assertEqual(self.cliente.version_modelo, self.version)
+
+    def test_puntuar_queryset(self):
+        with self.cambio_de_modelo() as obtener:
+            scoring.puntuar_queryset(Cliente.objects.all(), origen=HistorialPrediccion.ORIGEN_LOTE)
+        self.assertEqual(obtener.call_count, 1)
+        self.assertEqual(
+            list(HistorialPrediccion.objects.values_list('version_modelo', flat=True).distinct()), [self.version],
+        )
+
+
+class BufferHistorialIntegridadTests(TransactionTestCase):
+    def test_cliente_borrado_no_descarta_el_lote(self):
+        Cliente.objects.bulk_create(Cliente(nombre='N', apellido='A', email=f'c{i}@ejemplo.com') for i in range(3))
+        ids = list(Cliente.objects.order_by('id').values_list('id', flat=True))
+        buffer = historial.BufferHistorial(max_filas=100, max_espera=60)
+        buffer.agregar(historial.nuevas([(i, 0.9) for i in ids], 'v1', 'individual'))
+        Cliente.objects.filter(pk=ids[1]).delete()
+
+        with self.assertLogs('predicciones.historial', 'WARNING') as logs:
+            self.assertEqual(buffer.vaciar(), 2)
+        self.assertIn(str([ids[1]]), logs.output[0])
+        self.assertEqual(sorted(HistorialPrediccion.objects.values_list('cliente_id', flat=True)), [ids[0], ids[2]])
+        self.assertEqual(ResumenMensualPrediccion.objects.get().cantidad, 2)
+        self.assertEqual(
+            {k: buffer.estadisticas()[k] for k in ('escritas', 'rechazadas', 'perdidas')},
+            {'escritas': 2, 'rechazadas': 1, 'perdidas': 0},
+        )
+
+
+class HistorialPrediccionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Cliente.objects.bulk_create(Cliente(nombre='N', apellido='A', email=f'c{i}@ejemplo.com') for i in range(3))
+        self.ids = list(Cliente.objects.order_by('id').values_list('id', flat=True))
+
+    def test_escribir_acumula_resumenes(self):
+        historial.escribir(historial.nuevas([(self.ids[0], 0.9), (self.ids[1], 0.7), (self.ids[2], 0.1)], 'v1', 'lote'))
+        historial.escribir(historial.nuevas([(self.ids[0], 0.8)], 'v1', 'individual'))
+
+        self.assertEqual(HistorialPrediccion.objects.count(), 4)
+        resumenes = {r.nivel_riesgo: r for r in ResumenMensualPrediccion.objects.all()}
+        self.assertEqual(resumenes['Alto'].cantidad, 3)
+        self.assertAlmostEqual(resumenes['Alto'].probabilidad_media, 0.8)
+        self.assertEqual(resumenes['Bajo'].cantidad, 1)
+
+    def test_buffer_escribe_por_lotes(self):
+        buffer = historial.BufferHistorial(max_filas=3, max_espera=60)
+        buffer.agregar(historial.nuevas([(self.ids[0], 0.5), (self.ids[1], 0.5)], 'v1', 'individual'))
+        self.assertEqual(HistorialPrediccion.objects.count(), 0)
+        buffer.agregar(historial.nuevas([(self.ids[2], 0.5)], 'v1', 'individual'))
+        self.assertEqual(HistorialPrediccion.objects.count(), 3)
+        self.assertEqual(buffer.estadisticas()['lotes'], 1)
+
+    def test_purgar_conserva_resumenes_y_ajusta_kpis(self):
+        kpis.foto()
+        viejas = historial.nuevas([(i, 0.9) for i in self.ids], 'v1', 'lote', fecha=timezone.now() - timedelta(days=400))
+        with self.captureOnCommitCallbacks(execute=True):
+            historial.escribir(viejas)
+            historial.escribir(historial.nuevas([(self.ids[0], 0.2)], 'v1', 'individual'))
+        self.assertEqual(kpis.foto()['total_predicciones'], 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = historial.purgar(dias=365, tamano_bloque=2)
+        self.assertEqual(resultado['borradas'], 3)
+        self.assertEqual(HistorialPrediccion.objects.count(), 1)
+        self.assertEqual(sum(ResumenMensualPrediccion.objects.values_list('cantidad', flat=True)), 4)
+        self.assertEqual(kpis.foto()['total_predicciones'], 1)
+        self.assertEqual(kpis.foto()['ultimas_predicciones'][0]['nivel_riesgo'], 'Bajo')
+
+    @override_settings(PREDICCIONES_HISTORIAL_RETENCION_DIAS=0)
+    def test_retencion_cero_no_purga(self):
+        historial.escribir(historial.nuevas([(self.ids[0], 0.9)], 'v1', 'lote', fecha=timezone.now() - timedelta(days=4000)))
+        self.assertEqual(historial.purgar()['borradas'], 0)
+        self.assertEqual(HistorialPrediccion.objects.count(), 1)
@@ -0,0 +1,90 @@
+"""Entrenamiento del modelo de abandono.
+
+Se ejecuta fuera del request (ver `jobs.py`); `progreso` recibe el nombre de
+cada etapa para que el estado del trabajo pueda consultarse mientras corre.
+"""
+from __future__ import annotations
+
+from typing import Callable
+
+from clientes.models import Cliente
+
+from .encoder import ClienteEncoder
+from .forest import BosqueCompilado
+from .model_cache import NOMBRE_MODELO, registro
+
+ETAPAS = ('cargando_datos', 'entrenando', 'evaluando', 'guardando')
+
+
+class DatosInsuficientes(ValueError):
+    """No hay datos suficientes para entrenar."""
+
+
+def entrenar(progreso: Callable[[str], None] | None = None) -> dict:
+    """Entrena el RandomForest, publica una versión nueva en el registro y devuelve las métricas."""
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, classification_report, roc_auc_score
+    from sklearn.model_selection import train_test_split
+    from django.conf import settings
+
+    progreso = progreso or (lambda etapa: None)
+
+    # 1. Preparar dataset
+    progreso('cargando_datos')
+    clientes = list(Cliente.objects.all().values(
+        'estado', 'nivel_riesgo', 'telefono'  # ajusta según tus features
+    ))
+
+    # 2. Definir X y y (ejemplo: predecir abandono por estado)
+    # Supongamos que abandono = estado_inactivo (1) / activo (0)
+    y = np.array([c['estado'] == 'inactivo' for c in clientes], dtype=bool)
+    if not y.any():
+        raise DatosInsuficientes('No hay clientes inactivos para entrenar')
+
+    # El encoder fija categorías y orden de columnas; se guarda con el modelo
+    encoder = ClienteEncoder().fit(clientes)
+    X = encoder.transform(clientes)
+
+    # 3. Separar train/test
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+
+    # 4. Entrenar modelo
+    progreso('entrenando')
+    modelo = RandomForestClassifier(n_estimators=100, random_state=42)
+    modelo.fit(X_train, y_train)
+
+    # 5. Evaluar métricas
+    progreso('evaluando')
+    y_pred = modelo.predict(X_test)
+    acc = accuracy_score(y_test, y_pred)
+    report = classification_report(y_test, y_pred, output_dict=True)
+    roc = roc_auc_score(y_test, modelo.predict_proba(X_test)[:, 1])
+
+    # 6. Publicar versión (los workers la cargan al detectar el cambio de CURRENT)
+    progreso('guardando')
+    metricas = {
+        'accuracy': acc,
+        'roc_auc': roc,
+        'report': report,
+    }
+    reg = registro()
+    version = reg.publicar(
+        NOMBRE_MODELO,
+        {
+            'modelo': modelo,
+            'encoder': encoder,
+            'bosque': BosqueCompilado.desde_sklearn(modelo),
+        },
+        {
+            'features': encoder.columnas_,
+            'metricas': {'accuracy': acc, 'roc_auc': roc},
+            'filas_entrenamiento': len(y_train),
+            'filas_total': len(clientes),
+        },
+    )
+    reg.purgar(NOMBRE_MODELO, conservar=getattr(settings, 'PREDICCIONES_MODEL_VERSIONS_KEEP', 5))
+
+    return {'version': version, **metricas}
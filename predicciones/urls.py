@@ -7,6 +7,14 @@ app_name = 'predicciones'
 urlpatterns = [
     path('', views.home, name='index'),
     path('entrenar-modelo/', views.entrenar_modelo, name='entrenar_modelo'),
+    path('recalcular-riesgo/', views.recalcular_riesgo_todos, name='recalcular_riesgo_todos'),
+    path('trabajos/<int:trabajo_id>/', views.estado_trabajo, name='estado_trabajo'),
+    path('tareas/estado/', views.estado_tareas, name='estado_tareas'),
+    path('modelo/estado/', views.estado_modelo, name='estado_modelo'),
     path('predecir-abandono/<int:cliente_id>/', views.predecir_abandono, name='predecir_abandono'),
+    path('predecir-abandono-async/<int:cliente_id>/', views.predecir_abandono_async, name='predecir_abandono_async'),
+    path('predecir-lote/', views.predecir_lote, name='predecir_lote'),
     path('calcular-riesgo/<int:cliente_id>/', views.calcular_nivel_riesgo, name='calcular_riesgo'),
+    path('historial/<int:cliente_id>/', views.historial_cliente, name='historial_cliente'),
+    path('historial/mensual/', views.historial_mensual, name='historial_mensual'),
 ]
@@ -1,9 +1,25 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseForbidden, JsonResponse
 from django.shortcuts import render
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 
 from clientes.models import Cliente
 
+from . import historial
+from .jobs import TrabajoEnCurso, get_runner
+from .memoria import uso_memoria
+from .microbatch import batcher_puntuacion
+from .model_cache import modelo_vigente
+from .models import HistorialPrediccion, ResumenMensualPrediccion, Trabajo
+from .prediction_cache import cache_predicciones
+from .scoring import CAMPOS_FEATURES, puntuar_filas, puntuar_queryset
+from .task_queue import metricas as metricas_tareas
+
 
 @login_required
 def home(request):
@@ -12,65 +28,122 @@ def home(request):
 
 @login_required
 def entrenar_modelo(request):
+    """Encola el entrenamiento y responde de inmediato con el id del trabajo."""
     if not request.user.is_superuser and getattr(request.user, 'rol', None) != 'admin':
         return HttpResponseForbidden("No tienes permiso para entrenar el modelo")
 
     try:
-        import pandas as pd
-        from sklearn.ensemble import RandomForestClassifier
-        from sklearn.metrics import accuracy_score, classification_report, roc_auc_score
-        from sklearn.model_selection import train_test_split
-        import joblib
-    except ModuleNotFoundError as exc:
+        trabajo = get_runner().enviar(
+            Trabajo.TIPO_ENTRENAMIENTO, 'predicciones.training.entrenar', usuario=request.user,
+        )
+    except TrabajoEnCurso as exc:
         return JsonResponse(
             {
-                'error': 'Dependencias de ML no instaladas (pandas/sklearn/joblib).',
-                'detalle': str(exc),
+                'error': 'Ya hay un entrenamiento en curso',
+                'trabajo': exc.trabajo.como_dict(),
+                'url_estado': reverse('predicciones:estado_trabajo', args=[exc.trabajo.pk]),
             },
-            status=500,
+            status=409,
         )
 
-    
-    # 1. Preparar dataset
-    
-    clientes = Cliente.objects.all().values(
-        'estado', 'nivel_riesgo', 'telefono'  # ajusta según tus features
+    return JsonResponse(
+        {
+            'trabajo': trabajo.como_dict(),
+            'url_estado': reverse('predicciones:estado_trabajo', args=[trabajo.pk]),
+        },
+        status=202,
     )
-    df = pd.DataFrame(clientes)
-
-    # Convertir variables categóricas si es necesario
-    df = pd.get_dummies(df, columns=['estado', 'nivel_riesgo'], drop_first=True)
-
-    # 2. Definir X y y (ejemplo: predecir abandono por estado)
-    # Supongamos que abandono = estado_inactivo (1) / activo (0)
-    if 'estado_inactivo' in df.columns:
-        y = df['estado_inactivo']
-        X = df.drop(columns=['estado_inactivo'])
-    else:
-        return JsonResponse({'error': 'No hay clientes inactivos para entrenar'}, status=400)
-
-    # 3. Separar train/test
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
+
+
+@login_required
+@require_POST
+def recalcular_riesgo_todos(request):
+    """Encola el recálculo de riesgo de toda la base (solo admin).
+
+    Con `incremental=1` solo se recalculan los clientes pendientes.
+    """
+    if not request.user.is_superuser and getattr(request.user, 'rol', None) != 'admin':
+        return HttpResponseForbidden("No tienes permiso para recalcular el riesgo")
+
+    try:
+        tamano_bloque = int(request.POST.get('tamano_bloque', 2000))
+        workers = int(request.POST.get('workers', 1))
+    except ValueError:
+        return JsonResponse({'error': 'tamano_bloque y workers deben ser enteros'}, status=400)
+    if tamano_bloque <= 0 or workers <= 0:
+        return JsonResponse({'error': 'tamano_bloque y workers deben ser mayores que 0'}, status=400)
+
+    try:
+        trabajo = get_runner().enviar(
+            Trabajo.TIPO_RECALCULO,
+            'predicciones.scoring.recalcular_todos',
+            usuario=request.user,
+            tamano_bloque=tamano_bloque,
+            workers=workers,
+            incremental=request.POST.get('incremental') in {'1', 'true'},
+        )
+    except TrabajoEnCurso as exc:
+        return JsonResponse(
+            {
+                'error': 'Ya hay un recálculo en curso',
+                'trabajo': exc.trabajo.como_dict(),
+                'url_estado': reverse('predicciones:estado_trabajo', args=[exc.trabajo.pk]),
+            },
+            status=409,
+        )
+
+    return JsonResponse(
+        {
+            'trabajo': trabajo.como_dict(),
+            'url_estado': reverse('predicciones:estado_trabajo', args=[trabajo.pk]),
+        },
+        status=202,
     )
 
-    # 4. Entrenar modelo
-    modelo = RandomForestClassifier(n_estimators=100, random_state=42)
-    modelo.fit(X_train, y_train)
 
-    # 5. Evaluar métricas
-    y_pred = modelo.predict(X_test)
-    acc = accuracy_score(y_test, y_pred)
-    report = classification_report(y_test, y_pred, output_dict=True)
-    roc = roc_auc_score(y_test, modelo.predict_proba(X_test)[:, 1])
+@login_required
+def estado_trabajo(request, trabajo_id):
+    if not request.user.is_superuser and getattr(request.user, 'rol', None) != 'admin':
+        return HttpResponseForbidden("No tienes permiso para ver este trabajo")
+
+    try:
+        trabajo = Trabajo.objects.get(pk=trabajo_id)
+    except Trabajo.DoesNotExist:
+        return JsonResponse({'error': 'Trabajo no encontrado'}, status=404)
+    return JsonResponse(trabajo.como_dict())
+
+
+@login_required
+def estado_tareas(request):
+    if not request.user.is_superuser and getattr(request.user, 'rol', None) != 'admin':
+        return HttpResponseForbidden("No tienes permiso para ver la cola de tareas")
+
+    return JsonResponse(metricas_tareas())
+
+
+@login_required
+def estado_modelo(request):
+    if not request.user.is_superuser and getattr(request.user, 'rol', None) != 'admin':
+        return HttpResponseForbidden("No tienes permiso para ver el estado del modelo")
 
-    # 6. Guardar modelo
-    joblib.dump(modelo, 'predicciones/modelo_cliente.pkl')
+    compartido = modelo_vigente()
+    predicciones = cache_predicciones()
+    cache_predicciones_stats = predicciones.estadisticas() if predicciones else None
+    try:
+        vigente = compartido.obtener()
+    except FileNotFoundError:
+        return JsonResponse({
+            'cache': compartido.estadisticas(),
+            'cache_predicciones': cache_predicciones_stats,
+            'version': None,
+        })
 
     return JsonResponse({
-        'accuracy': acc,
-        'roc_auc': roc,
-        'report': report
+        'cache': compartido.estadisticas(),
+        'cache_predicciones': cache_predicciones_stats,
+        'version': vigente.version,
+        'metadata': vigente.metadata,
+        'memoria': uso_memoria([vigente.ruta('bosque')] if vigente.tiene('bosque') else []),
     })
 
 
@@ -80,12 +153,12 @@ def predecir_abandono(request, cliente_id):
         return HttpResponseForbidden("No tienes permiso para hacer predicciones")
 
     try:
-        import pandas as pd
-        import joblib
+        import numpy  # noqa: F401
+        import joblib  # noqa: F401
     except ModuleNotFoundError as exc:
         return JsonResponse(
             {
-                'error': 'Dependencias de ML no instaladas (pandas/joblib).',
+                'error': 'Dependencias de ML no instaladas (numpy/joblib).',
                 'detalle': str(exc),
             },
             status=500,
@@ -96,34 +169,41 @@ def predecir_abandono(request, cliente_id):
     except Cliente.DoesNotExist:
         return JsonResponse({'error': 'Cliente no encontrado'}, status=404)
 
-    # Cargar modelo
+    # Predicción con la versión vigente del modelo (compartida en el proceso)
     try:
-        modelo = joblib.load('predicciones/modelo_cliente.pkl')
+        vigente = modelo_vigente().obtener()
+        probabilidad = puntuar_filas([cliente], vigente)[0]
     except FileNotFoundError:
         return JsonResponse({'error': 'Modelo no entrenado'}, status=400)
+    historial.registrar([(cliente.id, probabilidad)], vigente.version)
 
-    # Preparar datos del cliente como dataframe
-    df = pd.DataFrame([{
-        'telefono': cliente.telefono,
-        'estado': cliente.estado,
-        'nivel_riesgo': cliente.nivel_riesgo,
-    }])
+    return JsonResponse({
+        'cliente': cliente.nombre,
+        'probabilidad_abandono': round(probabilidad * 100, 2)
+    })
 
-    # Convertir variables categóricas igual que en entrenamiento
-    df = pd.get_dummies(df, columns=['estado', 'nivel_riesgo'], drop_first=True)
+@login_required
+async def predecir_abandono_async(request, cliente_id):
+    """Igual que `predecir_abandono`, pero agrupa requests concurrentes (ver microbatch.py).
 
-    # Asegurarse que las columnas coincidan con el modelo
-    modelo_cols = modelo.feature_names_in_
-    for col in modelo_cols:
-        if col not in df.columns:
-            df[col] = 0
-    df = df[modelo_cols]
+    Pensada para servirse por ASGI (uvicorn/daphne sobre `sist_pred_client.asgi`).
+    """
+    user = await request.auser()
+    if not user.is_superuser and getattr(user, 'rol', None) not in {'admin', 'analista'}:
+        return HttpResponseForbidden("No tienes permiso para hacer predicciones")
 
-    # Hacer predicción
-    probabilidad = modelo.predict_proba(df)[:, 1][0]
+    cliente = await Cliente.objects.filter(id=cliente_id).values('id', 'nombre', *CAMPOS_FEATURES).afirst()
+    if cliente is None:
+        return JsonResponse({'error': 'Cliente no encontrado'}, status=404)
+
+    try:
+        probabilidad, version = await batcher_puntuacion().enviar(cliente)
+    except FileNotFoundError:
+        return JsonResponse({'error': 'Modelo no entrenado'}, status=400)
+    await sync_to_async(historial.registrar)([(cliente['id'], probabilidad)], version)
 
     return JsonResponse({
-        'cliente': cliente.nombre,
+        'cliente': cliente['nombre'],
         'probabilidad_abandono': round(probabilidad * 100, 2)
     })
 
@@ -133,12 +213,12 @@ def calcular_nivel_riesgo(request, cliente_id):
         return HttpResponseForbidden("No tienes permiso para esto")
 
     try:
-        import pandas as pd
-        import joblib
+        import numpy  # noqa: F401
+        import joblib  # noqa: F401
     except ModuleNotFoundError as exc:
         return JsonResponse(
             {
-                'error': 'Dependencias de ML no instaladas (pandas/joblib).',
+                'error': 'Dependencias de ML no instaladas (numpy/joblib).',
                 'detalle': str(exc),
             },
             status=500,
@@ -149,46 +229,99 @@ def calcular_nivel_riesgo(request, cliente_id):
     except Cliente.DoesNotExist:
         return JsonResponse({'error': 'Cliente no encontrado'}, status=404)
 
-    # Cargar modelo
+    # Predicción
     try:
-        modelo = joblib.load('predicciones/modelo_cliente.pkl')
+        vigente = modelo_vigente().obtener()
+        probabilidad = float(puntuar_filas([cliente], vigente)[0])
     except FileNotFoundError:
         return JsonResponse({'error': 'Modelo no entrenado'}, status=400)
 
-    # Preparar datos del cliente como dataframe
-    df = pd.DataFrame([{
-        'telefono': cliente.telefono,
-        'estado': cliente.estado,
-        'nivel_riesgo': cliente.nivel_riesgo,  # si ya existía, para consistencia
-    }])
+    # Guardar en el cliente (para listado/orden por probabilidad); queda al
+    # día para el recálculo incremental
+    cliente.registrar_puntuacion(probabilidad, vigente.version)
+    cliente.save(update_fields=['probabilidad_abandono', 'nivel_riesgo', 'puntuado_en', 'version_modelo'])
+    nivel = cliente.nivel_riesgo
+    historial.registrar([(cliente.id, probabilidad)], vigente.version)
 
-    df = pd.get_dummies(df, columns=['estado', 'nivel_riesgo'], drop_first=True)
+    return JsonResponse({
+        'cliente': cliente.nombre,
+        'probabilidad_abandono': round(probabilidad*100,2),
+        'nivel_riesgo': nivel
+    })
 
-    # Asegurarse que las columnas coincidan con el modelo
-    modelo_cols = modelo.feature_names_in_
-    for col in modelo_cols:
-        if col not in df.columns:
-            df[col] = 0
-    df = df[modelo_cols]
 
-    # Predicción
-    probabilidad = float(modelo.predict_proba(df)[:, 1][0])
+@login_required
+@require_POST
+def predecir_lote(request):
+    """Puntúa varios clientes con una sola consulta y un solo predict_proba.
 
-    # Calcular nivel de riesgo
-    if probabilidad < 0.3:
-        nivel = "Bajo"
-    elif probabilidad < 0.6:
-        nivel = "Medio"
-    else:
-        nivel = "Alto"
+    Cuerpo JSON: {"ids": [1, 2, ...]} o filtros {"estado": ..., "nivel_riesgo": ...}.
+    """
+    if not request.user.is_superuser and getattr(request.user, 'rol', None) not in {'admin', 'analista'}:
+        return HttpResponseForbidden("No tienes permiso para hacer predicciones")
 
-    # Guardar en el cliente (para listado/orden por probabilidad)
-    cliente.probabilidad_abandono = probabilidad
-    cliente.nivel_riesgo = nivel
-    cliente.save()
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': 'Se esperaba un objeto JSON'}, status=400)
+
+    clientes = Cliente.objects.all()
+    ids = payload.get('ids')
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return JsonResponse({'error': '"ids" debe ser una lista de enteros'}, status=400)
+        clientes = clientes.filter(id__in=ids)
+    for campo in ('estado', 'nivel_riesgo'):
+        if payload.get(campo):
+            clientes = clientes.filter(**{campo: payload[campo]})
+    if ids is None and not any(payload.get(c) for c in ('estado', 'nivel_riesgo')):
+        return JsonResponse({'error': 'Indica "ids" o un filtro (estado/nivel_riesgo)'}, status=400)
+
+    limite = getattr(settings, 'PREDICCIONES_BATCH_MAX', 100_000)
+    total = clientes.count()
+    if total > limite:
+        return JsonResponse({'error': f'El lote excede el máximo de {limite} clientes'}, status=400)
 
-    return JsonResponse({
-        'cliente': cliente.nombre,
-        'probabilidad_abandono': round(probabilidad*100,2),
-        'nivel_riesgo': nivel
-    })
\ No newline at end of file
+    try:
+        resultados = puntuar_queryset(clientes, origen=HistorialPrediccion.ORIGEN_LOTE)
+    except ModuleNotFoundError as exc:
+        return JsonResponse(
+            {
+                'error': 'Dependencias de ML no instaladas (numpy/joblib).',
+                'detalle': str(exc),
+            },
+            status=500,
+        )
+    except FileNotFoundError:
+        return JsonResponse({'error': 'Modelo no entrenado'}, status=400)
+
+    return JsonResponse({'total': len(resultados), 'resultados': resultados})
+
+
+@login_required
+def historial_cliente(request, cliente_id):
+    """Últimas predicciones de un cliente (índice cliente, fecha_prediccion)."""
+    if not request.user.is_superuser and getattr(request.user, 'rol', None) not in {'admin', 'analista'}:
+        return HttpResponseForbidden("No tienes permiso para ver el historial")
+
+    try:
+        limite = max(1, min(int(request.GET.get('limite', 50)), 500))
+    except ValueError:
+        return JsonResponse({'error': 'limite debe ser un entero'}, status=400)
+    if not Cliente.objects.filter(id=cliente_id).exists():
+        return JsonResponse({'error': 'Cliente no encontrado'}, status=404)
+
+    filas = HistorialPrediccion.objects.filter(cliente_id=cliente_id).order_by('-fecha_prediccion')[:limite]
+    return JsonResponse({'cliente_id': cliente_id, 'historial': [f.como_dict() for f in filas]})
+
+
+@login_required
+def historial_mensual(request):
+    """Resúmenes mensuales por nivel de riesgo (incluyen meses ya purgados)."""
+    if not request.user.is_superuser and getattr(request.user, 'rol', None) not in {'admin', 'analista'}:
+        return HttpResponseForbidden("No tienes permiso para ver el historial")
+
+    resumenes = ResumenMensualPrediccion.objects.order_by('-mes', 'nivel_riesgo')
+    return JsonResponse({'meses': [r.como_dict() for r in resumenes]})
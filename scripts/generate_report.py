@@ -1,11 +1,21 @@
-from django.template.loader import render_to_string
-from weasyprint import HTML
-from django.conf import settings
-import os
-
-def generar_reporte_semanal(context, output_path=None):
-    html = render_to_string('dashboard/report_template.html', context)
-    output_path = output_path or os.path.join(settings.BASE_DIR, 'reports', 'reporte_semanal.pdf')
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    HTML(string=html).write_pdf(target=output_path)
-    return output_path
+"""Compatibilidad con el script anterior: delega en `dashboard.informes`.
+
+El PDF ya no se escribe siempre en `reports/reporte_semanal.pdf`: queda en
+la caché de informes con un nombre por (plantilla, contexto, versión de
+datos) y se reutiliza si ya existe. Para varios segmentos a la vez usar
+`dashboard.informes.generar_lote` o `manage.py generar_informes`.
+"""
+from dashboard import informes
+
+
+def generar_reporte_semanal(context=None, output_path=None):
+    """Genera (o reutiliza) el reporte semanal y devuelve la ruta del PDF.
+
+    Sin `context` se usa el contexto semanal de los cubos de reportes. Con
+    `output_path`, el PDF de la caché además se copia ahí.
+    """
+    context = informes.contexto_semanal() if context is None else context
+    informe = informes.generar_pdf(informes.PLANTILLA_SEMANAL, context, copiar_a=output_path)
+    if informe.error:
+        raise RuntimeError(informe.error)
+    return str(output_path or informe.ruta)
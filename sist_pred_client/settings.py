@@ -130,6 +130,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Varios escritores (web + worker de tareas): esperar el lock en vez
+        # de fallar y tomarlo al abrir la transacción, no al primer UPDATE
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
@@ -178,6 +184,84 @@ STATICFILES_DIRS = [
 # For deployments / collectstatic (safe to keep in dev)
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Registro de versiones de modelos (predicciones.registry); compartido con churn_dashboard
+PREDICCIONES_MODEL_REGISTRY = Path(os.getenv("PREDICCIONES_MODEL_REGISTRY", BASE_DIR / 'models'))
+
+# Archivos subidos para importar clientes y sus reportes de errores
+CLIENTES_IMPORTACIONES_DIR = Path(os.getenv("CLIENTES_IMPORTACIONES_DIR", BASE_DIR / 'importaciones'))
+
+# Exportación XLSX (clientes.exportacion): se arma completa antes de enviarse,
+# así que se limita; las exportaciones más grandes van por CSV/CSV.gz
+CLIENTES_EXPORTACION_XLSX_MAX_FILAS = int(os.getenv("CLIENTES_EXPORTACION_XLSX_MAX_FILAS", 100000))
+
+# Búsqueda FTS5 (clientes.busqueda): coincidencias que se rankean con bm25 por consulta
+CLIENTES_BUSQUEDA_MAX_CANDIDATOS = int(os.getenv("CLIENTES_BUSQUEDA_MAX_CANDIDATOS", 2000))
+
+# Caché de probabilidades (predicciones.prediction_cache). El LRU propio acota
+# las entradas; el backend locmem solo necesita margen para no descartar antes.
+PREDICCIONES_CACHE_ALIAS = 'predicciones'
+PREDICCIONES_CACHE_MAX_ENTRADAS = int(os.getenv("PREDICCIONES_CACHE_MAX_ENTRADAS", 10000))
+
+# Tareas @shared_task (predicciones.task_queue): 'local' (cola en la BD, worker
+# `manage.py procesar_tareas`), 'inmediato' o 'celery'
+PREDICCIONES_TASK_BACKEND = os.getenv("PREDICCIONES_TASK_BACKEND", "local")
+PREDICCIONES_TAREAS_PERIODICAS = {
+    'recalculo-nocturno': {
+        'tarea': 'predicciones.tasks.rescore_incremental',
+        'hora': '01:00',
+    },
+    'alertas-nocturnas': {
+        'tarea': 'predicciones.tasks.detect_high_risk_alerts',
+        'hora': '02:00',
+    },
+    'kpis-dashboard': {
+        'tarea': 'dashboard.tasks.reconciliar_kpis',
+        'cada': 15 * 60,
+    },
+    'historial-retencion': {
+        'tarea': 'predicciones.tasks.purgar_historial',
+        'hora': '03:00',
+    },
+    'reportes-pendientes': {
+        'tarea': 'dashboard.tasks.actualizar_reportes',
+        'cada': 5 * 60,
+    },
+    # Después del recálculo nocturno, que escribe el riesgo sin señales
+    'reportes-reconstruccion': {
+        'tarea': 'dashboard.tasks.reconstruir_reportes',
+        'hora': '04:00',
+    },
+}
+
+# Historial de predicciones (predicciones.historial): filas y segundos que se
+# acumulan antes de escribir un lote, y días que se conservan (0 = sin purga)
+PREDICCIONES_HISTORIAL_LOTE = int(os.getenv("PREDICCIONES_HISTORIAL_LOTE", 500))
+PREDICCIONES_HISTORIAL_MAX_ESPERA_S = float(os.getenv("PREDICCIONES_HISTORIAL_MAX_ESPERA_S", 2.0))
+PREDICCIONES_HISTORIAL_RETENCION_DIAS = int(os.getenv("PREDICCIONES_HISTORIAL_RETENCION_DIAS", 365))
+
+# Foto de KPIs del inicio (dashboard.kpis): segundos que se sirve desde la caché
+DASHBOARD_KPIS_TTL = int(os.getenv("DASHBOARD_KPIS_TTL", 60))
+
+# Cubos de reportes (dashboard.reportes): probabilidad desde la que un cliente
+# cuenta como de alto riesgo (cambiarla requiere `manage.py reconstruir_reportes`)
+DASHBOARD_REPORTES_UMBRAL_ALTO_RIESGO = float(os.getenv("DASHBOARD_REPORTES_UMBRAL_ALTO_RIESGO", 0.8))
+
+# Informes PDF (dashboard.informes): caché de archivos y procesos del pool (<= 1 = sin pool)
+DASHBOARD_INFORMES_DIR = Path(os.getenv("DASHBOARD_INFORMES_DIR", BASE_DIR / 'reports'))
+DASHBOARD_INFORMES_PROCESOS = int(os.getenv("DASHBOARD_INFORMES_PROCESOS", min(4, os.cpu_count() or 1)))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'predicciones': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'predicciones',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': PREDICCIONES_CACHE_MAX_ENTRADAS * 2},
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -2,5 +2,6 @@ from django.contrib import admin
 
 # Registrar el modelo en el admin
 from django.contrib import admin
-from .models import Usuario
+from .models import Alert, Usuario
 admin.site.register(Usuario)
+admin.site.register(Alert)
@@ -0,0 +1,25 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_cliente_riesgo_fields'),
+        ('usuarios', '0002_alter_usuario_rol'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Alert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('probability', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='clientes.cliente')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cliente', 'created_at'], name='usuarios_alert_cli_creado_idx')],
+            },
+        ),
+    ]
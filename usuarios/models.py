@@ -29,3 +29,26 @@ class Usuario(AbstractUser):
 
     def __str__(self):
         return f"{self.username} - {self.rol}"
+
+
+class Alert(models.Model):
+    """Alerta de cliente con alta probabilidad de abandono (ver predicciones.tasks)."""
+
+    cliente = models.ForeignKey(
+        'clientes.Cliente',
+        on_delete=models.CASCADE,
+        related_name='alertas'
+    )
+
+    probability = models.FloatField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Deduplicación por ventana: cliente_id IN (...) AND created_at >= corte
+            models.Index(fields=['cliente', 'created_at'], name='usuarios_alert_cli_creado_idx'),
+        ]
+
+    def __str__(self):
+        return f"Alerta {self.cliente_id} ({self.probability:.2f})"